@@ -0,0 +1,3 @@
+from .suite import SIZES, compare, run
+from .stub import StubReader, StubServer, canned_site
+from .synthetic import datasets, synthetic_stack
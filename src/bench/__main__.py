@@ -0,0 +1,56 @@
+import argparse
+import json
+import logging
+import sys
+from . import suite
+from .suite import LOGGER
+
+
+def main(argv: list[str]):
+    LOGGER.setLevel(logging.INFO)
+
+    parser = argparse.ArgumentParser(prog="python -m bench", description="Time ingest, render and scrape on synthetic data; run from the repository root with src on PYTHONPATH")
+    parser.add_argument("--sizes", type=lambda text: int(float(text)), nargs="+", default=suite.SIZES, help="points per layer, e.g. 1e3 1e5 1e7")
+    parser.add_argument("--repeat", type=int, default=3, help="runs of each case; the best and median are kept")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic layers")
+    parser.add_argument("--data", default=".bench-data", help="directory of generated CSV files, reused between runs")
+    parser.add_argument("--no-scrape", action="store_true", help="skip the scraper replay")
+    parser.add_argument("--output", help="write the results here instead of stdout")
+    parser.add_argument("--baseline", help="results of an earlier run; exit with status 1 on a regression against them")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown or growth as a fraction, for --baseline")
+    parser.add_argument("--check", metavar="RESULTS", help="compare these saved results to --baseline instead of running")
+    args = parser.parse_args(argv)
+
+    if args.check is not None:
+        if args.baseline is None:
+            parser.error("--check needs --baseline")
+
+        with open(args.check, encoding="utf-8") as f:
+            results = json.load(f)
+    else:
+        results = suite.run(args.sizes, directory=args.data, repeat=args.repeat, seed=args.seed, scrape=not args.no_scrape)
+        text = json.dumps(results, indent=2)
+
+        if args.output is None:
+            print(text)
+        else:
+            with open(args.output, "w", encoding="utf-8") as f:
+                f.write(text + "\n")
+
+    if args.baseline is None:
+        return
+
+    with open(args.baseline, encoding="utf-8") as f:
+        regressions = suite.compare(json.load(f), results, args.tolerance)
+
+    for regression in regressions:
+        LOGGER.error(f"regression: {regression}")
+
+    if regressions:
+        sys.exit(1)
+
+    LOGGER.info("no regressions")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,171 @@
+import hashlib
+import json
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from cache import CachedReader
+from cache.http import Validators
+
+
+# listing and location pages are laid out so the scraper's selectors
+# (scrapers.tj.extract.LINK_SELECTOR and SCHEMA_SELECTOR) find their content
+LISTING_PAGE = """<!DOCTYPE html>
+<html><body><div id="contentbegin"><div><div><div>
+<div><h1>{title}</h1></div>
+<div><div>
+{links}
+</div></div>
+</div></div></div></div></body></html>"""
+
+LISTING_LINK = '<div><a href="{href}">{text}</a></div>'
+
+LOCATION_PAGE = """<!DOCTYPE html>
+<html><body><div id="contentbegin"><div>
+<div><h1>{title}</h1></div>
+<div>
+{scripts}
+</div>
+</div></div></body></html>"""
+
+LOCATION_SCRIPT = '<div><script type="application/ld+json">{schema}</script></div>'
+
+
+def canned_site(states: int, cities: int, stores: int) -> dict[str, str]:
+    """
+    Pages of a store locator with `states` states of `cities` cities of
+    `stores` stores each, keyed by path.
+    """
+    pages = {}
+    state_links = []
+
+    for s in range(states):
+        state = f"s{s}"
+        state_links.append(LISTING_LINK.format(href=f"/{state}/", text=f"State {s}"))
+        city_links = []
+
+        for c in range(cities):
+            city = f"/{state}/c{c}/"
+            city_links.append(LISTING_LINK.format(href=city, text=f"City {c}"))
+            scripts = []
+
+            for k in range(stores):
+                number = (s * cities + c) * stores + k
+                schema = {
+                    "@context": "https://schema.org",
+                    "@type": "PostalAddress",
+                    "@id": f"https://locations.traderjoes.com{city}{number}/",
+                    "name": f"City {c} ({number})",
+                    "streetAddress": f"{number + 1} Main St",
+                    "addressLocality": f"City {c}",
+                    "addressRegion": state.upper(),
+                    "postalCode": f"{number % 90000 + 10000:05d}",
+                    "addressCountry": "US",
+                    "telephone": f"+1 555-{number // 10000 % 1000:03d}-{number % 10000:04d}",
+                }
+                scripts.append(LOCATION_SCRIPT.format(schema=json.dumps(schema)))
+
+            pages[city] = LOCATION_PAGE.format(title=f"City {c}", scripts="\n".join(scripts))
+
+        pages[f"/{state}/"] = LISTING_PAGE.format(title=f"State {s}", links="\n".join(city_links))
+
+    pages["/"] = LISTING_PAGE.format(title="States", links="\n".join(state_links))
+
+    return pages
+
+
+def geocode_answer(address: str) -> str:
+    """
+    A Nominatim-style answer for `address`, at a location derived from its hash.
+    """
+    digest = hashlib.blake2b(address.encode(), digest_size=8).digest()
+    lat = 25 + digest[0] / 255 * 24
+    lon = -124 + digest[1] / 255 * 57
+
+    return json.dumps([{ "lat": f"{lat:.7f}", "lon": f"{lon:.7f}", "display_name": address }])
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "StubServer"
+
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+
+        if url.path == "/search":
+            query = urllib.parse.parse_qs(url.query).get("q", [""])[0]
+            body, kind = geocode_answer(query), "application/json"
+        else:
+            page = self.server.pages.get(url.path)
+
+            if page is None:
+                self.send_error(404)
+                return
+
+            body, kind = page, "text/html; charset=utf-8"
+
+        data = body.encode()
+
+        with self.server.lock:
+            self.server.requests += 1
+
+        self.send_response(200)
+        self.send_header("Content-Type", kind)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    """
+    Serves `pages` by path, and answers `/search?q=` like Nominatim, on a
+    free local port in a background thread.
+    """
+    daemon_threads = True
+    pages: dict[str, str]
+    requests: int
+
+    def __init__(self, pages: dict[str, str]) -> None:
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.pages = pages
+        self.requests = 0
+        self.lock = threading.Lock()
+        self.__thread: Optional[threading.Thread] = None
+
+
+    @property
+    def origin(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+    def __enter__(self):
+        self.__thread = threading.Thread(target=self.serve_forever, name="bench-stub", daemon=True)
+        self.__thread.start()
+        return self
+
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+
+
+class StubReader(CachedReader):
+    """
+    A `CachedReader` that sends every request to `origin` instead of the
+    host in the URL. Pages are still cached under their real URLs.
+    """
+    origin: str
+
+    def __init__(self, origin: str, cache_path: str, **kwargs) -> None:
+        super().__init__(cache_path, **kwargs)
+        self.origin = origin
+
+
+    def fetch(self, url, headers, validators: Validators = Validators()):
+        parts = urllib.parse.urlsplit(url)
+        return super().fetch(self.origin + urllib.parse.urlunsplit(("", "", parts.path, parts.query, "")), headers, validators)
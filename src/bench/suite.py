@@ -0,0 +1,183 @@
+import os
+import platform
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Any, Callable
+import folium
+import numpy as np
+from definitions import application_logger
+from .stub import StubReader, StubServer, canned_site
+from .synthetic import datasets, synthetic_stack
+
+LOGGER = application_logger("Benchmark")
+
+SIZES = [1_000, 10_000, 100_000]
+
+Results = dict[str, Any]
+
+
+def _peak_rss() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _summary(samples: list[float]) -> dict[str, float]:
+    return { "best": min(samples), "median": statistics.median(samples) }
+
+
+class _Timer:
+    def __init__(self) -> None:
+        self.samples: dict[str, list[float]] = {}
+
+
+    def __call__(self, name: str, fn: Callable[[], Any]) -> Any:
+        start = time.perf_counter()
+        value = fn()
+        self.samples.setdefault(name, []).append(time.perf_counter() - start)
+        return value
+
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        return { name: _summary(samples) for name, samples in self.samples.items() }
+
+
+def points_case(directory: str, n: int, repeat: int, seed: int) -> Results:
+    """
+    Ingest, center, draw, render and save a synthetic stack of two `n`-point
+    layers, `repeat` times from cold. Meant to run in a fresh process, so
+    the peak RSS is this case's alone.
+    """
+    stack = synthetic_stack(directory, n, seed)
+    timer = _Timer()
+    html_bytes = 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "map.html")
+
+        for _ in range(repeat):
+            for layer in stack.layers:
+                layer.lat_long_provider().invalidate()
+
+            for layer in stack.layers:
+                timer(f"ingest/{type(layer).__name__}", layer.lat_long_provider().preload)
+
+            timer("center", stack.center)
+            timer("add_to_map", lambda: [layer.add_to_map(folium.Map(tiles=None)) for layer in stack.layers])
+            m = timer("render", stack.render)
+            timer("save", lambda: m.save(path))
+
+            html_bytes = os.path.getsize(path)
+
+    return {
+        "points": n,
+        "csv_bytes": sum(os.path.getsize(file) for file in datasets(directory, n, seed)),
+        "seconds": timer.summary(),
+        "peak_rss_bytes": _peak_rss(),
+        "html_bytes": html_bytes,
+    }
+
+
+def scrape_case(states: int, cities: int, stores: int, workers: int, repeat: int) -> Results:
+    """
+    Scrape a canned site from a local stub server: with an empty cache
+    (every page and geocode fetched), again from the filled cache, and
+    with an empty cache across `workers` threads. No rate limits apply.
+    """
+    from scrapers.tj import scraper
+
+    timer = _Timer()
+    requests: dict[str, int] = {}
+    found = 0
+
+    with StubServer(canned_site(states, cities, stores)) as server:
+        for _ in range(repeat):
+            with tempfile.TemporaryDirectory() as tmp:
+                # the second pass reads everything from the cache the first one filled
+                for name in ("cold", "warm"):
+                    before = server.requests
+
+                    with StubReader(server.origin, os.path.join(tmp, "cache.sqlite")) as reader:
+                        found = len(timer(name, lambda: list(scraper.scrape(reader))))
+
+                    requests[name] = server.requests - before
+
+            with tempfile.TemporaryDirectory() as tmp:
+                before = server.requests
+
+                with StubReader(server.origin, os.path.join(tmp, "cache.sqlite")) as reader:
+                    timer("concurrent", lambda: list(scraper.scrape_concurrent(reader, workers)))
+
+                requests["concurrent"] = server.requests - before
+
+    return {
+        "stores": found,
+        "workers": workers,
+        "seconds": timer.summary(),
+        "requests": requests,
+    }
+
+
+def environment() -> Results:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+        "folium": folium.__version__,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def run(sizes: list[int] = SIZES, *, directory: str = ".bench-data", repeat: int = 3, seed: int = 0, scrape: bool = True) -> Results:
+    cases: Results = {}
+
+    for n in sizes:
+        # written here, so generating the data does not count towards the case's memory
+        datasets(directory, n, seed)
+        LOGGER.info(f"points: {n}")
+
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+            cases[f"points/{n}"] = pool.submit(points_case, directory, n, repeat, seed).result()
+
+    if scrape:
+        LOGGER.info("scrape")
+        cases["scrape"] = scrape_case(states=5, cities=8, stores=4, workers=4, repeat=repeat)
+
+    return { "environment": environment(), "cases": cases }
+
+
+def compare(baseline: Results, current: Results, tolerance: float = 0.25, floor: float = 0.005) -> list[str]:
+    """
+    Regressions of `current` against `baseline`: a best time more than
+    `tolerance` slower (and by over `floor` seconds, below which timings are
+    noise), or a peak RSS or HTML size more than `tolerance` larger. Only
+    cases and metrics present in both are compared.
+    """
+    regressions = []
+
+    for case, new in current["cases"].items():
+        old = baseline["cases"].get(case)
+
+        if old is None:
+            continue
+
+        for metric, timing in new.get("seconds", {}).items():
+            before = old.get("seconds", {}).get(metric)
+
+            if before is None:
+                continue
+
+            if timing["best"] > before["best"] * (1 + tolerance) and timing["best"] - before["best"] > floor:
+                regressions.append(f"{case} {metric}: {before['best']:.4f}s -> {timing['best']:.4f}s")
+
+        for metric in ("peak_rss_bytes", "html_bytes"):
+            if metric in new and metric in old and new[metric] > old[metric] * (1 + tolerance):
+                regressions.append(f"{case} {metric}: {old[metric]} -> {new[metric]}")
+
+    return regressions
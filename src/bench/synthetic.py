@@ -0,0 +1,139 @@
+import os
+from pathlib import Path
+from typing import cast
+import numpy as np
+from layers.csv_layer import CSVImporter, csv_points, load_csv
+from layers.hospitals import HOSPITAL_IMPORTER, HospitalLayer, HospitalLayerPointProvider
+from layers.layer import Layer, LayerPointProvider, Stack
+from layers.point_store import PointStore
+from layers.tj import TJ_IMPORTER, TJLayer, TJLayerPointProvider
+
+
+HOSPITALS_CSV = "data/hospitals.csv"
+TJ_CSV = "data/tj.csv"
+HOSPITAL_COLUMNS = ["ID","NAME","ADDRESS","CITY","STATE","ZIP","ZIP4","TELEPHONE","TYPE","STATUS","POPULATION","COUNTY","COUNTYFIPS","COUNTRY","LATITUDE","LONGITUDE","NAICS_CODE","NAICS_DESC","SOURCE","SOURCEDATE","VAL_METHOD","VAL_DATE","WEBSITE","STATE_ID","ALT_NAME","ST_FIPS","OWNER","TTL_STAFF","BEDS","TRAUMA","HELIPAD"]
+TJ_COLUMNS = ["url", "name", "street_address", "region", "postal_code", "country", "telephone", "lat", "long"]
+
+# rows formatted per numpy batch while writing
+BLOCK = 100_000
+
+# standard deviation, in degrees, of the jitter around each real location
+JITTER = 0.05
+
+
+def _sample(file: str, importer: CSVImporter, n: int, rng: np.random.Generator) -> tuple[np.ndarray, np.ndarray, PointStore]:
+    """
+    `n` locations drawn from the real layer and jittered, so synthetic
+    layers cluster the way the real ones do, and the real rows they were
+    drawn from.
+    """
+    real = load_csv(file, importer)
+    rows = rng.integers(0, len(real), n)
+
+    lat = np.clip(real.lat[rows] + rng.normal(0, JITTER, n), -85, 85)
+    lon = (real.lon[rows] + rng.normal(0, JITTER, n) + 180) % 360 - 180
+
+    return lat, lon, real.take(rows)
+
+
+def _write(path: Path, header: str, lines) -> None:
+    # written under a temporary name so an interrupted run leaves no half file
+    tmp = path.with_suffix(".tmp")
+
+    with open(tmp, "w", newline="", encoding="utf-8") as output:
+        output.write(header + "\n")
+
+        for block in lines:
+            output.write(block)
+
+    os.replace(tmp, path)
+
+
+def write_hospitals(path: Path, n: int, seed: int = 0) -> None:
+    rng = np.random.default_rng(seed)
+    lat, lon, drawn = _sample(HOSPITALS_CSV, HOSPITAL_IMPORTER, n, rng)
+
+    # bed counts follow the real distribution, unknowns included
+    beds = np.where(np.isnan(drawn.column("beds")), -999, drawn.column("beds")).astype(np.int64)
+
+    def lines():
+        for start in range(0, n, BLOCK):
+            yield "".join(
+                f"{i},SYNTHETIC HOSPITAL {i},{i % 9999 + 1} MAIN STREET,SPRINGFIELD,ZZ,{i % 90000 + 10000:05d},NOT AVAILABLE,NOT AVAILABLE,"
+                f"GENERAL ACUTE CARE,OPEN,{b},COUNTY,00000,USA,{la:.10f},{lo:.10f},622110,GENERAL MEDICAL AND SURGICAL HOSPITALS,"
+                f"SYNTHETIC,2020/01/01 00:00:00,IMAGERY,2020/01/01 00:00:00,NOT AVAILABLE,NOT AVAILABLE,NOT AVAILABLE,00,PROPRIETARY,-999,{b},NOT AVAILABLE,N\n"
+                for i, la, lo, b in zip(range(start, min(start + BLOCK, n)), lat[start:start + BLOCK].tolist(), lon[start:start + BLOCK].tolist(), beds[start:start + BLOCK].tolist())
+            )
+
+    _write(path, ",".join(HOSPITAL_COLUMNS), lines())
+
+
+def write_tj(path: Path, n: int, seed: int = 0) -> None:
+    rng = np.random.default_rng(seed + 1)
+    lat, lon, _ = _sample(TJ_CSV, TJ_IMPORTER, n, rng)
+
+    def lines():
+        for start in range(0, n, BLOCK):
+            yield "".join(
+                f'"https://locations.traderjoes.com/zz/springfield/{i}/","Springfield ({i})","{i % 9999 + 1} Main St","ZZ",'
+                f'"{i % 90000 + 10000:05d}","US","+1 555-{i // 10000 % 1000:03d}-{i % 10000:04d}","{la:.7f}","{lo:.7f}"\n'
+                for i, la, lo in zip(range(start, min(start + BLOCK, n)), lat[start:start + BLOCK].tolist(), lon[start:start + BLOCK].tolist())
+            )
+
+    _write(path, ",".join(f'"{name}"' for name in TJ_COLUMNS), lines())
+
+
+def datasets(directory: str, n: int, seed: int = 0) -> tuple[Path, Path]:
+    """
+    Paths of the synthetic hospital and TJ files with `n` rows each, written
+    on first use and reused afterwards.
+    """
+    root = Path(directory)
+    root.mkdir(parents=True, exist_ok=True)
+
+    hospitals = root / f"hospitals-{n}-{seed}.csv"
+    tj = root / f"tj-{n}-{seed}.csv"
+
+    if not hospitals.exists():
+        write_hospitals(hospitals, n, seed)
+
+    if not tj.exists():
+        write_tj(tj, n, seed)
+
+    return hospitals, tj
+
+
+def _provider(file: Path, importer: CSVImporter) -> LayerPointProvider:
+    # a fresh provider class per file, so each has its own loaded points
+    provider = csv_points(str(file), importer, snapshot=None)(type("SyntheticPointProvider", (LayerPointProvider,), {}))
+    return cast(type[LayerPointProvider], provider)()
+
+
+class SyntheticHospitalLayer(HospitalLayer):
+    """
+    `HospitalLayer` styling over a synthetic file
+    """
+    def __init__(self, file: Path) -> None:
+        super().__init__()
+        self.points = cast(HospitalLayerPointProvider, _provider(file, HOSPITAL_IMPORTER))
+
+
+class SyntheticTJLayer(TJLayer):
+    """
+    `TJLayer` styling over a synthetic file
+    """
+    def __init__(self, file: Path) -> None:
+        super().__init__()
+        self.points = cast(TJLayerPointProvider, _provider(file, TJ_IMPORTER))
+
+
+def synthetic_stack(directory: str, n: int, seed: int = 0) -> Stack:
+    hospitals, tj = datasets(directory, n, seed)
+
+    stack = Stack()
+    layers: list[Layer] = [SyntheticTJLayer(tj), SyntheticHospitalLayer(hospitals)]
+
+    for layer in layers:
+        stack.add(layer)
+
+    return stack
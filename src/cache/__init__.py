@@ -0,0 +1,6 @@
+from .storage import CacheStorage, ShelveStorage, SQLiteStorage
+from .migrate import migrate_shelve
+from .reader import CachedReader, DEFAULT_HEADERS, get_data, open_storage
+from .memory import CacheStats, MemoryTier
+from .policy import TTLPolicy
+from .http import HostLimit, HostLimiter, TokenBucket, Validators
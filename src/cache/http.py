@@ -0,0 +1,136 @@
+import threading
+import time
+import urllib.parse
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Iterator, Optional
+
+# requests is imported when the first session is made, so reading the
+# cache alone (dry runs, stats) does not pay for it
+if TYPE_CHECKING:
+    import requests
+
+
+@dataclass(frozen=True)
+class Validators:
+    """
+    Response validators for conditional requests (RFC 9110 section 8.8).
+    """
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    
+    
+    def __bool__(self) -> bool:
+        return self.etag is not None or self.last_modified is not None
+    
+    
+    def headers(self) -> dict[str, str]:
+        headers = {}
+        
+        if self.etag is not None:
+            headers["If-None-Match"] = self.etag
+            
+        if self.last_modified is not None:
+            headers["If-Modified-Since"] = self.last_modified
+            
+        return headers
+    
+    
+    @classmethod
+    def of(cls, response: "requests.Response") -> "Validators":
+        return cls(response.headers.get("ETag"), response.headers.get("Last-Modified"))
+
+
+@dataclass(frozen=True)
+class HostLimit:
+    rate: Optional[float] = None
+    burst: int = 1
+    concurrency: Optional[int] = None
+
+
+class TokenBucket:
+    """
+    Classic token bucket: `rate` tokens per second, holding at most `burst`.
+    """
+    rate: float
+    burst: int
+    
+    def __init__(self, rate: float, burst: int = 1) -> None:
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        
+        self.rate = rate
+        self.burst = burst
+        self.__tokens = float(burst)
+        self.__updated = time.monotonic()
+        self.__lock = threading.Lock()
+        
+        
+    def acquire(self):
+        while True:
+            with self.__lock:
+                now = time.monotonic()
+                self.__tokens = min(self.burst, self.__tokens + (now - self.__updated) * self.rate)
+                self.__updated = now
+                
+                if self.__tokens >= 1:
+                    self.__tokens -= 1
+                    return
+                
+                wait = (1 - self.__tokens) / self.rate
+            
+            time.sleep(wait)
+
+
+class HostLimiter:
+    """
+    Per-host request limits, shared by every thread that fetches through it.
+    Hosts without an explicit `HostLimit` use `default`.
+    """
+    limits: dict[str, HostLimit]
+    default: HostLimit
+    
+    def __init__(self, limits: Optional[dict[str, HostLimit]] = None, default: HostLimit = HostLimit()) -> None:
+        self.limits = dict(limits or {})
+        self.default = default
+        self.__buckets: dict[str, Optional[TokenBucket]] = {}
+        self.__slots: dict[str, Optional[threading.BoundedSemaphore]] = {}
+        self.__lock = threading.Lock()
+        
+        
+    def __state(self, host: str) -> tuple[Optional[TokenBucket], Optional[threading.BoundedSemaphore]]:
+        with self.__lock:
+            if host not in self.__buckets:
+                limit = self.limits.get(host, self.default)
+                self.__buckets[host] = TokenBucket(limit.rate, limit.burst) if limit.rate is not None else None
+                self.__slots[host] = threading.BoundedSemaphore(limit.concurrency) if limit.concurrency is not None else None
+                
+            return self.__buckets[host], self.__slots[host]
+        
+        
+    @contextmanager
+    def request(self, url: str) -> Iterator[None]:
+        bucket, slots = self.__state(urllib.parse.urlsplit(url).hostname or "")
+        
+        if slots is not None:
+            slots.acquire()
+            
+        try:
+            if bucket is not None:
+                bucket.acquire()
+                
+            yield
+        finally:
+            if slots is not None:
+                slots.release()
+
+
+def make_session(pool_size: int = 16) -> "requests.Session":
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
@@ -0,0 +1,112 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field, fields
+from typing import Optional
+from instrumentation import count
+
+
+@dataclass
+class CacheStats:
+    memory_hits: int = 0
+    memory_misses: int = 0
+    evictions: int = 0
+    storage_hits: int = 0
+    storage_misses: int = 0
+    stale_served: int = 0
+    refreshes: int = 0
+    fetches: int = 0
+    not_modified: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+    
+    
+    def incr(self, name: str, by: int = 1):
+        with self.lock:
+            setattr(self, name, getattr(self, name) + by)
+        
+        count(f"cache.{name}", by)
+            
+            
+    def as_dict(self) -> dict[str, int]:
+        with self.lock:
+            return { f.name: getattr(self, f.name) for f in fields(self) if f.name != "lock" }
+
+
+class MemoryTier:
+    """
+    Bounded LRU of response bodies, sized by the UTF-8 length of the bodies.
+    """
+    max_bytes: int
+    
+    def __init__(self, max_bytes: int, stats: Optional[CacheStats] = None) -> None:
+        self.max_bytes = max_bytes
+        self.stats = stats if stats is not None else CacheStats()
+        self.__entries: OrderedDict[str, tuple[str, Optional[float], int]] = OrderedDict()
+        self.__bytes = 0
+        self.__lock = threading.Lock()
+        
+        
+    def __len__(self) -> int:
+        return len(self.__entries)
+    
+    
+    @property
+    def size(self) -> int:
+        return self.__bytes
+    
+        
+    def get(self, key: str) -> Optional[tuple[str, Optional[float]]]:
+        with self.__lock:
+            entry = self.__entries.get(key)
+            
+            if entry is None:
+                self.stats.incr("memory_misses")
+                return None
+            
+            self.__entries.move_to_end(key)
+            
+        self.stats.incr("memory_hits")
+        
+        value, fetched_at, _ = entry
+        return value, fetched_at
+    
+    
+    def put(self, key: str, value: str, fetched_at: Optional[float]):
+        size = len(value.encode("utf-8"))
+        
+        # a body larger than the whole tier would only evict everything else
+        if size > self.max_bytes:
+            self.discard(key)
+            return
+        
+        with self.__lock:
+            old = self.__entries.pop(key, None)
+            
+            if old is not None:
+                self.__bytes -= old[2]
+            
+            self.__entries[key] = (value, fetched_at, size)
+            self.__bytes += size
+            
+            evicted = 0
+            
+            while self.__bytes > self.max_bytes:
+                _, (_, _, old_size) = self.__entries.popitem(last=False)
+                self.__bytes -= old_size
+                evicted += 1
+                
+        if evicted:
+            self.stats.incr("evictions", evicted)
+            
+            
+    def discard(self, key: str):
+        with self.__lock:
+            old = self.__entries.pop(key, None)
+            
+            if old is not None:
+                self.__bytes -= old[2]
+                
+                
+    def clear(self):
+        with self.__lock:
+            self.__entries.clear()
+            self.__bytes = 0
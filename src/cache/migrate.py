@@ -0,0 +1,75 @@
+import dbm
+import shelve
+import sqlite3
+import sys
+from contextlib import closing
+from definitions import application_logger
+from .storage import SQLiteStorage
+
+LOGGER = application_logger("Cache Migration")
+
+# written once every entry of a shelve has been copied
+MIGRATED_KEY = "migrated:shelve"
+
+
+def _tables(path: str) -> set[str]:
+    try:
+        with closing(sqlite3.connect(f"file:{path}?mode=ro", uri=True)) as connection:
+            return { name for name, in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'") }
+    except sqlite3.Error:
+        return set()
+
+
+def is_shelve(path: str) -> bool:
+    # shelves made by Python 3.13 are SQLite files, like our own cache; only
+    # theirs keeps its entries in a table named Dict
+    if "Dict" in _tables(path):
+        return True
+    
+    kind = dbm.whichdb(path)
+    return bool(kind) and kind != "dbm.sqlite3"
+
+
+def migrate_shelve(shelve_path: str, storage: SQLiteStorage) -> int:
+    """
+    Copy every entry of the shelve database at `shelve_path` into `storage`.
+    The shelve file is opened read-only and left in place. Shelve entries
+    have no fetch time, so they are stored as fetched at the epoch, which
+    every TTL treats as expired. `MIGRATED_KEY` is written last, once the
+    entries are committed, so an interrupted migration is run again.
+    """
+    count = 0
+    
+    with shelve.open(shelve_path, flag="r") as db:
+        for key in db.keys():
+            value = db[key]
+            
+            if not isinstance(value, str):
+                LOGGER.warning(f"skipping {key}: value was not a string")
+                continue
+            
+            storage.put(key, value, fetched_at=0.0)
+            count += 1
+            
+    storage.flush()
+    storage.put(MIGRATED_KEY, shelve_path, fetched_at=0.0)
+    storage.flush()
+    
+    LOGGER.info(f"migrated {count} entries from {shelve_path}")
+    
+    return count
+
+
+def main(argv: list[str]):
+    if len(argv) != 2:
+        print("usage: python -m cache.migrate <shelve path> <sqlite path>", file=sys.stderr)
+        sys.exit(2)
+        
+    shelve_path, sqlite_path = argv
+        
+    with SQLiteStorage(sqlite_path) as storage:
+        migrate_shelve(shelve_path, storage)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
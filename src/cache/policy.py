@@ -0,0 +1,42 @@
+import fnmatch
+import re
+from typing import Iterable, Optional
+
+
+DAY = 24 * 60 * 60
+
+
+class TTLPolicy:
+    """
+    Maps URLs to a time-to-live in seconds. Rules are `(pattern, ttl)` pairs
+    checked in order; patterns are shell-style globs matched against the
+    whole URL. A ttl of None means the entry never expires.
+    """
+    rules: list[tuple[str, Optional[float]]]
+    default: Optional[float]
+    
+    def __init__(self, rules: Iterable[tuple[str, Optional[float]]] = (), default: Optional[float] = None) -> None:
+        self.rules = list(rules)
+        self.default = default
+        self.__compiled = [(re.compile(fnmatch.translate(pattern)), ttl) for pattern, ttl in self.rules]
+        
+    
+    def ttl(self, url: str) -> Optional[float]:
+        for pattern, ttl in self.__compiled:
+            if pattern.match(url):
+                return ttl
+            
+        return self.default
+    
+    
+    def is_fresh(self, url: str, fetched_at: Optional[float], now: float) -> bool:
+        ttl = self.ttl(url)
+        
+        if ttl is None:
+            return True
+        
+        # shelve storage keeps no timestamps; treat its entries as expired
+        if fetched_at is None:
+            return False
+        
+        return now - fetched_at < ttl
@@ -0,0 +1,260 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Optional
+from definitions import application_logger
+from instrumentation import timed
+from .storage import CacheStorage, SQLiteStorage
+from .http import HostLimiter, Validators, make_session
+from .memory import CacheStats, MemoryTier
+from .migrate import MIGRATED_KEY, is_shelve, migrate_shelve
+from .policy import TTLPolicy
+
+if TYPE_CHECKING:
+    import requests
+
+LOGGER = application_logger("Cached Reader")
+
+
+def get_data(storage: CacheStorage, key, computed_value = lambda: None, *, recompute = False):
+    if not recompute:
+        value = storage.get(key)
+        
+        if value is not None:
+            return value
+        
+    value = computed_value()
+
+    if not isinstance(value, str):
+        raise ValueError("value was not a string")
+
+    storage.put(key, value)
+
+    return value
+
+
+def open_storage(cache_path: str) -> CacheStorage:
+    """
+    Open the SQLite cache at `cache_path`. A legacy shelve cache found at
+    that path is migrated into `<cache_path>.sqlite`, which is used from
+    then on; a migration that did not finish is run again.
+    """
+    if is_shelve(cache_path):
+        storage = SQLiteStorage(cache_path + ".sqlite")
+        
+        if MIGRATED_KEY not in storage:
+            migrate_shelve(cache_path, storage)
+            
+        return storage
+    
+    return SQLiteStorage(cache_path)
+
+
+DEFAULT_HEADERS = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64)'}
+
+class CachedReader:
+    cache_path: str
+    storage: CacheStorage
+    memory: Optional[MemoryTier]
+    ttl: Optional[TTLPolicy]
+    stale_while_revalidate: bool
+    stats: CacheStats
+    limiter: Optional[HostLimiter]
+    
+    def __init__(
+        self,
+        cache_path: str,
+        storage: Optional[CacheStorage] = None,
+        *,
+        memory_bytes: int = 0,
+        ttl: Optional[TTLPolicy] = None,
+        stale_while_revalidate: bool = False,
+        limiter: Optional[HostLimiter] = None,
+        pool_size: int = 16,
+    ) -> None:
+        self.cache_path = cache_path
+        self.storage = storage if storage is not None else open_storage(cache_path)
+        self.stats = CacheStats()
+        self.memory = MemoryTier(memory_bytes, self.stats) if memory_bytes > 0 else None
+        self.ttl = ttl
+        self.stale_while_revalidate = stale_while_revalidate
+        self.__refreshing: set[str] = set()
+        self.__refresh_lock = threading.Lock()
+        self.__refresher: Optional[ThreadPoolExecutor] = None
+        self.limiter = limiter
+        self.pool_size = pool_size
+        self.__session: Optional["requests.Session"] = None
+        self.__session_lock = threading.Lock()
+    
+    
+    @property
+    def session(self) -> "requests.Session":
+        if self.__session is None:
+            with self.__session_lock:
+                if self.__session is None:
+                    self.__session = make_session(self.pool_size)
+                    
+        return self.__session
+    
+    
+    @timed("http.fetch")
+    def fetch(self, url, headers, validators: Validators = Validators()) -> Optional[tuple[str, Validators]]:
+        """
+        One HTTP GET. With validators this is a conditional request, and
+        None means the server answered 304 Not Modified.
+        """
+        response = self.session.get(url, headers={ **headers, **validators.headers() })
+        
+        if response.status_code == 304 and validators:
+            return None
+        
+        return response.text, Validators.of(response)
+    
+    
+    def get_uncached(self, url, headers):
+        result = self.fetch(url, headers)
+        assert result is not None # unconditional
+        return result[0]
+    
+    
+    def __limited_fetch(self, url, headers, validators: Validators = Validators()) -> Optional[tuple[str, Validators]]:
+        if self.limiter is None:
+            return self.fetch(url, headers, validators)
+        
+        with self.limiter.request(url):
+            return self.fetch(url, headers, validators)
+    
+    
+    def __store(self, url: str, value: str, validators: Validators):
+        if not isinstance(value, str):
+            raise ValueError("value was not a string")
+        
+        self.storage.put_response(url, value, validators)
+        
+        if self.memory is not None:
+            self.memory.put(url, value, time.time())
+    
+    
+    def __lookup(self, url: str) -> Optional[tuple[str, Optional[float]]]:
+        if self.memory is not None:
+            entry = self.memory.get(url)
+            
+            if entry is not None:
+                return entry
+        
+        entry = self.storage.get_entry(url)
+        
+        if entry is None:
+            self.stats.incr("storage_misses")
+            return None
+        
+        self.stats.incr("storage_hits")
+        
+        if self.memory is not None:
+            self.memory.put(url, *entry)
+        
+        return entry
+    
+    
+    def __fetch(self, url, headers) -> str:
+        self.stats.incr("fetches")
+        
+        result = self.__limited_fetch(url, headers)
+        assert result is not None # unconditional
+        
+        value, validators = result
+        self.__store(url, value, validators)
+            
+        return value
+    
+    
+    def revalidate(self, url, headers=DEFAULT_HEADERS) -> tuple[str, bool]:
+        """
+        Check `url` against the server with a conditional GET and return its
+        body and whether it changed since it was cached. Pages cached without
+        an ETag or Last-Modified are fetched in full and compared by content.
+        """
+        cached = self.__lookup(url)
+        validators = self.storage.validators(url) if cached is not None else Validators()
+        
+        self.stats.incr("fetches")
+        result = self.__limited_fetch(url, headers, validators)
+        
+        if result is None:
+            assert cached is not None # only conditional requests can be not-modified
+            self.stats.incr("not_modified")
+            self.storage.touch(url)
+            
+            if self.memory is not None:
+                self.memory.put(url, cached[0], time.time())
+                
+            return cached[0], False
+        
+        value, validators = result
+        self.__store(url, value, validators)
+        
+        return value, cached is None or cached[0] != value
+    
+    
+    def __refresh(self, url, headers):
+        try:
+            self.__fetch(url, headers)
+            self.stats.incr("refreshes")
+        except Exception as e:
+            LOGGER.warning(f"background refresh of {url} failed: {e}")
+        finally:
+            with self.__refresh_lock:
+                self.__refreshing.discard(url)
+    
+    
+    def __schedule_refresh(self, url, headers):
+        with self.__refresh_lock:
+            if url in self.__refreshing:
+                return
+            
+            self.__refreshing.add(url)
+            
+            if self.__refresher is None:
+                self.__refresher = ThreadPoolExecutor(max_workers=2, thread_name_prefix="cache-refresh")
+        
+        self.__refresher.submit(self.__refresh, url, headers)
+
+
+    def get(self, url, headers=DEFAULT_HEADERS, *, recompute = False):
+        if recompute:
+            return self.__fetch(url, headers)
+        
+        entry = self.__lookup(url)
+        
+        if entry is None:
+            return self.__fetch(url, headers)
+        
+        value, fetched_at = entry
+        
+        if self.ttl is None or self.ttl.is_fresh(url, fetched_at, time.time()):
+            return value
+        
+        if self.stale_while_revalidate:
+            self.stats.incr("stale_served")
+            self.__schedule_refresh(url, headers)
+            return value
+        
+        return self.__fetch(url, headers)
+    
+    
+    def close(self):
+        if self.__refresher is not None:
+            self.__refresher.shutdown(wait=True)
+            
+        if self.__session is not None:
+            self.__session.close()
+            
+        self.storage.close()
+    
+    
+    def __enter__(self):
+        return self
+    
+    
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,362 @@
+import atexit
+import shelve
+import sqlite3
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from typing import Iterator, Optional
+from .http import Validators
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class CacheStorage(ABC):
+    @abstractmethod
+    def get(self, key: str) -> Optional[str]:
+        ...
+        
+        
+    @abstractmethod
+    def put(self, key: str, value: str):
+        ...
+        
+        
+    @abstractmethod
+    def keys(self) -> Iterator[str]:
+        ...
+        
+    
+    def get_entry(self, key: str) -> Optional[tuple[str, Optional[float]]]:
+        value = self.get(key)
+        return None if value is None else (value, None)
+    
+    
+    def put_response(self, key: str, value: str, validators: Validators):
+        self.put(key, value)
+        
+        
+    def validators(self, key: str) -> Validators:
+        return Validators()
+    
+    
+    def touch(self, key: str):
+        pass
+    
+    
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+    
+    
+    def flush(self):
+        pass
+    
+    
+    def close(self):
+        self.flush()
+        
+        
+    def __enter__(self):
+        return self
+    
+    
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ShelveStorage(CacheStorage):
+    """
+    The original `shelve` layout: one pickled `str` per URL. Kept open for
+    the lifetime of the storage instead of per lookup.
+    """
+    path: str
+    
+    def __init__(self, path: str, *, flag: str = "c") -> None:
+        self.path = path
+        self.__lock = threading.Lock()
+        self.__db = shelve.open(path, flag=flag)
+        
+    
+    def get(self, key: str) -> Optional[str]:
+        with self.__lock:
+            return self.__db.get(key)
+        
+    
+    def put(self, key: str, value: str):
+        with self.__lock:
+            self.__db[key] = value
+            
+            
+    def keys(self) -> Iterator[str]:
+        with self.__lock:
+            keys = list(self.__db.keys())
+        
+        return iter(keys)
+            
+            
+    def flush(self):
+        with self.__lock:
+            self.__db.sync()
+            
+    
+    def close(self):
+        with self.__lock:
+            self.__db.close()
+
+
+CODEC_NONE = "n"
+CODEC_ZLIB = "z"
+CODEC_ZSTD = "s"
+
+
+def _compress(codec: str, data: bytes, level: int) -> bytes:
+    if codec == CODEC_ZLIB:
+        return zlib.compress(data, level)
+    
+    if codec == CODEC_ZSTD:
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    
+    return data
+
+
+def _decompress(codec: str, data: bytes) -> bytes:
+    if codec == CODEC_ZLIB:
+        return zlib.decompress(data)
+    
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("cache entry is zstd-compressed but zstandard is not installed")
+        
+        return zstandard.ZstdDecompressor().decompress(data)
+    
+    return data
+
+
+class SQLiteStorage(CacheStorage):
+    """
+    Compressed cache bodies in a SQLite database in WAL mode.
+    
+    Each thread keeps its own open connection, so readers (in this or other
+    processes) never block each other. Writes are buffered and committed
+    `batch_size` at a time in a single transaction; pending writes are
+    visible to `get` in this process before they are committed.
+    """
+    path: str
+    codec: str
+    level: int
+    batch_size: int
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS entries (
+            key TEXT PRIMARY KEY,
+            codec TEXT NOT NULL,
+            body BLOB NOT NULL,
+            fetched_at REAL NOT NULL
+        ) WITHOUT ROWID
+    """
+    
+    # applied in order; PRAGMA user_version records how many have run
+    MIGRATIONS = [
+        "ALTER TABLE entries ADD COLUMN etag TEXT; ALTER TABLE entries ADD COLUMN last_modified TEXT",
+    ]
+    
+    def __init__(self, path: str, *, codec: Optional[str] = None, level: Optional[int] = None, batch_size: int = 64, timeout: float = 30.0) -> None:
+        if codec is None:
+            codec = CODEC_ZSTD if zstandard is not None else CODEC_ZLIB
+        
+        if codec == CODEC_ZSTD and zstandard is None:
+            raise RuntimeError("zstd compression requires the zstandard package")
+        
+        if codec not in (CODEC_NONE, CODEC_ZLIB, CODEC_ZSTD):
+            raise ValueError(f"unknown codec {codec!r}")
+        
+        self.path = path
+        self.codec = codec
+        self.level = level if level is not None else (10 if codec == CODEC_ZSTD else 6)
+        self.batch_size = batch_size
+        self.timeout = timeout
+        
+        self.__local = threading.local()
+        self.__connections: list[sqlite3.Connection] = []
+        self.__lock = threading.Lock()
+        self.__pending: dict[str, tuple[str, bytes, float, Optional[str], Optional[str]]] = {}
+        self.__closed = False
+        
+        with self.__lock:
+            self.__migrate(self.__connect())
+        
+        atexit.register(self.close)
+        
+    
+    def __migrate(self, connection: sqlite3.Connection):
+        connection.execute("BEGIN IMMEDIATE")
+        
+        try:
+            connection.execute(self.SCHEMA)
+            version = connection.execute("PRAGMA user_version").fetchone()[0]
+            
+            for statement in self.MIGRATIONS[version:]:
+                for part in statement.split(";"):
+                    connection.execute(part)
+                    
+            connection.execute(f"PRAGMA user_version = {len(self.MIGRATIONS)}")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        
+        connection.execute("COMMIT")
+    
+    
+    def __connect(self) -> sqlite3.Connection:
+        connection = getattr(self.__local, "connection", None)
+        
+        if connection is None:
+            if self.__closed:
+                raise RuntimeError(f"{self.path} is closed")
+            
+            connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            
+            self.__local.connection = connection
+            self.__connections.append(connection)
+            
+        return connection
+    
+    
+    def get(self, key: str) -> Optional[str]:
+        entry = self.get_entry(key)
+        return None if entry is None else entry[0]
+    
+    
+    def get_entry(self, key: str) -> Optional[tuple[str, Optional[float]]]:
+        with self.__lock:
+            pending = self.__pending.get(key)
+        
+        if pending is None:
+            pending = self.__connect().execute("SELECT codec, body, fetched_at FROM entries WHERE key = ?", (key,)).fetchone()
+            
+            if pending is None:
+                return None
+            
+        codec, body, fetched_at = pending[:3]
+            
+        return _decompress(codec, body).decode("utf-8"), fetched_at
+    
+    
+    def __contains__(self, key: str) -> bool:
+        with self.__lock:
+            if key in self.__pending:
+                return True
+        
+        return self.__connect().execute("SELECT 1 FROM entries WHERE key = ?", (key,)).fetchone() is not None
+    
+    
+    def fetched_at(self, key: str) -> Optional[float]:
+        with self.__lock:
+            pending = self.__pending.get(key)
+        
+        if pending is not None:
+            return pending[2]
+        
+        row = self.__connect().execute("SELECT fetched_at FROM entries WHERE key = ?", (key,)).fetchone()
+        
+        return None if row is None else row[0]
+    
+    
+    def put(self, key: str, value: str, *, fetched_at: Optional[float] = None):
+        self.put_response(key, value, Validators(), fetched_at=fetched_at)
+            
+            
+    def put_response(self, key: str, value: str, validators: Validators, *, fetched_at: Optional[float] = None):
+        body = _compress(self.codec, value.encode("utf-8"), self.level)
+        
+        with self.__lock:
+            self.__pending[key] = (self.codec, body, time.time() if fetched_at is None else fetched_at, validators.etag, validators.last_modified)
+            full = len(self.__pending) >= self.batch_size
+            
+        if full:
+            self.flush()
+            
+            
+    def validators(self, key: str) -> Validators:
+        with self.__lock:
+            pending = self.__pending.get(key)
+            
+        if pending is not None:
+            return Validators(pending[3], pending[4])
+        
+        row = self.__connect().execute("SELECT etag, last_modified FROM entries WHERE key = ?", (key,)).fetchone()
+        
+        return Validators() if row is None else Validators(*row)
+    
+    
+    def touch(self, key: str):
+        now = time.time()
+        
+        with self.__lock:
+            pending = self.__pending.get(key)
+            
+            if pending is not None:
+                self.__pending[key] = (pending[0], pending[1], now, pending[3], pending[4])
+                return
+            
+        self.__connect().execute("UPDATE entries SET fetched_at = ? WHERE key = ?", (now, key))
+            
+            
+    def keys(self) -> Iterator[str]:
+        self.flush()
+        
+        rows = self.__connect().execute("SELECT key FROM entries").fetchall()
+        
+        return (key for (key,) in rows)
+    
+    
+    def flush(self):
+        with self.__lock:
+            if not self.__pending or self.__closed:
+                return
+            
+            pending, self.__pending = self.__pending, {}
+            
+            connection = self.__connect()
+            connection.execute("BEGIN IMMEDIATE")
+            
+            try:
+                connection.executemany(
+                    "INSERT OR REPLACE INTO entries (key, codec, body, fetched_at, etag, last_modified) VALUES (?, ?, ?, ?, ?, ?)",
+                    [(key, *entry) for key, entry in pending.items()],
+                )
+            except BaseException:
+                connection.execute("ROLLBACK")
+                # keep the batch so a later flush can retry it
+                pending.update(self.__pending)
+                self.__pending = pending
+                raise
+            
+            connection.execute("COMMIT")
+            
+            
+    def vacuum(self):
+        self.flush()
+        self.__connect().execute("VACUUM")
+            
+    
+    def close(self):
+        if self.__closed:
+            return
+        
+        self.flush()
+        
+        with self.__lock:
+            self.__closed = True
+            
+            for connection in self.__connections:
+                connection.close()
+                
+            self.__connections.clear()
+        
+        atexit.unregister(self.close)
@@ -0,0 +1,266 @@
+import atexit
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Callable, Optional, TypeVar
+from definitions import application_logger
+
+LOGGER = application_logger("Metrics")
+LOGGER.setLevel(logging.INFO)
+
+# INSTRUMENT=1 turns instrumentation on at import; any other value is also
+# taken as the file to export to at exit (.prom for Prometheus, else JSON)
+ENVIRONMENT_VARIABLE = "INSTRUMENT"
+
+PROMETHEUS_PREFIX = "app"
+
+
+@dataclass
+class SpanStats:
+    count: int = 0
+    total: float = 0.0
+    min: float = float("inf")
+    max: float = 0.0
+
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+
+
+class Registry:
+    """
+    Timings of spans, keyed by their nesting path (`render/layer[Hospitals]`),
+    and named counters. Safe to update from any thread.
+    """
+    spans: dict[str, SpanStats]
+    counters: dict[str, float]
+
+    def __init__(self) -> None:
+        self.spans = {}
+        self.counters = {}
+        self.__lock = threading.Lock()
+
+
+    def record(self, path: str, seconds: float):
+        with self.__lock:
+            stats = self.spans.get(path)
+
+            if stats is None:
+                stats = self.spans[path] = SpanStats()
+
+            stats.add(seconds)
+
+
+    def count(self, name: str, by: float = 1):
+        with self.__lock:
+            self.counters[name] = self.counters.get(name, 0) + by
+
+
+    def reset(self):
+        with self.__lock:
+            self.spans.clear()
+            self.counters.clear()
+
+
+    def as_dict(self) -> dict:
+        with self.__lock:
+            return {
+                "spans": { path: asdict(stats) for path, stats in sorted(self.spans.items()) },
+                "counters": dict(sorted(self.counters.items())),
+            }
+
+
+    def to_json(self) -> str:
+        return json.dumps(self.as_dict(), indent=2)
+
+
+    def to_prometheus(self, prefix: str = PROMETHEUS_PREFIX) -> str:
+        """
+        Prometheus text exposition format: per span, its call count and total,
+        minimum and maximum seconds, and every counter.
+        """
+        data = self.as_dict()
+
+        def label(value: str) -> str:
+            return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+        lines = []
+
+        for metric, kind, field in (
+            ("span_calls_total", "counter", "count"),
+            ("span_seconds_total", "counter", "total"),
+            ("span_seconds_min", "gauge", "min"),
+            ("span_seconds_max", "gauge", "max"),
+        ):
+            lines.append(f"# TYPE {prefix}_{metric} {kind}")
+            lines.extend(f'{prefix}_{metric}{{span="{label(path)}"}} {stats[field]!r}' for path, stats in data["spans"].items())
+
+        lines.append(f"# TYPE {prefix}_events_total counter")
+        lines.extend(f'{prefix}_events_total{{name="{label(name)}"}} {value!r}' for name, value in data["counters"].items())
+
+        return "\n".join(lines) + "\n"
+
+
+    def summary(self) -> str:
+        """
+        The spans as an indented tree, then the counters, as a text table.
+        """
+        data = self.as_dict()
+        width = max([len(path.rsplit("/", 1)[-1]) + 2 * path.count("/") for path in data["spans"]] + [len(name) for name in data["counters"]] + [4])
+
+        lines = [f"{'span':<{width}} {'calls':>8} {'total s':>10} {'mean ms':>10} {'max ms':>10}"]
+
+        for path, stats in data["spans"].items():
+            name = "  " * path.count("/") + path.rsplit("/", 1)[-1]
+            lines.append(f"{name:<{width}} {stats['count']:>8} {stats['total']:>10.3f} {stats['total'] / stats['count'] * 1000:>10.2f} {stats['max'] * 1000:>10.2f}")
+
+        if data["counters"]:
+            lines.append(f"{'counter':<{width}} {'value':>8}")
+            lines.extend(f"{name:<{width}} {value:>8g}" for name, value in data["counters"].items())
+
+        return "\n".join(lines)
+
+
+# per process: spans and counts of pool workers (parallel renders and CSV
+# parsing) are not collected
+REGISTRY = Registry()
+
+_enabled = False
+_export: Optional[str] = None
+_exit_registered = False
+_local = threading.local()
+
+
+class _Span:
+    __slots__ = ("name", "path", "start")
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+
+    def __enter__(self):
+        parents = getattr(_local, "paths", None)
+
+        if parents is None:
+            parents = _local.paths = []
+
+        self.path = f"{parents[-1]}/{self.name}" if parents else self.name
+        parents.append(self.path)
+        self.start = time.perf_counter()
+
+        return self
+
+
+    def __exit__(self, *exc):
+        REGISTRY.record(self.path, time.perf_counter() - self.start)
+        _local.paths.pop()
+
+
+class _Disabled:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc):
+        pass
+
+
+_DISABLED = _Disabled()
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def span(name: str, label: Optional[str] = None):
+    """
+    Time a block, nested under the spans open in this thread:
+    `with span("render"): ...`. Does nothing while disabled.
+    """
+    if not _enabled:
+        return _DISABLED
+
+    return _Span(name if label is None else f"{name}[{label}]")
+
+
+F = TypeVar("F", bound=Callable)
+
+
+def timed(name: str) -> Callable[[F], F]:
+    """
+    Decorator form of `span`.
+    """
+    def wrap(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+
+            with _Span(name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return wrap
+
+
+def count(name: str, by: float = 1):
+    if _enabled:
+        REGISTRY.count(name, by)
+
+
+def export(path: str):
+    text = REGISTRY.to_prometheus() if path.endswith(".prom") else REGISTRY.to_json()
+    tmp = f"{path}.{os.getpid()}.tmp"
+
+    with open(tmp, "w", encoding="utf-8") as output:
+        output.write(text)
+
+    os.replace(tmp, path)
+
+
+def _at_exit():
+    if not _enabled or not (REGISTRY.spans or REGISTRY.counters):
+        return
+
+    for line in REGISTRY.summary().splitlines():
+        LOGGER.info(line)
+
+    if _export is not None:
+        export(_export)
+        LOGGER.info(f"metrics written to {_export}")
+
+
+def enable(export_to: Optional[str] = None):
+    """
+    Start recording. At exit a summary table is logged and, with
+    `export_to`, the metrics are written there (see `export`).
+    """
+    global _enabled, _export, _exit_registered
+
+    _enabled = True
+    _export = export_to or _export
+
+    if not _exit_registered:
+        atexit.register(_at_exit)
+        _exit_registered = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+_setting = os.environ.get(ENVIRONMENT_VARIABLE, "")
+
+if _setting not in ("", "0"):
+    enable(None if _setting == "1" else _setting)
@@ -1,3 +1,31 @@
-from .layer import Stack
-from .tj import TJLayer
-from .hospitals import HospitalLayer
\ No newline at end of file
+import importlib
+
+# exports are imported on first access, so `import layers.point_store` or a
+# command that only reads points does not load every layer (and folium)
+_EXPORTS = {
+    "Stack": ".layer",
+    "Point": ".point_store",
+    "PointStore": ".point_store",
+    "SpatialIndex": ".spatial",
+    "LayerStats": ".stats",
+    "TJLayer": ".tj",
+    "HospitalLayer": ".hospitals",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    module = _EXPORTS.get(name)
+
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -0,0 +1,84 @@
+import math
+from typing import Iterator, Optional
+import numpy as np
+from .point_store import PointStore
+from .spatial import EARTH_RADIUS_KM, Neighbours
+
+
+# bytes of distance matrix worked on at once; a few temporaries of this size are live
+CHUNK_BYTES = 32 << 20
+
+
+class _Target:
+    """
+    A store's coordinates in the form the haversine kernel wants them,
+    converted once rather than once per chunk.
+    """
+    def __init__(self, store: PointStore) -> None:
+        self.lat = np.radians(store.lat)
+        self.lon = np.radians(store.lon)
+        self.cos = np.cos(self.lat)
+
+
+def _chunks(source: PointStore, target: _Target, chunk_bytes: int) -> Iterator[tuple[slice, np.ndarray]]:
+    """
+    For each run of source rows, the haversine term `a` against every
+    target point as a `(rows, len(target))` matrix. `a` grows with distance,
+    so comparisons can be made on it and `arcsin` only taken where needed.
+    """
+    rows = max(1, chunk_bytes // max(1, 8 * len(target.lat)))
+    lat = np.radians(source.lat)
+    lon = np.radians(source.lon)
+
+    for start in range(0, len(lat), rows):
+        part = slice(start, start + rows)
+        qlat, qlon = lat[part, None], lon[part, None]
+
+        a = np.sin((target.lat - qlat) / 2) ** 2
+        a += np.cos(qlat) * target.cos * np.sin((target.lon - qlon) / 2) ** 2
+
+        yield part, a
+
+
+def _km(a: np.ndarray) -> np.ndarray:
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def nearest(source: PointStore, target: PointStore, *, chunk_bytes: int = CHUNK_BYTES) -> Neighbours:
+    """
+    For every source point, the index of the nearest target point and the
+    distance to it in km (-1 and inf when `target` is empty).
+    """
+    indices = np.full(len(source), -1, dtype=np.int64)
+    distances = np.full(len(source), np.inf)
+
+    if len(target) == 0:
+        return indices, distances
+
+    for part, a in _chunks(source, _Target(target), chunk_bytes):
+        best = np.argmin(a, axis=1)
+        indices[part] = best
+        distances[part] = _km(a[np.arange(len(best)), best])
+
+    return indices, distances
+
+
+def within_radius(source: PointStore, target: PointStore, km: float, values: Optional[np.ndarray] = None, *, chunk_bytes: int = CHUNK_BYTES) -> np.ndarray:
+    """
+    For every source point, how many target points lie within `km`, or,
+    given `values` (one per target point), their sum. NaN values are
+    left out of the sum.
+    """
+    if len(target) == 0 or len(source) == 0:
+        return np.zeros(len(source))
+
+    # compare on the haversine term: d <= km exactly when a <= sin^2(km / 2R)
+    limit = math.sin(min(km / (2 * EARTH_RADIUS_KM), math.pi / 2)) ** 2
+    weights = None if values is None else np.nan_to_num(np.asarray(values, dtype=np.float64), nan=0.0)
+    result = np.empty(len(source))
+
+    for part, a in _chunks(source, _Target(target), chunk_bytes):
+        inside = a <= limit
+        result[part] = inside.sum(axis=1) if weights is None else inside @ weights
+
+    return result
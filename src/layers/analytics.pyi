@@ -0,0 +1,28 @@
+from typing import Optional
+import numpy as np
+from .point_store import PointStore
+from .spatial import Neighbours
+
+CHUNK_BYTES: int
+
+def nearest(source: PointStore, target: PointStore, *, chunk_bytes: int = ...) -> Neighbours:
+    """
+    Nearest `target` point to every `source` point.
+
+    Distances are computed with vectorized haversine over blocks of source
+    rows, each block against all of `target`, so memory stays around
+    `chunk_bytes` whatever the layer sizes.
+
+    :return: Index into `target` and distance in km for each source point;
+        -1 and inf when `target` is empty
+    """
+    ...
+
+def within_radius(source: PointStore, target: PointStore, km: float, values: Optional[np.ndarray] = ..., *, chunk_bytes: int = ...) -> np.ndarray:
+    """
+    Count of `target` points within `km` of every `source` point, or the
+    sum of `values` (one per target point, NaN skipped) over them.
+
+    Processed in blocks of about `chunk_bytes`, like `nearest`.
+    """
+    ...
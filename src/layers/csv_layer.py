@@ -1,9 +1,24 @@
 import abc
 import csv
+import io
+import json
+import math
+import mmap
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Callable, TypedDict, Optional, Iterable, NotRequired
-from .layer import Point
+from typing import Callable, TypedDict, Optional, Iterable, Iterator, NotRequired
+from .detail import BBox, in_bbox
+from .point_store import CHUNK_SIZE, Point, PointStore, PointStoreBuilder
+from .snapshot import Fingerprint, cached_load, callable_identity, snapshot_key
+from .spatial import SpatialIndex
+from .stats import LayerStats
+from .weights import ColumnFunction, to_floats
 from dataclasses import dataclass
+import numpy as np
+from instrumentation import count, timed
 
 
 class PointDict(TypedDict):
@@ -13,21 +28,69 @@ class PointDict(TypedDict):
     w: NotRequired[str]
 
 
+Weight = float | Callable[[list[str]], float] | ColumnFunction
+ColumnSource = str | Callable[[list[str]], float] | ColumnFunction
+
+
+def _floats(name: str, values: list[str], lines: list[int], *, blanks: bool = False) -> np.ndarray:
+    """
+    Convert a column to float64; with `blanks`, blank cells become NaN.
+    """
+    try:
+        return to_floats(values) if blanks else np.array(values, dtype=np.float64)
+    except ValueError:
+        pass
+    
+    # find the offending cell so the error can name its line
+    for value, line_no in zip(values, lines):
+        if blanks and not value.strip():
+            continue
+        
+        try:
+            float(value)
+        except ValueError:
+            raise ValueError(f"could not convert {value!r} in column {name} to a number at line {line_no}")
+    
+    raise AssertionError("unreachable")
+
+
+def _failing_line(fn: ColumnFunction, inputs: dict[str, np.ndarray], lines: list[int]) -> Optional[int]:
+    # a vectorized function fails for the whole batch; find the first row that fails alone
+    for k, line_no in enumerate(lines):
+        try:
+            fn({ name: column[k:k + 1] for name, column in inputs.items() })
+        except Exception:
+            return line_no
+    
+    return None
+
+
+def _per_row(name: str, fn: Callable[[list[str]], float], rows: list[list[str]], lines: list[int]) -> Iterator[float]:
+    for row, line_no in zip(rows, lines):
+        try:
+            yield float(fn(row))
+        except Exception as e:
+            raise ValueError(f"could not compute {name} at line {line_no}: {e}") from e
+
+
 class CSVImporter:
     mapping: PointDict
-    weight: Optional[float | Callable[[list[str]], float]]
+    weight: Optional[Weight]
+    columns: dict[str, ColumnSource]
     __lat_idx: Optional[int] = None
     __lon_idx: Optional[int] = None
     __label_idx: Optional[int] = None
     __weight_idx: Optional[int] = None
+    __column_idx: Optional[dict[str, int]] = None
     
-    def __init__(self, mapping: PointDict, weight: Optional[float | Callable[[list[str]], float]] = None):
+    def __init__(self, mapping: PointDict, weight: Optional[Weight] = None, columns: Optional[dict[str, ColumnSource]] = None):
         self.mapping = mapping
         
         if "w" not in mapping and weight is None:
             raise ValueError('w was not provided in mapping, nor a weight generation method')
         
         self.weight = weight
+        self.columns = columns or {}
         
     
     @classmethod
@@ -35,6 +98,20 @@ class CSVImporter:
         return cls({ "lat": "lat", "lon": "lon", "label": "label", "w": "w" })    
     
     
+    def fingerprint(self) -> Optional[str]:
+        identities = {}
+        
+        for name, source in { "weight": self.weight, **{ f"column:{k}": v for k, v in self.columns.items() } }.items():
+            identity = callable_identity(source) if callable(source) else repr(source)
+            
+            if identity is None:
+                return None
+            
+            identities[name] = identity
+        
+        return json.dumps({ "mapping": self.mapping, **identities }, sort_keys=True)
+    
+    
     def __label(self, header: list[str], row: list[str]) -> str:
         if self.__label_idx is not None:
             return row[self.__label_idx]
@@ -72,6 +149,9 @@ class CSVImporter:
     
     
     def __w(self, header: list[str], row: list[str]) -> str | float:
+        if isinstance(self.weight, ColumnFunction):
+            return self.weight.row(header, row)
+        
         if self.weight is not None:
             return self.weight(row) if callable(self.weight) else self.weight
         
@@ -88,49 +168,326 @@ class CSVImporter:
         return row[self.__weight_idx]
     
     
+    def __columns(self, header: list[str], row: list[str]) -> dict[str, float]:
+        if self.__column_idx is None:
+            indices = {}
+            
+            for name, source in self.columns.items():
+                if callable(source):
+                    continue
+                
+                try:
+                    indices[name] = header.index(source)
+                except ValueError:
+                    raise TypeError(f"{source} is not in the header")
+            
+            self.__column_idx = indices
+        
+        result = {}
+        
+        for name, source in self.columns.items():
+            if isinstance(source, ColumnFunction):
+                result[name] = source.row(header, row)
+            elif callable(source):
+                result[name] = float(source(row))
+            else:
+                # blank cells become NaN so a missing value is never mistaken for 0
+                value = row[self.__column_idx[name]].strip()
+                result[name] = float(value) if value else math.nan
+        
+        return result
+    
+    
     def __call__(self, header: list[str], row: list[str]) -> Point:
         label = self.__label(header, row)
         lat = float(self.__lat(header, row))
         lon = float(self.__lon(header, row))
         w = float(self.__w(header, row))
         
-        return Point(lat=lat, lon=lon, w=w, label=label)
-
+        point = Point(lat=lat, lon=lon, w=w, label=label)
         
-def csv_points(file: str, transformer: Optional[Callable[[list[str], list[str]], Point]] = None):
-    if transformer is None:
-        transformer = CSVImporter.default()
+        if self.columns:
+            point["columns"] = self.__columns(header, row)
+        
+        return point
     
-    p = Path(file)
     
-    if not p.suffix.lower() == ".csv":
-        raise RuntimeError(f"cannot read from {file}")
+    def projection(self, header: list[str]) -> Optional[list[int]]:
+        """
+        Indices of the columns `build` reads, in header order, or None when a
+        per-row function needs whole rows.
+        """
+        names = [self.mapping["label"], self.mapping["lat"], self.mapping["lon"]]
+        
+        for source in (self.weight, *self.columns.values()):
+            if isinstance(source, ColumnFunction):
+                names.extend(source.columns)
+            elif isinstance(source, str):
+                names.append(source)
+            elif callable(source):
+                return None
+        
+        if self.weight is None:
+            names.append(self.mapping["w"])
+        
+        return sorted({ self.__index(header, name) for name in names })
     
-    points = []
     
-    with open(file, "r", newline="", encoding="utf-8") as output:
-        r = csv.DictReader(output)
+    @staticmethod
+    def __index(header: list[str], name: str) -> int:
+        try:
+            return header.index(name)
+        except ValueError:
+            raise TypeError(f"{name} is not in the header")
+    
+    
+    def __evaluate(self, name: str, source: Weight | ColumnSource, header: list[str], rows: list[list[str]], lines: list[int]) -> np.ndarray:
+        if isinstance(source, ColumnFunction):
+            inputs = { column: _floats(column, [row[i] for row in rows], lines, blanks=True) for column, i in ((column, self.__index(header, column)) for column in source.columns) }
+            
+            try:
+                result = source(inputs)
+            except Exception as e:
+                line_no = _failing_line(source, inputs, lines)
+                raise ValueError(f"{source.__qualname__} failed for {name}" + ("" if line_no is None else f" at line {line_no}") + f": {e}") from e
+            
+            if result.shape != (len(rows),):
+                raise ValueError(f"{source.__qualname__} returned shape {result.shape} for {len(rows)} rows")
+            
+            return result
         
-        if r.fieldnames is None:
-            raise ValueError("CSV has no header row")
+        if callable(source):
+            # per-row functions still work, one call per row
+            return np.fromiter(_per_row(name, source, rows, lines), dtype=np.float64, count=len(rows))
         
-        fieldnames = [h.strip() for h in r.fieldnames]
-        r.fieldnames = fieldnames
+        if isinstance(source, str):
+            i = self.__index(header, source)
+            return _floats(source, [row[i] for row in rows], lines, blanks=True)
         
-        for line_no, row in enumerate(r, start=2):
-            if row is None:
-                continue
+        return np.full(len(rows), float(source))
+    
+    
+    def build(self, header: list[str], rows: list[list[str]], lines: list[int]) -> PointStore:
+        """
+        Convert many rows at once: every field is looked up by a column index
+        resolved once, and numbers are converted a column at a time.
+        """
+        label_idx = self.__index(header, self.mapping["label"])
+        lat_idx = self.__index(header, self.mapping["lat"])
+        lon_idx = self.__index(header, self.mapping["lon"])
+        
+        lat = _floats(self.mapping["lat"], [row[lat_idx] for row in rows], lines)
+        lon = _floats(self.mapping["lon"], [row[lon_idx] for row in rows], lines)
+        
+        if self.weight is not None:
+            w = self.__evaluate("weight", self.weight, header, rows, lines)
+        else:
+            w_idx = self.__index(header, self.mapping["w"])
+            w = _floats(self.mapping["w"], [row[w_idx] for row in rows], lines)
+        
+        interned: dict[str, int] = {}
+        label_ids = np.fromiter((interned.setdefault(row[label_idx], len(interned)) for row in rows), dtype=np.uint32, count=len(rows))
+        
+        columns = { name: self.__evaluate(name, source, header, rows, lines) for name, source in self.columns.items() }
+        
+        return PointStore(lat, lon, w, label_ids, list(interned), columns)
 
-            if all((v is None or str(v).strip() == "") for v in row.values()):
-                continue
+        
+@contextmanager
+def _open_lines(file: str, memory_map: bool) -> Iterator[Iterable[str]]:
+    if not memory_map:
+        with open(file, "r", newline="", encoding="utf-8") as output:
+            yield output
+        return
+    
+    with open(file, "rb") as output:
+        if os.fstat(output.fileno()).st_size == 0:
+            yield iter(())
+            return
+        
+        with mmap.mmap(output.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield (line.decode("utf-8") for line in iter(mm.readline, b""))
+
+
+def _records(output: Iterable[str], width: int, keep: Optional[list[int]], first_line: int = 1) -> Iterator[tuple[int, list[str]]]:
+    """
+    `(line number, row)` for every non-blank record, with each row cut down
+    to the `keep` columns.
+    """
+    reader = csv.reader(output)
+    
+    for row in reader:
+        if not row or not any(cell.strip() for cell in row):
+            continue
+        
+        line_no = first_line + reader.line_num - 1
+        
+        if len(row) != width:
+            raise ValueError(
+                f"Row length mismatch at line {line_no}: "
+                f"expected {width} fields, got {len(row)}"
+            )
+        
+        yield line_no, row if keep is None else [row[i] for i in keep]
+
+
+def _header(file: str) -> tuple[list[str], int, int]:
+    """
+    The stripped header names, the byte offset just past the header, and
+    the line the first record starts on.
+    """
+    with open(file, "r", newline="", encoding="utf-8") as f:
+        reader = csv.reader(iter(f.readline, ""))
+        header = next(reader, None)
+        
+        if header is None:
+            raise ValueError("CSV has no header row")
+        
+        # text-mode tell() is opaque; measure the header's bytes instead
+        lines = reader.line_num
+    
+    with open(file, "rb") as f:
+        offset = sum(len(f.readline()) for _ in range(lines))
+    
+    return [h.strip() for h in header], offset, lines + 1
+
+
+def _split(file: str, start: int, chunk_bytes: int) -> list[tuple[int, int, int]]:
+    """
+    Cut the file after `start` into `(start, end, first line)` ranges of
+    about `chunk_bytes`, each ending on a line break outside any quoted field.
+    """
+    with open(file, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        size = len(mm)
+        chunks = []
+        line = 0
+        
+        while start < size:
+            end = min(start + chunk_bytes, size)
             
-            if len(row) != len(fieldnames):
-                raise ValueError(
-                    f"Row length mismatch at line {line_no}: "
-                    f"expected {len(fieldnames)} fields, got {len(row)}"
-                )
+            # move forward until the quotes seen so far are balanced
+            while end < size:
+                newline = mm.find(b"\n", end)
+                
+                if newline == -1:
+                    end = size
+                    break
+                
+                end = newline + 1
+                
+                if mm[start:end].count(b'"') % 2 == 0:
+                    break
             
-            points.append(transformer(fieldnames, list(row.values())))
+            chunks.append((start, end, line))
+            line += mm[start:end].count(b"\n")
+            start = end
+    
+    return chunks
+
+
+def _parse_chunk(job: tuple) -> PointStore:
+    file, start, end, first_line, header, keep, transformer = job
+    
+    with open(file, "rb") as f:
+        f.seek(start)
+        text = f.read(end - start).decode("utf-8")
+    
+    rows, lines = [], []
+    
+    for line_no, row in _records(io.StringIO(text, newline=""), len(header), keep, first_line):
+        rows.append(row)
+        lines.append(line_no)
+    
+    return transformer.build(header if keep is None else [header[i] for i in keep], rows, lines)
+
+
+@contextmanager
+def _table(file: str, transformer: Callable[[list[str], list[str]], Point], memory_map: bool) -> Iterator[tuple[list[str], Iterator[tuple[int, list[str]]]]]:
+    """
+    The header the transformer sees and its `(line number, row)` records,
+    projected to the columns a `CSVImporter` reads.
+    """
+    fieldnames, _, first_line = _header(file)
+    
+    # only the columns the importer reads are kept past the reader
+    keep = transformer.projection(fieldnames) if isinstance(transformer, CSVImporter) else None
+    
+    with _open_lines(file, memory_map) as output:
+        records = iter(output)
+        
+        # the header may span several physical lines
+        for _ in range(first_line - 1):
+            next(records, None)
+        
+        yield fieldnames if keep is None else [fieldnames[i] for i in keep], _records(records, len(fieldnames), keep, first_line)
+
+
+@timed("csv.load")
+def load_csv(file: str, transformer: Callable[[list[str], list[str]], Point], *, memory_map: bool = False, workers: int = 1, chunk_bytes: int = 4 << 20) -> PointStore:
+    if not isinstance(transformer, CSVImporter):
+        builder = PointStoreBuilder()
+        
+        with _table(file, transformer, memory_map) as (header, records):
+            for _, row in records:
+                builder.append(transformer(header, row))
+        
+        return builder.build()
+    
+    if workers > 1 and os.path.getsize(file) > chunk_bytes:
+        fieldnames, offset, first_line = _header(file)
+        keep = transformer.projection(fieldnames)
+        
+        chunks = _split(file, offset, chunk_bytes)
+        jobs = [(file, start, end, first_line + line, fieldnames, keep, transformer) for start, end, line in chunks]
+        
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return PointStore.concat(list(pool.map(_parse_chunk, jobs)))
+    
+    rows: list[list[str]] = []
+    lines: list[int] = []
+    
+    with _table(file, transformer, memory_map) as (header, records):
+        for line_no, row in records:
+            rows.append(row)
+            lines.append(line_no)
+    
+    return transformer.build(header, rows, lines)
+
+
+def _batch(transformer: Callable[[list[str], list[str]], Point], header: list[str], rows: list[list[str]], lines: list[int]) -> PointStore:
+    if isinstance(transformer, CSVImporter):
+        return transformer.build(header, rows, lines)
+    
+    return PointStore.from_points(transformer(header, row) for row in rows)
+
+
+def iter_csv(file: str, transformer: Callable[[list[str], list[str]], Point], chunk_size: int = CHUNK_SIZE, *, memory_map: bool = False) -> Iterator[PointStore]:
+    rows: list[list[str]] = []
+    lines: list[int] = []
+    
+    with _table(file, transformer, memory_map) as (header, records):
+        for line_no, row in records:
+            rows.append(row)
+            lines.append(line_no)
+            
+            if len(rows) == chunk_size:
+                count("csv.batches")
+                yield _batch(transformer, header, rows, lines)
+                rows, lines = [], []
+        
+        if rows:
+            count("csv.batches")
+            yield _batch(transformer, header, rows, lines)
+
+        
+def csv_points(file: str, transformer: Optional[Callable[[list[str], list[str]], Point]] = None, *, memory_map: bool = False, snapshot: Optional[Fingerprint] = "stat", in_memory: bool = True, workers: int = 1, chunk_bytes: int = 4 << 20):
+    if transformer is None:
+        transformer = CSVImporter.default()
+    
+    p = Path(file)
+    
+    if not p.suffix.lower() == ".csv":
+        raise RuntimeError(f"cannot read from {file}")
     
     
     def result(cls):
@@ -139,15 +496,81 @@ def csv_points(file: str, transformer: Optional[Callable[[list[str], list[str]],
         if existing is not None and not getattr(existing, "__isabstractmethod__", False):
             raise TypeError(f"{cls.__name__} already has a concrete point_list")
         
-        if any("_p" in base.__dict__ for base in cls.__mro__):
-            raise TypeError(f"{cls.__name__} has state _p")
+        if any(state in base.__dict__ for base in cls.__mro__ for state in ("_p", "_index", "_stats")):
+            raise TypeError(f"{cls.__name__} has state _p, _index or _stats")
               
-        cls._p = points
+        cls._p = None
+        cls._index = None
+        cls._stats = None
+        lock = threading.Lock()
+        index_lock = threading.Lock()
+        
+        def load() -> PointStore:
+            # double-checked so concurrent first calls parse the file once
+            if cls._p is None:
+                with lock:
+                    if cls._p is None:
+                        parse = lambda: load_csv(file, transformer, memory_map=memory_map, workers=workers, chunk_bytes=chunk_bytes)
+                        cls._p = parse() if snapshot is None else cached_load(file, transformer, parse, snapshot)
+            
+            return cls._p
         
         def point_list(self):
-            return self._p
+            return load()
+        
+        def preload(klass):
+            load()
+        
+        def spatial_index(self) -> SpatialIndex:
+            if cls._index is None:
+                with index_lock:
+                    if cls._index is None:
+                        cls._index = SpatialIndex(load())
+            
+            return cls._index
+        
+        def iter_chunks(self, chunk_size: int = CHUNK_SIZE, bbox: Optional[BBox] = None) -> Iterator[PointStore]:
+            if in_memory or cls._p is not None:
+                store = load()
+                
+                if bbox is not None:
+                    index = spatial_index(self)
+                    store = index.store.take(index.in_bbox(*bbox))
+                
+                yield from store.chunks(chunk_size)
+                return
+            
+            # out of core: parse the file again on every pass, one batch at a time
+            for chunk in iter_csv(file, transformer, chunk_size, memory_map=memory_map):
+                yield chunk if bbox is None else chunk.take(in_bbox(chunk, bbox))
+        
+        def stats(self) -> LayerStats:
+            # racing threads compute the same value
+            if cls._stats is None:
+                cls._stats = LayerStats.of(load()) if in_memory else LayerStats.combine(LayerStats.of(chunk) for chunk in iter_chunks(self))
+            
+            return cls._stats
+        
+        def invalidate(self):
+            with lock, index_lock:
+                cls._p = None
+                cls._index = None
+                cls._stats = None
+        
+        def fingerprint(self) -> Optional[str]:
+            return snapshot_key(file, transformer, snapshot or "stat")
+        
+        def sources(self) -> list[str]:
+            return [file]
         
         cls.point_list = point_list
+        cls.preload = classmethod(preload)
+        cls.spatial_index = spatial_index
+        cls.iter_chunks = iter_chunks
+        cls.stats = stats
+        cls.invalidate = invalidate
+        cls.fingerprint = fingerprint
+        cls.sources = sources
         abc.update_abstractmethods(cls)
         
         return cls
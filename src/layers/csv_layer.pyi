@@ -1,15 +1,22 @@
 from collections.abc import Callable
-from typing import Optional, Self, TypedDict, TypeVar
+from typing import Iterator, Optional, Self, TypedDict, TypeVar
 from .layer import Point
+from .point_store import PointStore
+from .snapshot import Fingerprint
+from .weights import ColumnFunction
 
 class PointDict(TypedDict):
     lat: str
     lon: str
     label: str
 
+Weight = float | Callable[[list[str]], float] | ColumnFunction
+ColumnSource = str | Callable[[list[str]], float] | ColumnFunction
+
 class CSVImporter:
     mapping: PointDict
-    weight: Optional[float | Callable[[list[str]], float]]
+    weight: Optional[Weight]
+    columns: dict[str, ColumnSource]
 
     @classmethod
     def default(cls: type[Self]) -> Self: 
@@ -26,22 +33,148 @@ class CSVImporter:
         """
         ...
 
-    def __init__(self, mapping: PointDict, weight: Optional[float | Callable[[list[str]], float]] = ...) -> None: ...
-    def __call__(self, header: list[str], row: list[str]) -> Point: ...
+    def __init__(self, mapping: PointDict, weight: Optional[Weight] = ..., columns: Optional[dict[str, ColumnSource]] = ...) -> None:
+        """
+        :param weight: A constant, a function of the row, or a `vectorized`
+            function of whole columns; None to read `mapping["w"]`
+        :param columns: Extra numeric columns to keep, by name: a header to
+            read (blank cells become NaN), a function of the row, or a
+            `vectorized` function of whole columns
+        """
+        ...
+
+    def fingerprint(self) -> Optional[str]:
+        """
+        Stable identity of this importer's mapping, weight and column
+        functions, used to key parsed-layer snapshots. None if a function
+        cannot be identified (e.g. a lambda), in which case snapshots are
+        skipped.
+        """
+        ...
+    def __call__(self, header: list[str], row: list[str]) -> Point:
+        """
+        Convert one row. `vectorized` functions are evaluated on that row alone.
+        """
+        ...
+
+    def build(self, header: list[str], rows: list[list[str]], lines: list[int]) -> PointStore:
+        """
+        Convert a whole table at once. Column indices are resolved once and
+        numbers are converted a column at a time; `vectorized` functions are
+        called once. `load_csv` uses this for importers.
+
+        :param lines: Source line number of each row, for error messages
+        :raises ValueError: If a cell is not a number, or a weight or column
+            function fails; the message names the line of the first row
+            that fails
+        """
+        ...
+
+    def projection(self, header: list[str]) -> Optional[list[int]]:
+        """
+        Sorted indices of the header columns this importer reads, so the
+        loader can drop the rest of each row. None when a plain per-row
+        function may read any column.
+        """
+        ...
     
 _C = TypeVar("_C", bound=type)
 
+def load_csv(
+    file: str,
+    transformer: Callable[[list[str], list[str]], Point],
+    *,
+    memory_map: bool = ...,
+    workers: int = ...,
+    chunk_bytes: int = ...,
+) -> PointStore:
+    """
+    Parse a CSV file into a `PointStore`
+    
+    :param file: A path to a .csv file
+    :type file: str
+    :param transformer: A function that, given the headers of a CSV file and their corresponding rows, produces a Point
+    :type transformer: Callable[[list[str], list[str]], Point]
+    :param memory_map: Read the file through `mmap` instead of buffered reads
+    :type memory_map: bool
+    :param workers: Processes to parse a `CSVImporter` file with. Files larger
+        than `chunk_bytes` are split at record boundaries and the chunks parsed
+        in parallel; 1 parses in this process
+    :type workers: int
+    :param chunk_bytes: Target size of each parallel chunk
+    :type chunk_bytes: int
+    :return: The parsed points
+    :rtype: PointStore
+    """
+    ...
+
+def iter_csv(
+    file: str,
+    transformer: Callable[[list[str], list[str]], Point],
+    chunk_size: int = ...,
+    *,
+    memory_map: bool = ...,
+) -> Iterator[PointStore]:
+    """
+    Parse a CSV file into `PointStore`s of at most `chunk_size` points,
+    reading one batch of rows at a time, so memory use does not grow with
+    the file. `vectorized` functions are called once per batch.
+    
+    :param file: A path to a .csv file
+    :type file: str
+    :param transformer: As for `load_csv`
+    :type transformer: Callable[[list[str], list[str]], Point]
+    :param chunk_size: Points per batch
+    :type chunk_size: int
+    :param memory_map: Read the file through `mmap` instead of buffered reads
+    :type memory_map: bool
+    """
+    ...
+
 def csv_points(
     file: str,
     transformer: Optional[Callable[[list[str], list[str]], Point]] = ...,
+    *,
+    memory_map: bool = ...,
+    snapshot: Optional[Fingerprint] = ...,
+    in_memory: bool = ...,
+    workers: int = ...,
+    chunk_bytes: int = ...,
 ) -> Callable[[_C], _C]: 
     """
     Decorator to implement LayerPointProvider from a CSV file
     
+    The decorated class's `point_list()` returns a `PointStore`. The file is
+    not read when the class is decorated; it is parsed on the first call to
+    `point_list()` (or `preload()`), once per class, and shared by every
+    instance afterwards. The same holds for `spatial_index()` and
+    `stats()`, which are built over those points on first use.
+    
+    Parsed points are saved next to the file as `<file>.snap` and loaded
+    through `mmap` on later runs, as long as the file and the transformer
+    are unchanged.
+    
+    With `in_memory=False` the class also streams: `iter_chunks()` parses
+    the file a batch at a time on every call (through `iter_csv`) until
+    something loads the whole file, and `stats()` is summed over those
+    batches, so layers larger than memory can be rendered.
+    
     :param file: A path to a .csv file
     :type file: str
     :param transformer: A function that, given the headers of a CSV file and their corresponding rows, produces a Point
     :type transformer: Optional[Callable[[list[str], list[str]], Point]]
+    :param memory_map: Read the file through `mmap` instead of buffered reads
+    :type memory_map: bool
+    :param snapshot: How to detect a changed source file: `"stat"` (size and mtime), `"content"` (size and hash), or None to disable snapshots
+    :type snapshot: Optional[Fingerprint]
+    :param in_memory: Load the whole file once and serve `iter_chunks()`
+        from memory; False streams it from disk instead
+    :type in_memory: bool
+    :param workers: Processes to parse the whole file with, as for `load_csv`.
+        The points, and so the snapshot, are the same for any worker count
+    :type workers: int
+    :param chunk_bytes: Target size of each parallel chunk, as for `load_csv`
+    :type chunk_bytes: int
     :return: A decorated class
     :rtype: Callable[[_C], _C]
     """
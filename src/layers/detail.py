@@ -0,0 +1,129 @@
+import math
+from dataclasses import dataclass
+import numpy as np
+from .point_store import PointStore
+from .tiles import TILE_SIZE, project
+
+
+BBox = tuple[float, float, float, float]
+
+DEFAULT_ZOOM = 5
+MAX_ZOOM = 18
+
+
+@dataclass(frozen=True)
+class LevelOfDetail:
+    marker_min_zoom: int = 0
+    aggregate_below_zoom: int = 0
+    aggregate_pixels: int = 8
+
+
+    def markers(self, zoom: int) -> bool:
+        return zoom >= self.marker_min_zoom
+
+
+    def aggregate(self, zoom: int) -> bool:
+        return zoom < self.aggregate_below_zoom
+
+
+def fit_zoom(bbox: BBox, width: int = 1024, height: int = 768) -> int:
+    """
+    The largest zoom at which `bbox` fits in a `width` x `height` pixel map.
+    """
+    south, west, north, east = bbox
+    span = east - west if west <= east else east + 360 - west
+
+    x0, y0 = project(np.array([north]), np.array([west]), 0)
+    x1, y1 = project(np.array([south]), np.array([west + span]), 0)
+
+    zooms = [MAX_ZOOM]
+
+    for pixels, extent in ((width, float(x1[0] - x0[0])), (height, float(y1[0] - y0[0]))):
+        if extent > 0:
+            zooms.append(math.floor(math.log2(pixels / extent)))
+
+    return max(0, min(zooms))
+
+
+def bbox_center(bbox: BBox) -> tuple[float, float]:
+    south, west, north, east = bbox
+    span = east - west if west <= east else east + 360 - west
+    lon = west + span / 2
+
+    return (south + north) / 2, lon - 360 if lon > 180 else lon
+
+
+def in_bbox(store: PointStore, bbox: BBox) -> np.ndarray:
+    """
+    Mask of the points of `store` inside `bbox`.
+    """
+    south, west, north, east = bbox
+
+    inside = (store.lat >= south) & (store.lat <= north)
+    inside &= ((store.lon >= west) & (store.lon <= east)) if west <= east else ((store.lon >= west) | (store.lon <= east))
+
+    return inside
+
+
+class Aggregator:
+    """
+    `aggregate` over a stream of stores: memory grows with the number of
+    occupied cells, not with the number of points.
+    """
+
+    def __init__(self, zoom: int, pixels: int) -> None:
+        self.zoom = zoom
+        self.pixels = pixels
+        self.__cells = np.empty(0, dtype=np.int64)
+        # per cell: count, w, w * lat, w * lon, lat, lon
+        self.__sums = np.empty((6, 0))
+
+
+    def __len__(self) -> int:
+        return len(self.__cells)
+
+
+    def add(self, store: PointStore) -> "Aggregator":
+        if len(store) == 0:
+            return self
+
+        x, y = project(store.lat, store.lon, self.zoom)
+        width = TILE_SIZE * (1 << self.zoom) // self.pixels + 1
+        cells = (y // self.pixels).astype(np.int64) * width + (x // self.pixels).astype(np.int64)
+
+        values = np.vstack((np.ones(len(store)), store.w, store.w * store.lat, store.w * store.lon, store.lat, store.lon))
+
+        # fold the new points into the running per-cell sums
+        self.__cells, group = np.unique(np.concatenate((self.__cells, cells)), return_inverse=True)
+        values = np.concatenate((self.__sums, values), axis=1)
+        self.__sums = np.vstack([np.bincount(group, weights=row, minlength=len(self.__cells)) for row in values])
+
+        return self
+
+
+    def result(self) -> PointStore:
+        if len(self) == 0:
+            return PointStore.empty()
+
+        count, w, w_lat, w_lon, lat, lon = self.__sums
+
+        # centroids are weighted, unless a cell's weights sum to zero
+        weighted = w != 0
+        by = np.where(weighted, w, count)
+
+        return PointStore(
+            np.where(weighted, w_lat, lat) / by,
+            np.where(weighted, w_lon, lon) / by,
+            w,
+            np.zeros(len(self), dtype=np.uint32),
+            [""],
+        )
+
+
+def aggregate(store: PointStore, zoom: int, pixels: int) -> PointStore:
+    """
+    Merge the points falling in each `pixels`-sized square of the map at
+    `zoom` into one point at their weighted centroid carrying their summed
+    weight. Labels are dropped; the result is meant for heat maps.
+    """
+    return Aggregator(zoom, pixels).add(store).result()
@@ -0,0 +1,94 @@
+from dataclasses import dataclass
+import numpy as np
+from .point_store import PointStore
+
+BBox = tuple[float, float, float, float]
+"""
+`(south, west, north, east)` in decimal degrees
+"""
+
+DEFAULT_ZOOM: int
+MAX_ZOOM: int
+
+@dataclass(frozen=True)
+class LevelOfDetail:
+    """
+    Per-layer rendering rules keyed on the zoom a map is rendered for.
+
+    :var marker_min_zoom: Markers are drawn only at this zoom or closer
+    :vartype marker_min_zoom: int
+    :var aggregate_below_zoom: Below this zoom the heat map is fed
+        aggregated points (see `aggregate`) instead of every point
+    :vartype aggregate_below_zoom: int
+    :var aggregate_pixels: Size in screen pixels of the aggregation cells
+    :vartype aggregate_pixels: int
+    """
+    marker_min_zoom: int = ...
+    aggregate_below_zoom: int = ...
+    aggregate_pixels: int = ...
+
+    def markers(self, zoom: int) -> bool:
+        """
+        Whether markers are drawn at `zoom`
+        """
+        ...
+
+    def aggregate(self, zoom: int) -> bool:
+        """
+        Whether heat data is aggregated at `zoom`
+        """
+        ...
+
+def fit_zoom(bbox: BBox, width: int = ..., height: int = ...) -> int:
+    """
+    The largest zoom level at which `bbox` fits in a map of `width` x
+    `height` pixels.
+    """
+    ...
+
+def bbox_center(bbox: BBox) -> tuple[float, float]:
+    """
+    `(lat, lon)` of the middle of `bbox`, handling boxes across the antimeridian
+    """
+    ...
+
+def in_bbox(store: PointStore, bbox: BBox) -> np.ndarray:
+    """
+    Boolean mask of the points of `store` inside `bbox`, for batches that
+    have no `SpatialIndex`
+    """
+    ...
+
+class Aggregator:
+    """
+    Incremental `aggregate`: `add` batches of points one at a time, then
+    take the `result`. Only the running sums of each occupied cell are
+    kept, so a layer can be aggregated from `iter_chunks()` without ever
+    being in memory as a whole.
+    """
+    zoom: int
+    pixels: int
+
+    def __init__(self, zoom: int, pixels: int) -> None: ...
+    def __len__(self) -> int:
+        """
+        Number of occupied cells so far
+        """
+        ...
+    def add(self, store: PointStore) -> Aggregator: ...
+    def result(self) -> PointStore:
+        """
+        One point per occupied cell, as returned by `aggregate`
+        """
+        ...
+
+def aggregate(store: PointStore, zoom: int, pixels: int) -> PointStore:
+    """
+    Downsample `store` for a heat map rendered at `zoom`.
+
+    Points in the same `pixels`-sized square of the web-mercator map are
+    merged into one point at their weighted centroid with their summed
+    weight, so the heat map looks much the same with far fewer points.
+    Labels are not kept.
+    """
+    ...
@@ -0,0 +1,99 @@
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Optional
+import folium
+from branca.element import Element, MacroElement
+from instrumentation import span
+from .detail import BBox
+from .payload import PayloadOptions
+from .stats import LayerStats
+
+
+class _Rendered(Element):
+    """
+    Text that was rendered elsewhere; it is emitted as is, not run through
+    Jinja again.
+    """
+    def __init__(self, text: str) -> None:
+        super().__init__()
+        self.text = text
+
+
+    def render(self, **kwargs) -> str:
+        return self.text
+
+
+Parts = list[tuple[str, str]]
+
+
+@dataclass
+class Fragment:
+    header: Parts = field(default_factory=list)
+    html: Parts = field(default_factory=list)
+    script: Parts = field(default_factory=list)
+    assets: list[str] = field(default_factory=list)
+
+
+class LayerFragment(MacroElement):
+    """
+    A layer rendered to text ahead of time, put in place when the map renders.
+    """
+    def __init__(self, fragment: Fragment) -> None:
+        super().__init__()
+        self._name = "LayerFragment"
+        self.fragment = fragment
+
+
+    def render(self, **kwargs):
+        figure = self.get_root()
+
+        for section, parts in ((figure.header, self.fragment.header), (figure.html, self.fragment.html), (figure.script, self.fragment.script)):
+            for name, text in parts:
+                section.add_child(_Rendered(text), name=name)
+
+
+def capture(layer, map_id: str, bbox: Optional[BBox], zoom: int, payload: Optional[PayloadOptions] = None) -> tuple[Fragment, LayerStats]:
+    """
+    Render `layer` onto a scratch map that shares `map_id` with the real
+    one, so its scripts refer to the right map variable, and keep only what
+    the layer added to the page.
+    """
+    scratch = folium.Map(tiles=None)
+    scratch._id = map_id
+
+    figure = scratch.get_root()
+    sections = (figure.header, figure.html, figure.script)
+    before = [set(section._children) for section in sections]
+
+    stats = layer.add_to_map(scratch, zoom=zoom, bbox=bbox, payload=payload)
+
+    with span("html"):
+        for child in list(scratch._children.values()):
+            child.render()
+
+    header, html, script = (
+        [(name, element.render()) for name, element in section._children.items() if name not in seen]
+        for section, seen in zip(sections, before)
+    )
+
+    # files written for the page: payloads and tile pyramids
+    assets = [child.asset for child in scratch._children.values() if getattr(child, "asset", None) is not None]
+
+    return Fragment(header, html, script, assets), stats
+
+
+def _capture(job: tuple) -> tuple[Fragment, LayerStats]:
+    return capture(*job)
+
+
+def capture_all(layers: list, map_id: str, bbox: Optional[BBox], zoom: int, workers: int, payload: Optional[PayloadOptions] = None) -> list[tuple[Fragment, LayerStats]]:
+    """
+    `capture` every layer in a pool of `workers` processes, in layer order.
+    """
+    jobs = [(layer, map_id, bbox, zoom, payload) for layer in layers]
+
+    if workers <= 1 or len(jobs) <= 1:
+        return [_capture(job) for job in jobs]
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+        return list(pool.map(_capture, jobs))
@@ -0,0 +1,54 @@
+from dataclasses import dataclass
+from typing import Optional
+from branca.element import MacroElement
+from .detail import BBox
+from .layer import Layer
+from .payload import PayloadOptions
+from .stats import LayerStats
+
+Parts = list[tuple[str, str]]
+"""
+`(element name, rendered text)` pairs for one section of the page
+"""
+
+@dataclass
+class Fragment:
+    """
+    What one layer contributes to each section of a folium page, already
+    rendered to text, so it can be produced in another process.
+
+    :var header: Script and stylesheet links, and header markup
+    :var html: Body markup
+    :var script: JavaScript run after the map is created
+    :var assets: Files and directories written for the page (payload
+        files, tile pyramids) that the text refers to
+    """
+    header: Parts = ...
+    html: Parts = ...
+    script: Parts = ...
+    assets: list[str] = ...
+
+class LayerFragment(MacroElement):
+    """
+    Places a `Fragment` in the page when its map renders. Entries share
+    names with the elements they were rendered from, so links shared by
+    several layers appear once.
+    """
+    fragment: Fragment
+
+    def __init__(self, fragment: Fragment) -> None: ...
+
+def capture(layer: Layer, map_id: str, bbox: Optional[BBox], zoom: int, payload: Optional[PayloadOptions] = None) -> tuple[Fragment, LayerStats]:
+    """
+    Render `layer` as it would be drawn on the map whose `_id` is `map_id`.
+
+    :return: The layer's fragment and the statistics of the points drawn
+    """
+    ...
+
+def capture_all(layers: list[Layer], map_id: str, bbox: Optional[BBox], zoom: int, workers: int, payload: Optional[PayloadOptions] = None) -> list[tuple[Fragment, LayerStats]]:
+    """
+    `capture` every layer across up to `workers` processes; results are in
+    layer order.
+    """
+    ...
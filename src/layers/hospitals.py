@@ -1,31 +1,34 @@
 from .layer import Layer, LayerPointProvider
 from .csv_layer import csv_points, CSVImporter
-from typing import cast, Optional
-import math
-import folium
+from .weights import Columns, vectorized
+from typing import TYPE_CHECKING, cast
+import numpy as np
+
+if TYPE_CHECKING:
+    import folium
+    from .markers import MarkerMode
 
 
 HOSPITAL_LAYER_NAME = "Hospitals"
-COLUMNS = ["ID","NAME","ADDRESS","CITY","STATE","ZIP","ZIP4","TELEPHONE","TYPE","STATUS","POPULATION","COUNTY","COUNTYFIPS","COUNTRY","LATITUDE","LONGITUDE","NAICS_CODE","NAICS_DESC","SOURCE","SOURCEDATE","VAL_METHOD","VAL_DATE","WEBSITE","STATE_ID","ALT_NAME","ST_FIPS","OWNER","TTL_STAFF","BEDS","TRAUMA","HELIPAD"]
 
 
-def _beds(row: list[str]) -> Optional[float]:
-    beds = float(row[COLUMNS.index("BEDS")])
-    return None if beds < 0 else beds
+@vectorized("BEDS")
+def hospital_beds(columns: Columns) -> np.ndarray:
+    beds = columns["BEDS"]
+    # the source marks unknown bed counts with negative values
+    return np.where(beds < 0, np.nan, beds)
 
 
-def hospital_weight(row: list[str]) -> float:
-    beds = _beds(row)
-    
-    if beds is None:
-        return 0.3
+@vectorized("BEDS")
+def hospital_weight(columns: Columns) -> np.ndarray:
+    beds = hospital_beds(columns)
     
-    score = math.log1p(max(beds, 0)) ** 1.15
+    score = np.log1p(np.maximum(np.nan_to_num(beds), 0)) ** 1.15
     
-    return 0.5 + min(score / 8.0, 1.0) * 1.5
+    return np.where(np.isnan(beds), 0.3, 0.5 + np.minimum(score / 8.0, 1.0) * 1.5)
 
     
-HOSPITAL_IMPORTER = CSVImporter({ "label": "NAME", "lat": "LATITUDE", "lon": "LONGITUDE" }, hospital_weight)
+HOSPITAL_IMPORTER = CSVImporter({ "label": "NAME", "lat": "LATITUDE", "lon": "LONGITUDE" }, hospital_weight, { "beds": hospital_beds })
 
 
 @csv_points("data/hospitals.csv", HOSPITAL_IMPORTER)
@@ -56,7 +59,9 @@ class HospitalLayer(Layer):
         return 40
     
     
-    def icon(self) -> folium.Icon:
+    def icon(self) -> "folium.Icon":
+        import folium
+
         return folium.Icon(
             color="blue",
             icon="hospital",
@@ -64,5 +69,10 @@ class HospitalLayer(Layer):
         )
         
 
+    def marker_mode(self) -> "MarkerMode":
+        # ~7,600 hospitals; markers are built in the browser from one array
+        return "fast"
+        
+
     def lat_long_provider(self) -> HospitalLayerPointProvider:
         return self.points
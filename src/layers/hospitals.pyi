@@ -1,12 +1,28 @@
-from .layer import Layer, LayerPointProvider, Point
+from .layer import Layer, LayerPointProvider
+from .point_store import PointStore
 from .csv_layer import CSVImporter
+from .weights import ColumnFunction
 import folium
 
+hospital_beds: ColumnFunction
+"""
+Bed count of each hospital from the `BEDS` column, NaN where the source
+does not report one
+"""
+
+hospital_weight: ColumnFunction
+"""
+Heat map weight from `BEDS`: 0.3 when unreported, otherwise from 0.5
+rising with log(beds) to at most 2.0
+"""
+
 HOSPITAL_IMPORTER: CSVImporter
 
 class HospitalLayerPointProvider(LayerPointProvider):
     def __init__(self) -> None: ...
-    def point_list(self) -> list[Point]: ...
+    def point_list(self) -> PointStore: ...
+    @classmethod
+    def preload(cls) -> None: ...
 
 class HospitalLayer(Layer):
     points: HospitalLayerPointProvider
@@ -1,48 +1,206 @@
 from abc import ABC, abstractmethod
 from collections import deque
-from typing import Iterable, TypedDict, Optional
-import folium
-from folium.plugins import HeatMap, MarkerCluster
-from itertools import chain
+from typing import TYPE_CHECKING, Iterable, Iterator, Optional
+import numpy as np
+from instrumentation import span, timed
+from .point_store import CHUNK_SIZE, Point, PointStore
+from .spatial import SpatialIndex
+from .stats import LayerStats
+from . import analytics
+from .tiles import HeatmapEngine, TileOptions, build_pyramid, pyramid_key, slug
+from .detail import DEFAULT_ZOOM, Aggregator, BBox, LevelOfDetail, bbox_center, fit_zoom, in_bbox
 
-
-class Point(TypedDict):
-    lat: float
-    lon: float
-    w: float
-    label: str
+# folium (and the modules built on it) is imported by the methods that draw,
+# so points, stats and analytics load without it
+if TYPE_CHECKING:
+    import folium
+    from .markers import MarkerMode
+    from .payload import PayloadOptions
+    from .render_cache import RenderCache
 
 
 class LayerPointProvider(ABC):
+    __index: Optional[SpatialIndex] = None
+    __stats: Optional[LayerStats] = None
+    
     @abstractmethod
     def point_list(self) -> Iterable[Point]:
         ...
         
+        
+    def preload(self):
+        self.point_list()
+        
+        
+    def spatial_index(self) -> SpatialIndex:
+        if self.__index is None:
+            self.__index = SpatialIndex(PointStore.from_points(self.point_list()))
+        
+        return self.__index
+    
+    
+    def iter_chunks(self, chunk_size: int = CHUNK_SIZE, bbox: Optional[BBox] = None) -> Iterator[PointStore]:
+        if bbox is None:
+            yield from PointStore.from_points(self.point_list()).chunks(chunk_size)
+            return
+        
+        index = self.spatial_index()
+        yield from index.store.take(index.in_bbox(*bbox)).chunks(chunk_size)
+    
+    
+    def stats(self) -> LayerStats:
+        if self.__stats is None:
+            self.__stats = LayerStats.combine(LayerStats.of(chunk) for chunk in self.iter_chunks())
+        
+        return self.__stats
+    
+    
+    def fingerprint(self) -> Optional[str]:
+        return None
+    
+    
+    def sources(self) -> list[str]:
+        return []
+    
+    
+    def invalidate(self):
+        self.__index = None
+        self.__stats = None
+        
 
 class Layer(ABC):
-    def add_to_map(self, map: folium.Map):
-        points = self.lat_long_provider().point_list()
-        
-        cluster = MarkerCluster(name="Markers").add_to(map)
-        
-        for p in points:
-            folium.Marker(
-                location=[p["lat"], p["lon"]],
-                popup=p["label"],
-                tooltip=p["label"],
-                icon=self.icon(),
-            ).add_to(cluster)
-        
-        heat_data = [[p["lat"], p["lon"], p["w"]] for p in points]
-        
-        HeatMap(
-            heat_data,
-            radius=self.radius(),        # blob size
-            blur=22,          # smoothness
-            min_opacity=0.25, # see base map through
-            max_zoom=13,
+    def add_to_map(self, map: "folium.Map", points: Optional[Iterable[Point]] = None, zoom: int = DEFAULT_ZOOM, bbox: Optional[BBox] = None, payload: Optional["PayloadOptions"] = None) -> LayerStats:
+        import folium
+        from folium.plugins import HeatMap, MarkerCluster
+        from .markers import FastMarkers, MarkerPayload
+        from .payload import LayerPayload, PayloadHeatMap, PayloadWriter
+
+        with span("layer", self.name()):
+            if points is None:
+                chunks = self.lat_long_provider().iter_chunks(bbox=bbox)
+            else:
+                store = PointStore.from_points(points)
+                chunks = (store if bbox is None else store.take(in_bbox(store, bbox))).chunks()
+        
+            detail = self.level_of_detail()
+            mode = self.marker_mode() if detail.markers(zoom) else "none"
+            tiles = self.heatmap_engine() == "tiles"
+        
+            # with `payload`, fast markers and the client heat map are written to a file the page fetches
+            writer = PayloadWriter() if payload is not None and (mode == "fast" or not tiles) else None
+            markers = MarkerPayload() if mode == "fast" and writer is None else None
+            cluster = MarkerCluster(name="Markers").add_to(map) if mode == "classic" else None
+            cells = Aggregator(zoom, detail.aggregate_pixels) if not tiles and detail.aggregate(zoom) else None
+        
+            # one pass over the points feeds every consumer
+            stats = LayerStats()
+            heat_data: list[list[float]] = []
+            parts: list[PointStore] = []
+        
+            for chunk in chunks:
+                stats += LayerStats.of(chunk)
+            
+                if markers is not None:
+                    markers.add(chunk)
+                elif writer is not None and mode == "fast":
+                    writer.add_markers(chunk)
+                elif cluster is not None:
+                    for p in chunk:
+                        folium.Marker(
+                            location=[p["lat"], p["lon"]],
+                            popup=p["label"],
+                            tooltip=p["label"],
+                            icon=self.icon(),
+                        ).add_to(cluster)
+            
+                if tiles:
+                    parts.append(chunk)
+                elif cells is not None:
+                    cells.add(chunk)
+                elif writer is not None:
+                    writer.add_heat(chunk)
+                else:
+                    heat_data.extend(chunk.heat_data())
+        
+            if cells is not None and writer is not None:
+                writer.add_heat(cells.result())
+        
+            source = None
+        
+            if writer is not None:
+                assert payload is not None
+                path, url = writer.write(self.name(), payload)
+                source = LayerPayload(url, payload.format, path).add_to(map)
+        
+            if markers is not None:
+                FastMarkers(markers, self.icon(), name="Markers").add_to(map)
+            elif source is not None and mode == "fast":
+                FastMarkers(source, self.icon(), name="Markers").add_to(map)
+        
+            if tiles:
+                # the density kernel needs every point of a tile's neighbourhood at once
+                self.__add_tiles(map, PointStore.concat(parts))
+                return stats
+        
+            style = dict(
+                radius=self.radius(),        # blob size
+                blur=22,          # smoothness
+                min_opacity=0.25, # see base map through
+                max_zoom=13,
+                name=self.name(),
+            )
+        
+            if source is not None:
+                PayloadHeatMap(source, **style).add_to(map)
+                return stats
+        
+            if cells is not None:
+                heat_data = cells.result().heat_data()
+        
+            HeatMap(heat_data, **style).add_to(map)
+        
+            return stats
+    
+    
+    def __add_tiles(self, map: "folium.Map", points: PointStore):
+        import folium
+
+        options = self.tile_options()
+        # named by content, like payload files, so fragments cached from other views keep their tiles
+        name = f"{slug(self.name())}-{pyramid_key(points, self.radius(), options)[:16]}"
+        directory = f"{options.directory}/{name}"
+        url = f"{options.url or options.directory}/{name}"
+        
+        build_pyramid(points, self.radius(), directory, options)
+        
+        tile_layer = folium.TileLayer(
+            tiles=url + "/{z}/{x}/{y}.png",
+            attr=self.name(),
             name=self.name(),
-        ).add_to(map)
+            overlay=True,
+            max_zoom=18,
+            min_native_zoom=options.min_zoom,
+            max_native_zoom=options.max_zoom,
+        )
+        # recorded with cached fragments, like payload files
+        tile_layer.asset = directory
+        tile_layer.add_to(map)
+    
+    
+    def marker_mode(self) -> "MarkerMode":
+        return "classic"
+    
+    
+    def level_of_detail(self) -> LevelOfDetail:
+        return LevelOfDetail()
+    
+    
+    def heatmap_engine(self) -> HeatmapEngine:
+        return "client"
+    
+    
+    def tile_options(self) -> TileOptions:
+        return TileOptions()
     
     
     @abstractmethod
@@ -58,53 +216,128 @@ class Layer(ABC):
         ...
         
     @abstractmethod
-    def icon(self) -> folium.Icon:
+    def icon(self) -> "folium.Icon":
         ...
 
     
 class Stack:
     layers: deque[Layer]
-    __center: Optional[tuple[float, float]]
     
     
     def __init__(self) -> None:
         self.layers = deque()
-        self.__center = None
     
         
     def add(self, layer: Layer):
-        self.__center = None
         self.layers.append(layer)
     
+    
+    def stats(self) -> LayerStats:
+        # each provider keeps its own summary, so this is O(layers)
+        return LayerStats.combine(layer.lat_long_provider().stats() for layer in self.layers)
+    
         
-    def center(self) -> tuple[float, float]:
-        if self.__center is not None:
-            return self.__center
+    def center(self, weighted: bool = False) -> tuple[float, float]:
+        return self.stats().center(weighted)
+    
+    
+    def bounds(self) -> tuple[tuple[float, float], tuple[float, float]]:
+        return self.stats().bounds()
+    
+                
+    def preload(self):
+        for layer in self.layers:
+            layer.lat_long_provider().preload()
+    
+    
+    def nearest(self, source: Layer, target: Layer, column: str) -> PointStore:
+        points = PointStore.from_points(source.lat_long_provider().point_list())
+        indices, distances = analytics.nearest(points, PointStore.from_points(target.lat_long_provider().point_list()))
         
-        points = list(chain.from_iterable(layer.lat_long_provider().point_list() for layer in self.layers))
+        return points.with_columns(**{ column: distances, f"{column}_index": indices.astype(np.float64) })
+    
+    
+    def within_radius(self, source: Layer, target: Layer, km: float, column: str, values: Optional[str] = None) -> PointStore:
+        points = PointStore.from_points(source.lat_long_provider().point_list())
+        others = PointStore.from_points(target.lat_long_provider().point_list())
         
-        self.__center = (sum(p["lat"] for p in points)/len(points),
-                         sum(p["lon"] for p in points)/len(points))
+        result = analytics.within_radius(points, others, km, None if values is None else others.column(values))
         
-        return self.__center
+        return points.with_columns(**{ column: result })
+    
     
-                
     def __str__(self) -> str:
         return str([layer.name() for layer in self.layers])
     
     
-    def render(self) -> folium.Map:
+    @timed("render")
+    def render(self, bbox: Optional[BBox] = None, zoom: Optional[int] = None, *, workers: int = 1, cache: Optional["RenderCache"] = None, payload: Optional["PayloadOptions"] = None) -> "folium.Map":
+        import folium
+        from folium.map import FitBounds
+
+        if zoom is None:
+            zoom = DEFAULT_ZOOM if bbox is None else fit_zoom(bbox)
+        
+        if workers > 1 or cache is not None:
+            return self.__render_fragments(bbox, zoom, workers, cache, payload)
+        
         m = folium.Map(
-            location=self.center(),
-            zoom_start=5,
+            location=[0, 0] if bbox is None else bbox_center(bbox),
+            zoom_start=zoom,
             tiles="CartoDB positron"
         )
         
-        folium.FitOverlays(
-            fly=False
-        ).add_to(m)
+        if bbox is not None:
+            south, west, north, east = bbox
+            m.fit_bounds([[south, west], [north, east if west <= east else east + 360]])
         
-        for layer in self.layers:
-            layer.add_to_map(m)
+        # the extent is summed up while the layers are drawn, then fitted ahead of them
+        position = len(m._children)
+        stats = LayerStats.combine([layer.add_to_map(m, zoom=zoom, bbox=bbox, payload=payload) for layer in self.layers])
+        
+        if bbox is None:
+            m.location = list(stats.center())
+            FitBounds(stats.bounds()).add_to(m, index=position)
+            
+        return m
+    
+    
+    def __render_fragments(self, bbox: Optional[BBox], zoom: int, workers: int, cache: Optional["RenderCache"], payload: Optional["PayloadOptions"]) -> "folium.Map":
+        import folium
+        from .fragments import LayerFragment, capture_all
+        from .render_cache import MAP_ID, layer_key
+
+        # the center is not known until the layers are loaded (or found in the cache)
+        m = folium.Map(
+            location=bbox_center(bbox) if bbox is not None else [0, 0],
+            zoom_start=zoom,
+            tiles="CartoDB positron"
+        )
+        
+        if cache is not None:
+            m._id = MAP_ID
+        
+        layers = list(self.layers)
+        keys = [layer_key(layer, bbox, zoom, payload) for layer in layers] if cache is not None else [None] * len(layers)
+        captured = [cache.get(key) if cache is not None else None for key in keys]
+        
+        misses = [i for i, entry in enumerate(captured) if entry is None]
+        
+        for i, entry in zip(misses, capture_all([layers[i] for i in misses], m._id, bbox, zoom, workers, payload)):
+            captured[i] = entry
             
+            if cache is not None:
+                cache.put(keys[i], *entry)
+        
+        if bbox is None:
+            stats = LayerStats.combine(stats for _, stats in captured)
+            m.location = list(stats.center())
+            m.fit_bounds(stats.bounds())
+        else:
+            south, west, north, east = bbox
+            m.fit_bounds([[south, west], [north, east if west <= east else east + 360]])
+        
+        for fragment, _ in captured:
+            LayerFragment(fragment).add_to(m)
+        
         return m
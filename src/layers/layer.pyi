@@ -1,21 +1,14 @@
 from abc import ABC, abstractmethod
-from typing import Iterable, TypedDict
+from typing import Iterable, Iterator, Optional
 import folium
-
-class Point(TypedDict):
-    """
-    Docstring for Point
-    
-    :var lat: Latitude in decimal degrees
-    :vartype lat: float
-    :var lon: Longitude in decimal degrees
-    :vartype lon: float
-    :var w: Weight associated with the point
-    :vartype w: float
-    :var label: Human-readable label for the point
-    :vartype label: str
-    """
-
+from .point_store import Point as Point, PointStore as PointStore
+from .markers import MarkerMode
+from .spatial import SpatialIndex
+from .stats import LayerStats
+from .tiles import HeatmapEngine, TileOptions
+from .detail import BBox, LevelOfDetail
+from .render_cache import RenderCache
+from .payload import PayloadOptions
 
 class LayerPointProvider(ABC):
     """
@@ -35,6 +28,63 @@ class LayerPointProvider(ABC):
         """
         ...
 
+    def preload(self) -> None:
+        """
+        Load this provider's points ahead of the first `point_list()` call.
+        """
+        ...
+
+    def spatial_index(self) -> SpatialIndex:
+        """
+        Spatial index over this provider's points, built on first call and
+        reused afterwards. Query results are indices into `point_list()`.
+        """
+        ...
+
+    def iter_chunks(self, chunk_size: int = ..., bbox: Optional[BBox] = None) -> Iterator[PointStore]:
+        """
+        This provider's points as consecutive batches of at most
+        `chunk_size` points, in `point_list()` order.
+
+        Rendering and statistics read points only through this method, in
+        a single pass, so a provider that overrides it to stream from its
+        source (see `csv_points(in_memory=False)`) never needs the whole
+        layer in memory. The default slices `point_list()`.
+
+        :param bbox: Yield only the points inside `(south, west, north, east)`;
+            the default implementation finds them with `spatial_index()`
+        """
+        ...
+
+    def stats(self) -> LayerStats:
+        """
+        Running aggregates (count, sums, bounding box) of this provider's
+        points, summed over `iter_chunks()` on first call and reused until
+        `invalidate()`.
+        """
+        ...
+
+    def fingerprint(self) -> Optional[str]:
+        """
+        A cheap identity of this provider's data (e.g. file stat and parser),
+        which changes whenever the points would. None if there is none; the
+        render cache then hashes the loaded points instead.
+        """
+        ...
+
+    def sources(self) -> list[str]:
+        """
+        Files the points are read from, for `--watch`; empty by default.
+        """
+        ...
+
+    def invalidate(self) -> None:
+        """
+        Forget the cached index and statistics (and, for `csv_points`
+        providers, the loaded points) after the underlying points change.
+        """
+        ...
+
 
 class Layer(ABC):
     """
@@ -54,6 +104,60 @@ class Layer(ABC):
     Get whether this layer is enabled
     """
 
+    def add_to_map(self, map: folium.Map, points: Optional[Iterable[Point]] = None, zoom: int = ..., bbox: Optional[BBox] = None, payload: Optional[PayloadOptions] = None) -> LayerStats:
+        """
+        Add this layer's markers and heat map to `map`.
+
+        Points are read once, a batch at a time, from the provider's
+        `iter_chunks()`; markers, heat map aggregation and statistics are
+        all fed from that pass. Only the `"tiles"` heat map engine gathers
+        the whole layer first.
+
+        :param points: The points to draw; defaults to all of the provider's points
+        :param zoom: Zoom level the map is rendered for, which selects the
+            `level_of_detail` rules that apply
+        :param bbox: Draw only the points inside `(south, west, north, east)`
+        :param payload: Write the `"fast"` markers and the client heat map
+            points to one file per layer (see `layers.payload`) that the page
+            fetches, instead of inlining them. `"classic"` markers and heat
+            map tiles are unaffected.
+        :return: Statistics of the points drawn
+        """
+        ...
+
+    def level_of_detail(self) -> LevelOfDetail:
+        """
+        Zoom-dependent rendering rules. The default draws everything at
+        every zoom level.
+        """
+        ...
+
+    def marker_mode(self) -> MarkerMode:
+        """
+        How markers are rendered: `"classic"` (default) emits one
+        `folium.Marker` per point in a `MarkerCluster`, `"fast"` sends the
+        points as one compact array and builds markers in the browser,
+        `"none"` draws only the heat map.
+        """
+        ...
+
+    def heatmap_engine(self) -> HeatmapEngine:
+        """
+        Where the heat map is computed: `"client"` (default) sends every
+        weighted point to leaflet.heat in the browser, `"tiles"` renders a
+        kernel density PNG tile pyramid up front (see `tile_options`) and
+        adds it as a tile layer.
+        """
+        ...
+
+    def tile_options(self) -> TileOptions:
+        """
+        Zoom range, output directory and worker count for the `"tiles"`
+        heat map engine. Tiles go to `<directory>/<layer name slug>-<hash of
+        the points and settings>`.
+        """
+        ...
+
     @abstractmethod
     def lat_long_provider(self) -> LayerPointProvider:
         """
@@ -90,6 +194,66 @@ class Stack:
     
     def __init__(self) -> None: ...
     def add(self, layer: Layer): ...
-    def center(self) -> tuple[float, float]: ...
+    def stats(self) -> LayerStats:
+        """
+        The statistics of every layer combined, without touching any points
+        beyond each provider's first `stats()` call
+        """
+        ...
+    def center(self, weighted: bool = False) -> tuple[float, float]:
+        """
+        Mean `(lat, lon)` of every point in the stack, or their mean weighted
+        by `w` when `weighted`
+        """
+        ...
+    def bounds(self) -> tuple[tuple[float, float], tuple[float, float]]:
+        """
+        `((south, west), (north, east))` covering every point, as taken by
+        `folium.Map.fit_bounds`
+        """
+        ...
+    def preload(self) -> None:
+        """
+        Load the points of every layer in the stack
+        """
+        ...
+    def nearest(self, source: Layer, target: Layer, column: str) -> PointStore:
+        """
+        `source`'s points with the distance in km to the nearest point of
+        `target` as `column`, and that point's index as `<column>_index`.
+
+        :param source: Layer whose points get the new columns
+        :param target: Layer searched for each source point
+        :param column: Name of the distance column
+        """
+        ...
+    def within_radius(self, source: Layer, target: Layer, km: float, column: str, values: Optional[str] = None) -> PointStore:
+        """
+        `source`'s points with, as `column`, the number of `target` points
+        within `km` of each, or the sum of `target`'s column `values` over
+        them (NaN values skipped).
+
+        The result can drive weights through `PointStore.reweight`, e.g.
+        `stack.within_radius(tj, hospitals, 25, "beds_25km", "beds")`.
+        """
+        ...
     def __str__(self) -> str: ...
-    def render(self) -> folium.Map: ...
\ No newline at end of file
+    def render(self, bbox: Optional[BBox] = None, zoom: Optional[int] = None, *, workers: int = 1, cache: Optional[RenderCache] = None, payload: Optional[PayloadOptions] = None) -> folium.Map:
+        """
+        Draw every layer onto a new map.
+
+        :param bbox: `(south, west, north, east)`; only points inside it are
+            drawn (found through each provider's `spatial_index()`) and the map
+            is fitted to it. `west > east` crosses the antimeridian.
+        :param zoom: Initial zoom, which also picks each layer's level of
+            detail; defaults to 5, or to the zoom that fits `bbox`
+        :param workers: With more than one, layers are loaded and rendered to
+            page fragments in that many processes (see `layers.fragments`)
+            and assembled here; the page is the same as a serial render.
+            Layers must be picklable.
+        :param cache: Reuse the fragments of layers whose data, styling and
+            render settings are unchanged, and store the new ones. The map's
+            id is then fixed to `render_cache.MAP_ID`.
+        :param payload: Passed to every layer's `add_to_map`
+        """
+        ...
\ No newline at end of file
@@ -0,0 +1,133 @@
+import json
+from typing import Literal
+import folium
+import numpy as np
+from branca.element import MacroElement
+from folium.plugins import MarkerCluster
+from folium.template import Template
+from .point_store import PointStore
+
+
+MarkerMode = Literal["fast", "classic", "none"]
+
+# ~0.1 m at the equator; more digits only grow the page
+COORDINATE_DECIMALS = 6
+
+
+def _js_literal(value) -> str:
+    # labels are arbitrary text; keep them from closing the <script> element
+    return json.dumps(value, separators=(",", ":")).replace("</", "<\\/")
+
+
+class MarkerPayload:
+    """
+    Builds the `marker_payload` of a sequence of stores one store at a time,
+    keeping only the encoded text of the points seen so far.
+    """
+
+    def __init__(self) -> None:
+        self.__points: list[str] = []
+        self.__labels: dict[str, int] = {}
+
+
+    def add(self, points: PointStore) -> "MarkerPayload":
+        if len(points) == 0:
+            return self
+
+        # a subset of a store still shares its whole label table; ship only the labels in use
+        used, label_ids = np.unique(points.label_ids, return_inverse=True)
+        remap = np.fromiter((self.__labels.setdefault(points.labels[i], len(self.__labels)) for i in used.tolist()), dtype=np.int64, count=len(used))
+
+        rows = np.empty((len(points), 3), dtype=object)
+        rows[:, 0] = np.round(points.lat, COORDINATE_DECIMALS).tolist()
+        rows[:, 1] = np.round(points.lon, COORDINATE_DECIMALS).tolist()
+        rows[:, 2] = remap[label_ids].tolist()
+
+        self.__points.append(_js_literal(rows.ravel().tolist())[1:-1])
+
+        return self
+
+
+    def js(self) -> str:
+        return '{"points":[' + ",".join(self.__points) + '],"labels":' + _js_literal(list(self.__labels)) + "}"
+
+
+def marker_payload(points: PointStore) -> str:
+    """
+    Flat `[lat, lon, label id, lat, lon, label id, ...]` array followed by
+    the label table, as one JS object literal.
+    """
+    return MarkerPayload().add(points).js()
+
+
+class FastMarkers(MarkerCluster):
+    """
+    A marker cluster whose markers are built in the browser from one compact
+    data array. Every marker shares a single icon, and popups and tooltips
+    are created the first time a marker is clicked or hovered.
+    """
+    _template = Template(
+        """
+        {% macro script(this, kwargs) %}
+            var {{ this.get_name() }} = (function(){
+                var icon = L.AwesomeMarkers.icon({{ this.icon_options|tojavascript }});
+                var cluster = L.markerClusterGroup({{ this.options|tojavascript }});
+
+                function add(payload) {
+                    var points = payload.points, labels = payload.labels;
+
+                    function text(i) {
+                        var el = document.createElement("div");
+                        el.textContent = labels[i];
+                        return el;
+                    }
+
+                    function popup() {
+                        if (!this.getPopup()) {
+                            this.bindPopup(text(this.labelId)).openPopup();
+                        }
+                    }
+
+                    function tooltip() {
+                        if (!this.getTooltip()) {
+                            this.bindTooltip(text(this.labelId)).openTooltip();
+                        }
+                    }
+
+                    var markers = new Array(points.length / 3);
+
+                    for (var i = 0, j = 0; i < points.length; i += 3, j++) {
+                        var marker = L.marker([points[i], points[i + 1]], { icon: icon });
+                        marker.labelId = points[i + 2];
+                        marker.on("click", popup);
+                        marker.on("mouseover", tooltip);
+                        markers[j] = marker;
+                    }
+
+                    cluster.addLayers(markers);
+                }
+                {% if this.source %}
+                {{ this.source }}.then(function (payload) { add(payload.markers); });
+                {% else %}
+                add({{ this.payload }});
+                {% endif %}
+                cluster.addTo({{ this._parent.get_name() }});
+                return cluster;
+            })();
+        {% endmacro %}"""
+    )
+
+    def __init__(self, points: PointStore | MarkerPayload | MacroElement, icon: folium.Icon, name: str = "Markers", **kwargs) -> None:
+        kwargs.setdefault("chunked_loading", True)
+        super().__init__(name=name, **kwargs)
+        self._name = "FastMarkers"
+        self.payload = None
+        self.source = None
+
+        # a `layers.payload.LayerPayload`: the markers arrive with its file
+        if isinstance(points, MacroElement):
+            self.source = points.get_name()
+        else:
+            self.payload = points.js() if isinstance(points, MarkerPayload) else marker_payload(points)
+
+        self.icon_options = icon.options
@@ -0,0 +1,53 @@
+from typing import Literal, Optional
+import folium
+from branca.element import MacroElement
+from folium.plugins import MarkerCluster
+from .point_store import PointStore
+
+MarkerMode = Literal["fast", "classic", "none"]
+
+COORDINATE_DECIMALS: int
+
+def marker_payload(points: PointStore) -> str:
+    """
+    Serialize points for `FastMarkers`: a flat `[lat, lon, label id, ...]`
+    array with coordinates rounded to `COORDINATE_DECIMALS`, plus the label
+    table, as a JS object literal.
+    """
+    ...
+
+class MarkerPayload:
+    """
+    `marker_payload` built incrementally from batches of points, e.g. from
+    `LayerPointProvider.iter_chunks()`. Label ids are numbered across
+    batches; only the encoded text is kept between calls to `add`.
+    """
+
+    def __init__(self) -> None: ...
+    def add(self, points: PointStore) -> MarkerPayload: ...
+    def js(self) -> str:
+        """
+        The payload of every batch added so far
+        """
+        ...
+
+class FastMarkers(MarkerCluster):
+    """
+    Marker cluster built client-side from one compact data array.
+
+    All markers share one `L.AwesomeMarkers` icon built from `icon`'s
+    options. Popups and tooltips are bound lazily on first click or hover,
+    so the page carries a few bytes per point instead of one JS block per
+    marker.
+
+    Given a `layers.payload.LayerPayload` instead of points, the markers are
+    added once its file has loaded.
+
+    :var payload: The inline payload, or None when loaded from a file
+    :var source: Name of the `LayerPayload` the markers come from, if any
+    """
+    payload: Optional[str]
+    source: Optional[str]
+    icon_options: dict
+
+    def __init__(self, points: PointStore | MarkerPayload | MacroElement, icon: folium.Icon, name: str = ..., **kwargs) -> None: ...
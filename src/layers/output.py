@@ -0,0 +1,57 @@
+import gzip
+import os
+from pathlib import Path
+from typing import Iterable, Literal
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+Codec = Literal["gz", "br"]
+
+CODECS: tuple[Codec, ...] = ("gz", "br")
+
+
+def minify_html(html: str) -> str:
+    """
+    Drop indentation and blank lines. Line breaks are kept, so scripts that
+    rely on automatic semicolon insertion still parse.
+    """
+    return "\n".join(stripped for stripped in (line.strip() for line in html.splitlines()) if stripped) + "\n"
+
+
+def _compress(codec: Codec, data: bytes) -> bytes:
+    if codec == "gz":
+        # no timestamp, so the same page compresses to the same bytes
+        return gzip.compress(data, compresslevel=9, mtime=0)
+
+    if codec == "br":
+        if brotli is None:
+            raise RuntimeError("br compression requires the brotli package")
+
+        return brotli.compress(data, quality=11)
+
+    raise ValueError(f"unknown codec {codec!r}")
+
+
+def precompress(path: Path, codecs: Iterable[Codec]):
+    """
+    Write `path.gz` and/or `path.br` next to `path`, for servers and buckets
+    that hand out precompressed files. Compressed copies of codecs not asked
+    for are removed, so they never go stale.
+    """
+    codecs = set(codecs)
+    data = path.read_bytes() if codecs else b""
+
+    for codec in CODECS:
+        target = path.with_name(f"{path.name}.{codec}")
+
+        if codec not in codecs:
+            target.unlink(missing_ok=True)
+            continue
+
+        tmp = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+        tmp.write_bytes(_compress(codec, data))
+        os.replace(tmp, target)
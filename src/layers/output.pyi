@@ -0,0 +1,24 @@
+from pathlib import Path
+from typing import Iterable, Literal
+
+Codec = Literal["gz", "br"]
+
+CODECS: tuple[Codec, ...]
+
+def minify_html(html: str) -> str:
+    """
+    Strip indentation and blank lines from a rendered page. Line breaks are
+    kept, so scripts relying on automatic semicolon insertion are unchanged.
+    """
+    ...
+
+def precompress(path: Path, codecs: Iterable[Codec]) -> None:
+    """
+    Write `path.gz` (gzip level 9, no timestamp) and/or `path.br` (brotli
+    quality 11) next to `path`, for static hosts that serve precompressed
+    files with `Content-Encoding`. Copies for codecs not listed are removed.
+
+    :raises RuntimeError: If `"br"` is asked for and the optional `brotli`
+        package is not installed
+    """
+    ...
@@ -0,0 +1,245 @@
+import hashlib
+import json
+import os
+import struct
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Literal, Optional
+import numpy as np
+from branca.element import Element, MacroElement
+from folium.plugins import HeatMap
+from folium.template import Template
+from .markers import COORDINATE_DECIMALS
+from .output import Codec, precompress
+from .point_store import PointStore
+from .tiles import slug
+
+
+PayloadFormat = Literal["json", "binary"]
+
+MAGIC = b"LPAY"
+
+# heat weights only scale intensity; three decimals are more than the eye can tell apart
+WEIGHT_DECIMALS = 3
+
+# binary coordinates are int32 multiples of 10^-decimals; 180 * 10^7 still fits
+MAX_BINARY_DECIMALS = 7
+
+
+@dataclass(frozen=True)
+class PayloadOptions:
+    format: PayloadFormat = "binary"
+    directory: str = "layer-data"
+    url: Optional[str] = None
+    decimals: int = COORDINATE_DECIMALS
+    compress: tuple[Codec, ...] = ()
+
+
+# defined once per page; loadLayerPayload resolves to
+# { markers: { points: [lat, lon, label id, ...], labels }, heat: [[lat, lon, w], ...] }
+LOADER = """<script>
+    function decodeLayerPayload(buffer) {
+        var length = new DataView(buffer).getUint32(4, true);
+        var header = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 8, length)));
+        var offset = 8 + length + (4 - length % 4) % 4;
+
+        // columns are little-endian, like every platform browsers run on
+        function column(Type, n) {
+            var values = new Type(buffer, offset, n);
+            offset += 4 * n;
+            return values;
+        }
+
+        function interleave(n, third) {
+            var lat = column(Int32Array, n), lon = column(Int32Array, n), extra = column(third, n);
+            var flat = new Float64Array(3 * n);
+
+            for (var i = 0; i < n; i++) {
+                flat[3 * i] = lat[i] / header.scale;
+                flat[3 * i + 1] = lon[i] / header.scale;
+                flat[3 * i + 2] = extra[i];
+            }
+
+            return flat;
+        }
+
+        var points = interleave(header.markers, Uint32Array);
+        var heat = header.shared ? column(Float32Array, header.heat) : interleave(header.heat, Float32Array);
+
+        return { markers: { points: points, labels: header.labels }, heat: heat, shared: header.shared };
+    }
+
+    function loadLayerPayload(url, format) {
+        return fetch(url).then(function (response) {
+            if (!response.ok) {
+                throw new Error(url + ": HTTP " + response.status);
+            }
+
+            return format === "binary" ? response.arrayBuffer().then(decodeLayerPayload) : response.json();
+        }).then(function (payload) {
+            // shared: heat holds only weights, one per marker
+            var flat = payload.heat, points = payload.markers.points, heat = new Array(payload.shared ? flat.length : flat.length / 3);
+
+            for (var j = 0; j < heat.length; j++) {
+                heat[j] = payload.shared ? [points[3 * j], points[3 * j + 1], flat[j]] : [flat[3 * j], flat[3 * j + 1], flat[3 * j + 2]];
+            }
+
+            payload.heat = heat;
+            return payload;
+        });
+    }
+</script>"""
+
+
+class PayloadWriter:
+    """
+    Collects a layer's fast markers and heat map points, a batch at a time,
+    and writes them to one file the page fetches.
+    """
+
+    def __init__(self) -> None:
+        self.__markers: list[PointStore] = []
+        self.__heat: list[PointStore] = []
+
+
+    def add_markers(self, points: PointStore) -> "PayloadWriter":
+        self.__markers.append(points)
+        return self
+
+
+    def add_heat(self, points: PointStore) -> "PayloadWriter":
+        self.__heat.append(points)
+        return self
+
+
+    def __labels(self) -> tuple[np.ndarray, list[str]]:
+        # label ids numbered across batches, keeping only the labels in use
+        table: dict[str, int] = {}
+        ids = []
+
+        for points in self.__markers:
+            used, inverse = np.unique(points.label_ids, return_inverse=True)
+            remap = np.fromiter((table.setdefault(points.labels[i], len(table)) for i in used.tolist()), dtype=np.int64, count=len(used))
+            ids.append(remap[inverse])
+
+        return np.concatenate(ids) if ids else np.empty(0, dtype=np.int64), list(table)
+
+
+    def __columns(self, parts: list[PointStore]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        if not parts:
+            return np.empty(0), np.empty(0), np.empty(0)
+
+        return tuple(np.concatenate([getattr(part, name) for part in parts]) for name in ("lat", "lon", "w"))
+
+
+    def __shared(self) -> bool:
+        # unaggregated heat maps draw the very points the markers do
+        return len(self.__heat) == len(self.__markers) > 0 and all(a is b for a, b in zip(self.__heat, self.__markers))
+
+
+    def encode(self, options: PayloadOptions) -> bytes:
+        """
+        Contents of the payload file, in `options.format`.
+        """
+        ids, labels = self.__labels()
+        lat, lon, _ = self.__columns(self.__markers)
+        heat_lat, heat_lon, heat_w = self.__columns(self.__heat)
+        shared = self.__shared()
+
+        if options.format == "json":
+            markers = np.column_stack((np.round(lat, options.decimals), np.round(lon, options.decimals), ids))
+            heat = np.round(heat_w, WEIGHT_DECIMALS) if shared else np.column_stack((np.round(heat_lat, options.decimals), np.round(heat_lon, options.decimals), np.round(heat_w, WEIGHT_DECIMALS)))
+
+            # ids are whole numbers; written as such they are two bytes shorter
+            points = [int(v) if k % 3 == 2 else v for k, v in enumerate(markers.ravel().tolist())]
+
+            return json.dumps({ "markers": { "points": points, "labels": labels }, "heat": heat.ravel().tolist(), "shared": shared }, separators=(",", ":")).encode()
+
+        if not 0 <= options.decimals <= MAX_BINARY_DECIMALS:
+            raise ValueError(f"binary payloads keep 0 to {MAX_BINARY_DECIMALS} decimals, not {options.decimals}")
+        
+        scale = 10 ** options.decimals
+
+        header = json.dumps({ "scale": scale, "markers": len(lat), "heat": len(heat_lat), "shared": shared, "labels": labels }, separators=(",", ":")).encode()
+        padding = b" " * ((4 - len(header) % 4) % 4)
+
+        columns = [
+            np.round(lat * scale).astype("<i4"),
+            np.round(lon * scale).astype("<i4"),
+            ids.astype("<u4"),
+        ]
+
+        if not shared:
+            columns += [np.round(heat_lat * scale).astype("<i4"), np.round(heat_lon * scale).astype("<i4")]
+
+        columns.append(heat_w.astype("<f4"))
+
+        return MAGIC + struct.pack("<I", len(header)) + header + padding + b"".join(column.tobytes() for column in columns)
+
+
+    def write(self, name: str, options: PayloadOptions) -> tuple[str, str]:
+        """
+        Write the payload under `options.directory` and return its path and
+        the URL the page loads it from. The file is named by its content, so pages and
+        cached fragments built from other data keep their own copy, and
+        browser caches never serve a stale one.
+        """
+        data = self.encode(options)
+        version = hashlib.blake2b(data, digest_size=8).hexdigest()
+        file = f"{slug(name)}-{version}.{'json' if options.format == 'json' else 'bin'}"
+        path = Path(options.directory, file)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+
+        precompress(path, options.compress)
+
+        return str(path), f"{options.url or options.directory}/{file}"
+
+
+class LayerPayload(MacroElement):
+    """
+    Starts fetching a layer's payload file as the page loads; `FastMarkers`
+    and `PayloadHeatMap` built on it draw once it arrives.
+    """
+    _template = Template(
+        """
+        {% macro script(this, kwargs) %}
+            var {{ this.get_name() }} = loadLayerPayload({{ this.url|tojson }}, {{ this.format|tojson }});
+        {% endmacro %}"""
+    )
+
+    def __init__(self, url: str, format: PayloadFormat, asset: Optional[str] = None) -> None:
+        super().__init__()
+        self._name = "LayerPayload"
+        self.url = url
+        self.format = format
+        # the file behind `url`, recorded with cached fragments
+        self.asset = asset
+
+
+    def render(self, **kwargs):
+        # one loader per page, however many layers use it
+        self.get_root().header.add_child(Element(LOADER), name="layer_payload")
+        super().render(**kwargs)
+
+
+class PayloadHeatMap(HeatMap):
+    """
+    A `HeatMap` whose points come from a `LayerPayload`.
+    """
+    _template = Template(
+        """
+        {% macro script(this, kwargs) %}
+            var {{ this.get_name() }} = L.heatLayer([], {{ this.options|tojavascript }});
+            {{ this.source }}.then(function (payload) {
+                {{ this.get_name() }}.setLatLngs(payload.heat);
+            });
+        {% endmacro %}"""
+    )
+
+    def __init__(self, source: LayerPayload, **kwargs) -> None:
+        super().__init__([], **kwargs)
+        self.source = source.get_name()
@@ -0,0 +1,107 @@
+from dataclasses import dataclass
+from typing import Literal, Optional
+from branca.element import MacroElement
+from folium.plugins import HeatMap
+from .output import Codec
+from .point_store import PointStore
+
+PayloadFormat = Literal["json", "binary"]
+
+MAGIC: bytes
+WEIGHT_DECIMALS: int
+MAX_BINARY_DECIMALS: int
+LOADER: str
+
+@dataclass(frozen=True)
+class PayloadOptions:
+    """
+    Settings for layer data written to files the map page fetches.
+
+    :var format: `"json"`, or `"binary"` for a header and little-endian
+        typed-array columns (smaller, and decoded without parsing numbers)
+    :vartype format: PayloadFormat
+    :var directory: Directory the layer files are written to, as
+        `<slug of the layer name>-<content hash>.json` or `.bin`
+    :vartype directory: str
+    :var url: URL root the page loads them from; defaults to `directory`,
+        which works when the map HTML is saved next to it
+    :vartype url: Optional[str]
+    :var decimals: Decimal places kept of each coordinate; at most
+        `MAX_BINARY_DECIMALS` in binary, so coordinates fit in int32
+    :vartype decimals: int
+    :var compress: Also write `.gz` and/or `.br` copies of every file
+    :vartype compress: tuple[Codec, ...]
+    """
+    format: PayloadFormat = ...
+    directory: str = ...
+    url: Optional[str] = ...
+    decimals: int = ...
+    compress: tuple[Codec, ...] = ...
+
+class PayloadWriter:
+    """
+    One layer's fast markers and heat map points, gathered a batch at a
+    time and written as one file.
+
+    As JSON the file is `{"markers": {"points": [lat, lon, label id, ...],
+    "labels": [...]}, "heat": [lat, lon, weight, ...], "shared": false}`,
+    coordinates rounded to `decimals` and weights to `WEIGHT_DECIMALS`.
+
+    As binary it is `MAGIC`, the uint32 length of a JSON header
+    `{"scale", "markers", "heat", "shared", "labels"}`, the header padded
+    with spaces to four bytes, then the columns: marker latitudes and
+    longitudes as int32 multiples of `1 / scale`, uint32 label ids, heat map
+    latitudes and longitudes likewise, and float32 weights.
+
+    When the heat map draws exactly the marker points (no aggregation),
+    `shared` is true and the heat map carries only its weights.
+    """
+
+    def __init__(self) -> None: ...
+    def add_markers(self, points: PointStore) -> PayloadWriter: ...
+    def add_heat(self, points: PointStore) -> PayloadWriter: ...
+
+    def encode(self, options: PayloadOptions) -> bytes:
+        """
+        The file contents in `options.format`
+
+        :raises ValueError: If a binary payload asks for more decimals than
+            int32 coordinates can hold
+        """
+        ...
+
+    def write(self, name: str, options: PayloadOptions) -> tuple[str, str]:
+        """
+        Write the file for the layer called `name`, and its precompressed
+        copies, under `options.directory`.
+
+        :return: The file's path, and the URL to load it from. The file name carries a hash of
+            its contents, so renders of other data never overwrite it and
+            browser and CDN caches never serve an older file
+        """
+        ...
+
+class LayerPayload(MacroElement):
+    """
+    Fetches a layer's payload file when the page loads. The decoder
+    (`LOADER`) is added to the page header once, however many layers use it.
+    """
+    url: str
+    format: PayloadFormat
+    asset: Optional[str]
+
+    def __init__(self, url: str, format: PayloadFormat, asset: Optional[str] = None) -> None:
+        """
+        :param asset: Path of the file behind `url`, kept with cached
+            fragments so the file is removed when they are
+        """
+        ...
+
+class PayloadHeatMap(HeatMap):
+    """
+    A `HeatMap` that starts empty and draws the points of a `LayerPayload`
+    once its file has loaded. Takes `HeatMap`'s styling arguments.
+    """
+    source: str
+
+    def __init__(self, source: LayerPayload, **kwargs) -> None: ...
@@ -0,0 +1,240 @@
+from array import array
+from typing import Iterable, Iterator, NotRequired, Optional, Sequence, TypedDict, overload
+import numpy as np
+
+
+# points per batch for providers that stream; ~3 MB of coordinates and weights
+CHUNK_SIZE = 1 << 17
+
+
+class Point(TypedDict):
+    lat: float
+    lon: float
+    w: float
+    label: str
+    columns: NotRequired[dict[str, float]]
+
+
+class PointStore(Sequence[Point]):
+    lat: np.ndarray
+    lon: np.ndarray
+    w: np.ndarray
+    label_ids: np.ndarray
+    labels: list[str]
+    columns: dict[str, np.ndarray]
+
+    def __init__(self, lat: np.ndarray, lon: np.ndarray, w: np.ndarray, label_ids: np.ndarray, labels: list[str], columns: Optional[dict[str, np.ndarray]] = None) -> None:
+        n = len(lat)
+        columns = columns or {}
+
+        if not (len(lon) == n and len(w) == n and len(label_ids) == n and all(len(c) == n for c in columns.values())):
+            raise ValueError("column length mismatch")
+
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+        self.w = np.asarray(w, dtype=np.float64)
+        self.label_ids = np.asarray(label_ids, dtype=np.uint32)
+        self.labels = labels
+        self.columns = { name: np.asarray(column, dtype=np.float64) for name, column in columns.items() }
+
+
+    @classmethod
+    def empty(cls):
+        return cls(np.empty(0), np.empty(0), np.empty(0), np.empty(0, dtype=np.uint32), [])
+
+
+    @classmethod
+    def from_points(cls, points: Iterable[Point]):
+        if isinstance(points, PointStore):
+            return points
+
+        builder = PointStoreBuilder()
+
+        for p in points:
+            builder.append(p)
+
+        return builder.build()
+
+
+    @classmethod
+    def concat(cls, stores: list["PointStore"]):
+        if not stores:
+            return cls.empty()
+
+        names = list(stores[0].columns)
+
+        if any(list(store.columns) != names for store in stores):
+            raise ValueError("stores have different columns")
+
+        # merge the label tables, renumbering each store's ids into the combined one
+        interned: dict[str, int] = {}
+        label_ids = []
+
+        for store in stores:
+            remap = np.fromiter((interned.setdefault(label, len(interned)) for label in store.labels), dtype=np.uint32, count=len(store.labels))
+            label_ids.append(remap[store.label_ids] if len(store) else store.label_ids)
+
+        return cls(
+            np.concatenate([store.lat for store in stores]),
+            np.concatenate([store.lon for store in stores]),
+            np.concatenate([store.w for store in stores]),
+            np.concatenate(label_ids),
+            list(interned),
+            { name: np.concatenate([store.columns[name] for store in stores]) for name in names },
+        )
+
+
+    def __len__(self) -> int:
+        return len(self.lat)
+
+
+    def _point(self, i: int) -> Point:
+        point = Point(
+            lat=float(self.lat[i]),
+            lon=float(self.lon[i]),
+            w=float(self.w[i]),
+            label=self.labels[self.label_ids[i]],
+        )
+
+        if self.columns:
+            point["columns"] = { name: float(column[i]) for name, column in self.columns.items() }
+
+        return point
+
+
+    @overload
+    def __getitem__(self, i: int) -> Point: ...
+    @overload
+    def __getitem__(self, i: slice) -> "PointStore": ...
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return self.take(i)
+
+        if i < 0:
+            i += len(self)
+
+        if not 0 <= i < len(self):
+            raise IndexError("point index out of range")
+
+        return self._point(i)
+
+
+    def __iter__(self) -> Iterator[Point]:
+        if self.columns:
+            yield from map(self._point, range(len(self)))
+            return
+
+        # tolist() unboxes each column once instead of once per field access
+        labels = self.labels
+
+        for lat, lon, w, label_id in zip(self.lat.tolist(), self.lon.tolist(), self.w.tolist(), self.label_ids.tolist()):
+            yield Point(lat=lat, lon=lon, w=w, label=labels[label_id])
+
+
+    def chunks(self, size: int = CHUNK_SIZE) -> Iterator["PointStore"]:
+        for start in range(0, len(self), size):
+            yield self.take(slice(start, start + size))
+
+
+    def label(self, i: int) -> str:
+        return self.labels[self.label_ids[i]]
+
+
+    def column(self, name: str) -> np.ndarray:
+        try:
+            return self.columns[name]
+        except KeyError:
+            raise KeyError(f"no column {name!r}, expected one of {list(self.columns)}")
+
+
+    def take(self, mask: np.ndarray | slice) -> "PointStore":
+        columns = { name: column[mask] for name, column in self.columns.items() }
+        return PointStore(self.lat[mask], self.lon[mask], self.w[mask], self.label_ids[mask], self.labels, columns)
+
+
+    def with_columns(self, **columns: np.ndarray) -> "PointStore":
+        return PointStore(self.lat, self.lon, self.w, self.label_ids, self.labels, { **self.columns, **columns })
+
+
+    def reweight(self, w: np.ndarray) -> "PointStore":
+        return PointStore(self.lat, self.lon, w, self.label_ids, self.labels, self.columns)
+
+
+    def heat_data(self) -> list[list[float]]:
+        return np.column_stack((self.lat, self.lon, self.w)).tolist()
+
+
+    def nbytes(self) -> int:
+        columns = sum(column.nbytes for column in self.columns.values())
+        return self.lat.nbytes + self.lon.nbytes + self.w.nbytes + self.label_ids.nbytes + columns + sum(len(s) for s in self.labels)
+
+
+    def __repr__(self) -> str:
+        return f"PointStore({len(self)} points, {len(self.labels)} labels)"
+
+
+class PointStoreBuilder:
+    __lat: array
+    __lon: array
+    __w: array
+    __label_ids: array
+    __labels: list[str]
+    __label_index: dict[str, int]
+    __columns: Optional[dict[str, array]]
+
+    def __init__(self) -> None:
+        self.__lat = array("d")
+        self.__lon = array("d")
+        self.__w = array("d")
+        self.__label_ids = array("I")
+        self.__labels = []
+        self.__label_index = {}
+        self.__columns = None
+
+
+    def __len__(self) -> int:
+        return len(self.__lat)
+
+
+    def intern(self, label: str) -> int:
+        label_id = self.__label_index.get(label)
+
+        if label_id is None:
+            label_id = len(self.__labels)
+            self.__label_index[label] = label_id
+            self.__labels.append(label)
+
+        return label_id
+
+
+    def add(self, lat: float, lon: float, w: float, label: str, columns: Optional[dict[str, float]] = None):
+        # the first point decides which extra columns the store has
+        if self.__columns is None:
+            self.__columns = { name: array("d") for name in columns or {} }
+
+        if (columns or {}).keys() != self.__columns.keys():
+            raise ValueError(f"point {len(self)} has columns {list(columns or {})}, expected {list(self.__columns)}")
+
+        self.__lat.append(lat)
+        self.__lon.append(lon)
+        self.__w.append(w)
+        self.__label_ids.append(self.intern(label))
+
+        for name, value in (columns or {}).items():
+            self.__columns[name].append(value)
+
+
+    def append(self, point: Point):
+        self.add(point["lat"], point["lon"], point["w"], point["label"], point.get("columns"))
+
+
+    def build(self) -> PointStore:
+        return PointStore(
+            np.frombuffer(self.__lat, dtype=np.float64),
+            np.frombuffer(self.__lon, dtype=np.float64),
+            np.frombuffer(self.__w, dtype=np.float64),
+            np.frombuffer(self.__label_ids, dtype=np.uint32),
+            self.__labels,
+            { name: np.frombuffer(column, dtype=np.float64) for name, column in (self.__columns or {}).items() },
+        )
@@ -0,0 +1,155 @@
+from typing import Iterable, Iterator, NotRequired, Optional, Self, Sequence, TypedDict, overload
+import numpy as np
+
+CHUNK_SIZE: int
+"""
+Default number of points per batch yielded by `chunks()` and
+`LayerPointProvider.iter_chunks()`
+"""
+
+class Point(TypedDict):
+    """
+    Docstring for Point
+    
+    :var lat: Latitude in decimal degrees
+    :vartype lat: float
+    :var lon: Longitude in decimal degrees
+    :vartype lon: float
+    :var w: Weight associated with the point
+    :vartype w: float
+    :var label: Human-readable label for the point
+    :vartype label: str
+    :var columns: Extra named numeric values, when the source provides any
+    :vartype columns: dict[str, float]
+    """
+    lat: float
+    lon: float
+    w: float
+    label: str
+    columns: NotRequired[dict[str, float]]
+
+
+class PointStore(Sequence[Point]):
+    """
+    Columnar collection of points.
+
+    Latitude, longitude and weight live in contiguous float64 arrays;
+    labels are interned, so each row only stores an index into `labels`.
+    Iterating a store yields `Point`s, so it can be used anywhere an
+    `Iterable[Point]` is expected.
+    """
+    lat: np.ndarray
+    lon: np.ndarray
+    w: np.ndarray
+    label_ids: np.ndarray
+    labels: list[str]
+    columns: dict[str, np.ndarray]
+
+    def __init__(self, lat: np.ndarray, lon: np.ndarray, w: np.ndarray, label_ids: np.ndarray, labels: list[str], columns: Optional[dict[str, np.ndarray]] = None) -> None: ...
+
+    @classmethod
+    def empty(cls: type[Self]) -> Self:
+        """
+        A store with no points
+        """
+        ...
+
+    @classmethod
+    def from_points(cls, points: Iterable[Point]) -> PointStore:
+        """
+        Build a store from any iterable of points. Stores are returned as-is.
+        """
+        ...
+
+    @classmethod
+    def concat(cls, stores: list[PointStore]) -> PointStore:
+        """
+        Join stores end to end, merging their label tables. Every store
+        must have the same extra columns.
+        """
+        ...
+
+    def __len__(self) -> int: ...
+    @overload
+    def __getitem__(self, i: int) -> Point: ...
+    @overload
+    def __getitem__(self, i: slice) -> PointStore: ...
+    def __iter__(self) -> Iterator[Point]: ...
+
+    def chunks(self, size: int = ...) -> Iterator[PointStore]:
+        """
+        Consecutive slices of at most `size` points. Slices are views
+        sharing this store's arrays and label table.
+        """
+        ...
+
+    def label(self, i: int) -> str:
+        """
+        Label of the point at index `i`
+        """
+        ...
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        The extra float64 column `name`
+        """
+        ...
+
+    def take(self, mask: np.ndarray | slice) -> PointStore:
+        """
+        Select points with a boolean mask, an index array or a slice. Labels are shared, not copied.
+        """
+        ...
+
+    def with_columns(self, **columns: np.ndarray) -> PointStore:
+        """
+        The same points with extra columns added (or replaced). Existing arrays are shared.
+        """
+        ...
+
+    def reweight(self, w: np.ndarray) -> PointStore:
+        """
+        The same points with new weights, e.g. a column computed by `layers.analytics`
+        """
+        ...
+
+    def heat_data(self) -> list[list[float]]:
+        """
+        `[lat, lon, w]` triples, as expected by `folium.plugins.HeatMap`
+        """
+        ...
+
+    def nbytes(self) -> int:
+        """
+        Approximate memory held by the columns and label table
+        """
+        ...
+
+
+class PointStoreBuilder:
+    """
+    Append-only builder for a `PointStore`.
+
+    Columns grow in place as contiguous buffers and labels are interned as
+    they arrive. The builder must not be appended to after `build()`, since
+    the resulting store shares its buffers.
+    """
+
+    def __init__(self) -> None: ...
+    def __len__(self) -> int: ...
+
+    def intern(self, label: str) -> int:
+        """
+        Return the id of `label` in the label table, adding it if unseen
+        """
+        ...
+
+    def add(self, lat: float, lon: float, w: float, label: str, columns: Optional[dict[str, float]] = None):
+        """
+        Append one point. The first point fixes the names of the extra
+        `columns`; every later point must supply the same names.
+        """
+        ...
+
+    def append(self, point: Point): ...
+    def build(self) -> PointStore: ...
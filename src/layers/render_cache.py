@@ -0,0 +1,226 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+from dataclasses import asdict
+from functools import cache
+from pathlib import Path
+from typing import Optional
+import folium
+import numpy as np
+from definitions import application_logger
+from instrumentation import count
+from .detail import BBox
+from .fragments import Fragment
+from .output import CODECS
+from .payload import PayloadOptions
+from .stats import LayerStats
+
+
+LOGGER = application_logger("RenderCache")
+
+# cached fragments refer to the map by this id, so every map they go into must use it
+MAP_ID = "layers"
+
+
+@cache
+def _renderer_identity() -> str:
+    """
+    Hash of the source of this package, so fragments rendered by older code
+    are not reused.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+
+    for module in sorted(Path(__file__).parent.glob("*.py")):
+        digest.update(module.name.encode())
+        digest.update(module.read_bytes())
+
+    digest.update(folium.__version__.encode())
+
+    return digest.hexdigest()
+
+
+def _data_identity(provider) -> str:
+    fingerprint = provider.fingerprint()
+
+    if fingerprint is not None:
+        return fingerprint
+
+    # no cheap identity for this source: hash the points instead, a batch at a time
+    digest = hashlib.blake2b(digest_size=16)
+    labels = None
+
+    for chunk in provider.iter_chunks():
+        for column in (chunk.lat, chunk.lon, chunk.w, chunk.label_ids, *chunk.columns.values()):
+            digest.update(np.ascontiguousarray(column).tobytes())
+
+        # slices of one store share its label table
+        if chunk.labels is not labels:
+            labels = chunk.labels
+            digest.update(json.dumps(labels).encode())
+
+    return digest.hexdigest()
+
+
+def layer_key(layer, bbox: Optional[BBox], zoom: int, payload: Optional[PayloadOptions] = None) -> str:
+    """
+    Content address of one layer's fragment: its data, its styling and the
+    render settings.
+    """
+    settings = {
+        "renderer": _renderer_identity(),
+        "layer": f"{type(layer).__module__}.{type(layer).__qualname__}",
+        "data": _data_identity(layer.lat_long_provider()),
+        "name": layer.name(),
+        "radius": layer.radius(),
+        "icon": layer.icon().options,
+        "markers": layer.marker_mode(),
+        "detail": asdict(layer.level_of_detail()),
+        "heatmap": layer.heatmap_engine(),
+        "tiles": asdict(layer.tile_options()),
+        "bbox": bbox,
+        "zoom": zoom,
+        "payload": None if payload is None else asdict(payload),
+    }
+
+    return hashlib.sha256(json.dumps(settings, sort_keys=True, default=repr).encode()).hexdigest()
+
+
+def _remove_asset(asset: str):
+    path = Path(asset)
+
+    if path.is_dir():
+        shutil.rmtree(path, ignore_errors=True)
+        return
+
+    for target in (path, *(path.with_name(f"{path.name}.{codec}") for codec in CODECS)):
+        target.unlink(missing_ok=True)
+
+
+class RenderCache:
+    """
+    Rendered layer fragments on disk, one JSON file per content address.
+    Each entry's modification time records when it was last used.
+    """
+    directory: Path
+    max_bytes: Optional[int]
+    max_age: Optional[float]
+    hits: int
+    misses: int
+    used: set[str]
+
+    def __init__(self, directory: str = ".render-cache", *, max_bytes: Optional[int] = None, max_age: Optional[float] = None) -> None:
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.reset()
+
+
+    def reset(self):
+        self.hits = 0
+        self.misses = 0
+        self.used = set()
+
+
+    def __path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+
+    def get(self, key: str) -> Optional[tuple[Fragment, LayerStats]]:
+        self.used.add(key)
+
+        try:
+            entry = json.loads(self.__path(key).read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            self.misses += 1
+            count("render_cache.misses")
+            return None
+        except (OSError, ValueError) as e:
+            LOGGER.warning(f"ignoring unreadable render cache entry {key}: {e}")
+            self.misses += 1
+            count("render_cache.misses")
+            return None
+
+        self.hits += 1
+        count("render_cache.hits")
+
+        # access times are unreliable (noatime, relatime), so a hit stamps the entry itself
+        try:
+            os.utime(self.__path(key))
+        except OSError:
+            pass
+
+        sections = entry["fragment"]
+        fragment = Fragment(*([tuple(part) for part in sections[section]] for section in ("header", "html", "script")), sections.get("assets", []))
+
+        return fragment, LayerStats(**entry["stats"])
+
+
+    def put(self, key: str, fragment: Fragment, stats: LayerStats):
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        path = self.__path(key)
+        tmp = path.with_name(path.name + f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps({ "fragment": asdict(fragment), "stats": asdict(stats) }), encoding="utf-8")
+
+        os.replace(tmp, path)
+
+
+    def __assets(self, path: Path) -> list[str]:
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))["fragment"].get("assets", [])
+        except (OSError, ValueError, KeyError):
+            return []
+
+
+    def sweep(self) -> int:
+        """
+        Evict least recently used entries until the cache is within
+        `max_bytes`, and entries unused for longer than `max_age` seconds,
+        along with the files only they refer to. Entries used since the last
+        `reset()` are kept. Returns the number of entries evicted.
+        """
+        if self.max_bytes is None and self.max_age is None:
+            return 0
+
+        entries = []
+
+        for path in self.directory.glob("*.json"):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+
+            entries.append((st.st_mtime, st.st_size, path))
+
+        now = time.time()
+        total = 0
+        kept, evicted = [], []
+
+        # most recently used first
+        for stamp, size, path in sorted(entries, reverse=True):
+            total += size
+            expired = self.max_age is not None and now - stamp > self.max_age
+            over = self.max_bytes is not None and total > self.max_bytes
+
+            (kept if path.stem in self.used or not (expired or over) else evicted).append(path)
+
+        if not evicted:
+            return 0
+
+        # content-addressed files may be shared by entries that stay
+        live = { asset for path in kept for asset in self.__assets(path) }
+
+        for path in evicted:
+            assets = self.__assets(path)
+            path.unlink(missing_ok=True)
+
+            for asset in assets:
+                if asset not in live:
+                    _remove_asset(asset)
+
+        count("render_cache.evictions", len(evicted))
+        LOGGER.info(f"evicted {len(evicted)} of {len(entries)} render cache entries")
+
+        return len(evicted)
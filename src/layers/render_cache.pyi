@@ -0,0 +1,69 @@
+from pathlib import Path
+from typing import Optional
+from .detail import BBox
+from .fragments import Fragment
+from .layer import Layer
+from .payload import PayloadOptions
+from .stats import LayerStats
+
+MAP_ID: str
+
+def layer_key(layer: Layer, bbox: Optional[BBox], zoom: int, payload: Optional[PayloadOptions] = None) -> str:
+    """
+    Content address of a layer's rendered fragment.
+
+    Covers the provider's `fingerprint()` (or a hash of its points), the
+    layer's class and styling (`name()`, `radius()`, `icon()`, marker,
+    detail and heat map settings), the render bbox, zoom and payload
+    options, and the source
+    of the `layers` package and the folium version.
+    """
+    ...
+
+class RenderCache:
+    """
+    Directory of rendered layer fragments keyed by `layer_key`. Entries are
+    only removed by `sweep()`, so renders of different views, and processes
+    sharing the directory, reuse each other's fragments.
+
+    :var max_bytes: Size `sweep()` trims the entries to, None for no limit
+    :var max_age: Seconds an entry may go unused before `sweep()` evicts
+        it, None for no limit
+    :var hits: Lookups answered since the last `reset()`
+    :var misses: Lookups not answered since the last `reset()`
+    :var used: Keys looked up since the last `reset()`
+    """
+    directory: Path
+    max_bytes: Optional[int]
+    max_age: Optional[float]
+    hits: int
+    misses: int
+    used: set[str]
+
+    def __init__(self, directory: str = ".render-cache", *, max_bytes: Optional[int] = None, max_age: Optional[float] = None) -> None: ...
+
+    def reset(self) -> None:
+        """
+        Clear the counters and `used`
+        """
+        ...
+
+    def get(self, key: str) -> Optional[tuple[Fragment, LayerStats]]:
+        """
+        The cached fragment and statistics, or None. A hit marks the entry
+        as just used.
+        """
+        ...
+
+    def put(self, key: str, fragment: Fragment, stats: LayerStats) -> None: ...
+
+    def sweep(self) -> int:
+        """
+        Least recently used eviction: drop entries unused for longer than
+        `max_age`, then the oldest until the rest fit in `max_bytes`. Entries
+        in `used` are never dropped. Payload files and tile pyramids of
+        evicted entries are removed unless a remaining entry refers to them.
+
+        :return: Number of entries evicted
+        """
+        ...
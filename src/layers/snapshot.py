@@ -0,0 +1,191 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from pathlib import Path
+from typing import Callable, Literal, Optional
+import numpy as np
+from definitions import application_logger
+from instrumentation import count
+from .point_store import PointStore
+
+
+LOGGER = application_logger("Snapshot")
+
+MAGIC = b"REMSNAP1"
+SUFFIX = ".snap"
+_HEADER = struct.Struct("<8sI")
+_ALIGN = 8
+
+Fingerprint = Literal["stat", "content"]
+
+
+def _align(offset: int) -> int:
+    return (offset + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def snapshot_path(file: str) -> Path:
+    p = Path(file)
+    return p.with_name(p.name + SUFFIX)
+
+
+def callable_identity(fn: Callable) -> Optional[str]:
+    """
+    Identify a callable by name and by the source of its defining module, so
+    edits to the function (or to helpers next to it) change the identity.
+    Returns None for callables that cannot be identified reliably, such as lambdas.
+    """
+    qualname = getattr(fn, "__qualname__", None)
+    module_name = getattr(fn, "__module__", None)
+
+    if qualname is None or module_name is None or "<lambda>" in qualname or "<locals>" in qualname:
+        return None
+
+    digest = hashlib.blake2b(digest_size=16)
+    module_file = getattr(sys.modules.get(module_name), "__file__", None)
+
+    if module_file is not None and os.path.exists(module_file):
+        digest.update(Path(module_file).read_bytes())
+    elif hasattr(fn, "__code__"):
+        digest.update(fn.__code__.co_code)
+        digest.update(repr(fn.__code__.co_consts).encode())
+    else:
+        return None
+
+    return f"{module_name}.{qualname}:{digest.hexdigest()}"
+
+
+def transformer_identity(transformer: Callable) -> Optional[str]:
+    fingerprint = getattr(transformer, "fingerprint", None)
+
+    if callable(fingerprint):
+        return fingerprint()
+
+    return callable_identity(transformer)
+
+
+def source_fingerprint(file: str, mode: Fingerprint = "stat") -> dict:
+    st = os.stat(file)
+
+    if mode == "stat":
+        return { "size": st.st_size, "mtime_ns": st.st_mtime_ns }
+
+    digest = hashlib.blake2b(digest_size=16)
+
+    with open(file, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+
+    return { "size": st.st_size, "blake2b": digest.hexdigest() }
+
+
+def snapshot_key(file: str, transformer: Callable, mode: Fingerprint = "stat") -> Optional[str]:
+    identity = transformer_identity(transformer)
+
+    if identity is None:
+        return None
+
+    payload = json.dumps({ "source": source_fingerprint(file, mode), "transformer": identity }, sort_keys=True)
+
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def write_snapshot(path: Path, key: str, store: PointStore):
+    labels = [label.encode("utf-8") for label in store.labels]
+    offsets = np.zeros(len(labels) + 1, dtype=np.uint64)
+    np.cumsum([len(label) for label in labels], out=offsets[1:])
+
+    names = list(store.columns)
+    header = json.dumps({ "key": key, "n": len(store), "labels": len(labels), "columns": names }).encode()
+
+    tmp = path.with_name(path.name + f".{os.getpid()}.tmp")
+
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, len(header)))
+        f.write(header)
+
+        # every array starts on an 8-byte boundary so it can be viewed in place
+        for column in (store.lat, store.lon, store.w, store.label_ids.astype(np.uint32), *(store.columns[name] for name in names), offsets):
+            f.write(b"\0" * (_align(f.tell()) - f.tell()))
+            f.write(np.ascontiguousarray(column).tobytes())
+
+        f.write(b"".join(labels))
+
+    os.replace(tmp, path)
+
+
+def read_snapshot(path: Path, key: str) -> Optional[PointStore]:
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return None
+
+    with f:
+        if os.fstat(f.fileno()).st_size < _HEADER.size:
+            return None
+
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    magic, header_len = _HEADER.unpack_from(mm, 0)
+
+    if magic != MAGIC:
+        return None
+
+    header = json.loads(mm[_HEADER.size:_HEADER.size + header_len])
+
+    if header["key"] != key:
+        return None
+
+    n = header["n"]
+    offset = _HEADER.size + header_len
+
+    def view(dtype, count):
+        nonlocal offset
+        offset = _align(offset)
+        # frombuffer over the mmap shares its pages; nothing is copied here
+        arr = np.frombuffer(mm, dtype=dtype, count=count, offset=offset)
+        offset += arr.nbytes
+        return arr
+
+    lat = view(np.float64, n)
+    lon = view(np.float64, n)
+    w = view(np.float64, n)
+    label_ids = view(np.uint32, n)
+    columns = { name: view(np.float64, n) for name in header.get("columns", []) }
+    offsets = view(np.uint64, header["labels"] + 1).tolist()
+
+    blob = mm[offset:offset + offsets[-1]]
+    labels = [blob[start:end].decode("utf-8") for start, end in zip(offsets, offsets[1:])]
+
+    return PointStore(lat, lon, w, label_ids, labels, columns)
+
+
+def cached_load(file: str, transformer: Callable, load: Callable[[], PointStore], mode: Fingerprint = "stat") -> PointStore:
+    key = snapshot_key(file, transformer, mode)
+
+    if key is None:
+        return load()
+
+    path = snapshot_path(file)
+
+    try:
+        store = read_snapshot(path, key)
+    except (ValueError, KeyError, struct.error) as e:
+        LOGGER.warning(f"ignoring corrupt snapshot {path}: {e}")
+        store = None
+
+    if store is not None:
+        count("snapshot.hits")
+        return store
+
+    count("snapshot.misses")
+    store = load()
+
+    try:
+        write_snapshot(path, key, store)
+    except OSError as e:
+        LOGGER.warning(f"could not write snapshot {path}: {e}")
+
+    return store
@@ -0,0 +1,68 @@
+from pathlib import Path
+from typing import Callable, Literal, Optional
+from .point_store import PointStore
+
+Fingerprint = Literal["stat", "content"]
+
+MAGIC: bytes
+SUFFIX: str
+
+def snapshot_path(file: str) -> Path:
+    """
+    Where the snapshot of `file` lives: `<file>.snap` in the same directory
+    """
+    ...
+
+def callable_identity(fn: Callable) -> Optional[str]:
+    """
+    Identify a callable by qualified name and by a hash of its defining
+    module's source. None for lambdas and nested functions.
+    """
+    ...
+
+def transformer_identity(transformer: Callable) -> Optional[str]:
+    """
+    `transformer.fingerprint()` if it has one, otherwise `callable_identity(transformer)`
+    """
+    ...
+
+def source_fingerprint(file: str, mode: Fingerprint = ...) -> dict: ...
+
+def snapshot_key(file: str, transformer: Callable, mode: Fingerprint = ...) -> Optional[str]:
+    """
+    Key a snapshot by the source file and the transformer that parsed it
+    
+    :param file: A path to the source file
+    :type file: str
+    :param transformer: The row transformer used to parse the file
+    :type transformer: Callable
+    :param mode: `"stat"` uses size and mtime, `"content"` hashes the file
+    :type mode: Fingerprint
+    :return: A hex key, or None if the transformer cannot be identified
+    :rtype: Optional[str]
+    """
+    ...
+
+def write_snapshot(path: Path, key: str, store: PointStore) -> None:
+    """
+    Atomically write `store` to `path`
+    
+    Layout: magic, a JSON header, then the lat/lon/w/label-id columns, the
+    extra columns named in the header and the label offsets as 8-byte
+    aligned little-endian arrays, then the UTF-8 label blob.
+    """
+    ...
+
+def read_snapshot(path: Path, key: str) -> Optional[PointStore]:
+    """
+    Map the snapshot at `path` into a `PointStore` without copying its
+    columns. None if it is missing or was written under a different key.
+    """
+    ...
+
+def cached_load(file: str, transformer: Callable, load: Callable[[], PointStore], mode: Fingerprint = ...) -> PointStore:
+    """
+    Return the snapshot of `file` if it is current; otherwise call `load`
+    and save its result as the new snapshot.
+    """
+    ...
@@ -0,0 +1,196 @@
+import math
+import numpy as np
+from .point_store import PointStore
+
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180.0
+HALF_CIRCUMFERENCE_KM = math.pi * EARTH_RADIUS_KM
+
+Neighbours = tuple[np.ndarray, np.ndarray]
+
+
+def haversine_km(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """
+    Great-circle distance in km; arguments broadcast like NumPy arrays.
+    """
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lon1, lat2, lon2))
+
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class SpatialIndex:
+    """
+    Fixed grid over latitude and longitude. Points are sorted by cell, so
+    the points of a run of cells along one grid row are a contiguous slice
+    found with `searchsorted`; a query only measures distances to the
+    points in the cells its area overlaps.
+    """
+    store: PointStore
+    cell_degrees: float
+
+    def __init__(self, store: PointStore, cell_degrees: float = 0.5) -> None:
+        self.store = store
+        self.cell_degrees = cell_degrees
+        self.rows = math.ceil(180 / cell_degrees)
+        self.cols = math.ceil(360 / cell_degrees)
+
+        cells = self.__row(store.lat) * self.cols + self.__col(store.lon)
+        self.order = np.argsort(cells, kind="stable")
+        self.cells = cells[self.order]
+        self.lat = store.lat[self.order]
+        self.lon = store.lon[self.order]
+
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+
+    def __row(self, lat) -> np.ndarray:
+        return np.clip(np.floor((np.asarray(lat) + 90.0) / self.cell_degrees), 0, self.rows - 1).astype(np.int64)
+
+
+    def __col(self, lon) -> np.ndarray:
+        # wrap so 180 and -180 share a column
+        return (np.floor((np.asarray(lon) + 180.0) / self.cell_degrees).astype(np.int64)) % self.cols
+
+
+    def __candidates(self, south: float, north: float, west: float, east: float) -> np.ndarray:
+        """
+        Sorted positions of every point in the cells covering the box. A
+        box with `west > east` crosses the antimeridian.
+        """
+        first_row, last_row = int(self.__row(south)), int(self.__row(north))
+
+        if east - west >= 360:
+            spans = [(0, self.cols - 1)]
+        else:
+            w, e = int(self.__col(west)), int(self.__col(east))
+            spans = [(w, e)] if w <= e else [(w, self.cols - 1), (0, e)]
+
+        bounds = []
+
+        for row in range(first_row, last_row + 1):
+            for w, e in spans:
+                bounds.append((row * self.cols + w, row * self.cols + e + 1))
+
+        if not bounds:
+            return np.empty(0, dtype=np.int64)
+
+        edges = np.searchsorted(self.cells, np.array(bounds, dtype=np.int64).ravel()).reshape(-1, 2)
+
+        return np.concatenate([np.arange(start, end) for start, end in edges.tolist()])
+
+
+    def __radius_box(self, lat: float, lon: float, km: float) -> tuple[float, float, float, float]:
+        dlat = km / KM_PER_DEGREE
+        south, north = lat - dlat, lat + dlat
+
+        if south <= -90 or north >= 90:
+            return max(south, -90.0), min(north, 90.0), -180.0, 180.0
+
+        # the widest parallel in the box sets how far east and west it reaches
+        widest = math.cos(math.radians(max(abs(south), abs(north))))
+        dlon = km / (KM_PER_DEGREE * widest)
+
+        if dlon >= 180:
+            return south, north, -180.0, 180.0
+
+        west, east = lon - dlon, lon + dlon
+
+        return south, north, west + 360 if west < -180 else west, east - 360 if east > 180 else east
+
+
+    def within_radius(self, lat: float, lon: float, km: float) -> Neighbours:
+        """
+        Indices into `store` of the points within `km` of (lat, lon), nearest
+        first, with their distances in km.
+        """
+        south, north, west, east = self.__radius_box(lat, lon, km)
+
+        if west == -180.0 and east == 180.0:
+            positions = np.arange(len(self.cells))
+        else:
+            positions = self.__candidates(south, north, west, east)
+
+        distances = haversine_km(lat, lon, self.lat[positions], self.lon[positions])
+        inside = distances <= km
+        positions, distances = positions[inside], distances[inside]
+
+        nearest = np.argsort(distances, kind="stable")
+
+        return self.order[positions[nearest]], distances[nearest]
+
+
+    def in_bbox(self, south: float, west: float, north: float, east: float) -> np.ndarray:
+        """
+        Indices into `store` of the points inside the box, in index order.
+        A box with `west > east` crosses the antimeridian.
+        """
+        positions = self.__candidates(south, north, west, east)
+        lat, lon = self.lat[positions], self.lon[positions]
+
+        inside = (lat >= south) & (lat <= north)
+        inside &= ((lon >= west) & (lon <= east)) if west <= east else ((lon >= west) | (lon <= east))
+
+        return np.sort(self.order[positions[inside]])
+
+
+    def k_nearest(self, lat: float, lon: float, k: int) -> Neighbours:
+        """
+        Indices into `store` of the `k` points nearest (lat, lon), nearest
+        first, with their distances in km. Fewer are returned only if the
+        store has fewer than `k` points.
+        """
+        k = min(k, len(self))
+
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+
+        km = self.cell_degrees * KM_PER_DEGREE
+
+        # widen the search until the circle holds k points; anything outside it is farther
+        while True:
+            indices, distances = self.within_radius(lat, lon, km)
+
+            if len(indices) >= k or km >= HALF_CIRCUMFERENCE_KM:
+                return indices[:k], distances[:k]
+
+            km *= 2
+
+
+    def within_radius_batch(self, lats, lons, km) -> list[Neighbours]:
+        """
+        `within_radius` for every query point; `km` may be a scalar or one radius per query.
+        """
+        lats, lons = np.asarray(lats, dtype=np.float64), np.asarray(lons, dtype=np.float64)
+        radii = np.broadcast_to(np.asarray(km, dtype=np.float64), lats.shape)
+
+        return [self.within_radius(lat, lon, r) for lat, lon, r in zip(lats.tolist(), lons.tolist(), radii.tolist())]
+
+
+    def in_bbox_batch(self, boxes) -> list[np.ndarray]:
+        """
+        `in_bbox` for every `(south, west, north, east)` row of `boxes`.
+        """
+        return [self.in_bbox(*box) for box in np.asarray(boxes, dtype=np.float64).reshape(-1, 4).tolist()]
+
+
+    def k_nearest_batch(self, lats, lons, k: int) -> Neighbours:
+        """
+        `k_nearest` for every query point, as `(n, k)` arrays of indices and
+        distances. Rows are padded with -1 and inf when the store has fewer
+        than `k` points.
+        """
+        lats, lons = np.asarray(lats, dtype=np.float64), np.asarray(lons, dtype=np.float64)
+        indices = np.full((len(lats), k), -1, dtype=np.int64)
+        distances = np.full((len(lats), k), np.inf)
+
+        for i, (lat, lon) in enumerate(zip(lats.tolist(), lons.tolist())):
+            found, d = self.k_nearest(lat, lon, k)
+            indices[i, :len(found)] = found
+            distances[i, :len(found)] = d
+
+        return indices, distances
@@ -0,0 +1,83 @@
+import numpy as np
+from numpy.typing import ArrayLike
+from .point_store import PointStore
+
+EARTH_RADIUS_KM: float
+KM_PER_DEGREE: float
+HALF_CIRCUMFERENCE_KM: float
+
+Neighbours = tuple[np.ndarray, np.ndarray]
+"""
+`(indices, distances)`: indices into the indexed `PointStore` and the
+matching great-circle distances in km
+"""
+
+def haversine_km(lat1: ArrayLike, lon1: ArrayLike, lat2: ArrayLike, lon2: ArrayLike) -> np.ndarray:
+    """
+    Great-circle distance in km between points given in decimal degrees.
+    Arguments broadcast against each other like NumPy arrays.
+    """
+    ...
+
+class SpatialIndex:
+    """
+    Grid index over a `PointStore` for radius, bounding box and nearest
+    neighbour queries.
+
+    Points are bucketed into `cell_degrees`-sized latitude/longitude cells
+    and sorted by cell, so a query only measures distances to the points
+    in the cells its search area overlaps. Queries near the poles and
+    across the antimeridian are handled.
+
+    :var store: The indexed points
+    :vartype store: PointStore
+    :var cell_degrees: Side of a grid cell in degrees
+    :vartype cell_degrees: float
+    """
+    store: PointStore
+    cell_degrees: float
+
+    def __init__(self, store: PointStore, cell_degrees: float = 0.5) -> None: ...
+    def __len__(self) -> int: ...
+
+    def within_radius(self, lat: float, lon: float, km: float) -> Neighbours:
+        """
+        Points within `km` of (lat, lon), nearest first.
+        """
+        ...
+
+    def in_bbox(self, south: float, west: float, north: float, east: float) -> np.ndarray:
+        """
+        Indices of the points inside the box, in ascending order. A box with
+        `west > east` crosses the antimeridian.
+        """
+        ...
+
+    def k_nearest(self, lat: float, lon: float, k: int) -> Neighbours:
+        """
+        The `k` points nearest (lat, lon), nearest first; fewer only when the
+        store holds fewer than `k` points.
+        """
+        ...
+
+    def within_radius_batch(self, lats: ArrayLike, lons: ArrayLike, km: ArrayLike) -> list[Neighbours]:
+        """
+        `within_radius` for each query point.
+
+        :param km: One radius for every query, or one per query
+        """
+        ...
+
+    def in_bbox_batch(self, boxes: ArrayLike) -> list[np.ndarray]:
+        """
+        `in_bbox` for each `(south, west, north, east)` row of `boxes`.
+        """
+        ...
+
+    def k_nearest_batch(self, lats: ArrayLike, lons: ArrayLike, k: int) -> Neighbours:
+        """
+        `k_nearest` for each query point, as `(len(lats), k)` arrays. Rows are
+        padded with index -1 and distance inf when the store holds fewer
+        than `k` points.
+        """
+        ...
@@ -0,0 +1,84 @@
+import math
+from dataclasses import dataclass
+from typing import Iterable
+import numpy as np
+from .point_store import PointStore
+
+
+@dataclass(frozen=True)
+class LayerStats:
+    count: int = 0
+    lat_sum: float = 0.0
+    lon_sum: float = 0.0
+    w_sum: float = 0.0
+    w_lat_sum: float = 0.0
+    w_lon_sum: float = 0.0
+    south: float = math.inf
+    west: float = math.inf
+    north: float = -math.inf
+    east: float = -math.inf
+
+
+    @classmethod
+    def of(cls, store: PointStore) -> "LayerStats":
+        if len(store) == 0:
+            return cls()
+
+        return cls(
+            count=len(store),
+            lat_sum=float(store.lat.sum()),
+            lon_sum=float(store.lon.sum()),
+            w_sum=float(store.w.sum()),
+            w_lat_sum=float(store.w @ store.lat),
+            w_lon_sum=float(store.w @ store.lon),
+            south=float(store.lat.min()),
+            west=float(store.lon.min()),
+            north=float(store.lat.max()),
+            east=float(store.lon.max()),
+        )
+
+
+    @classmethod
+    def combine(cls, parts: Iterable["LayerStats"]) -> "LayerStats":
+        total = cls()
+
+        for part in parts:
+            total = total + part
+
+        return total
+
+
+    def __add__(self, other: "LayerStats") -> "LayerStats":
+        return LayerStats(
+            count=self.count + other.count,
+            lat_sum=self.lat_sum + other.lat_sum,
+            lon_sum=self.lon_sum + other.lon_sum,
+            w_sum=self.w_sum + other.w_sum,
+            w_lat_sum=self.w_lat_sum + other.w_lat_sum,
+            w_lon_sum=self.w_lon_sum + other.w_lon_sum,
+            south=min(self.south, other.south),
+            west=min(self.west, other.west),
+            north=max(self.north, other.north),
+            east=max(self.east, other.east),
+        )
+
+
+    def add(self, lat, lon, w) -> "LayerStats":
+        return self + LayerStats.of(PointStore(np.atleast_1d(lat), np.atleast_1d(lon), np.atleast_1d(w), np.zeros(np.size(lat), dtype=np.uint32), [""]))
+
+
+    def center(self, weighted: bool = False) -> tuple[float, float]:
+        if self.count == 0:
+            raise ValueError("no points to center on")
+
+        if weighted and self.w_sum != 0:
+            return self.w_lat_sum / self.w_sum, self.w_lon_sum / self.w_sum
+
+        return self.lat_sum / self.count, self.lon_sum / self.count
+
+
+    def bounds(self) -> tuple[tuple[float, float], tuple[float, float]]:
+        if self.count == 0:
+            raise ValueError("no points to bound")
+
+        return (self.south, self.west), (self.north, self.east)
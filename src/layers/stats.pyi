@@ -0,0 +1,70 @@
+from dataclasses import dataclass
+from typing import Iterable
+from numpy.typing import ArrayLike
+from .point_store import PointStore
+
+@dataclass(frozen=True)
+class LayerStats:
+    """
+    Mergeable summary of a set of points.
+
+    Sums rather than means are kept, so summaries of separate layers (or of
+    separate batches of one layer) combine exactly with `+`. An empty
+    summary has count 0 and an inverted, infinite bounding box.
+
+    :var count: Number of points
+    :var lat_sum: Sum of latitudes
+    :var lon_sum: Sum of longitudes
+    :var w_sum: Sum of weights
+    :var w_lat_sum: Sum of weight times latitude
+    :var w_lon_sum: Sum of weight times longitude
+    :var south: Smallest latitude
+    :var west: Smallest longitude
+    :var north: Largest latitude
+    :var east: Largest longitude
+    """
+    count: int = ...
+    lat_sum: float = ...
+    lon_sum: float = ...
+    w_sum: float = ...
+    w_lat_sum: float = ...
+    w_lon_sum: float = ...
+    south: float = ...
+    west: float = ...
+    north: float = ...
+    east: float = ...
+
+    @classmethod
+    def of(cls, store: PointStore) -> LayerStats:
+        """
+        Summarize a store in one vectorized pass over its columns
+        """
+        ...
+
+    @classmethod
+    def combine(cls, parts: Iterable[LayerStats]) -> LayerStats:
+        """
+        Sum of several summaries
+        """
+        ...
+
+    def __add__(self, other: LayerStats) -> LayerStats: ...
+
+    def add(self, lat: ArrayLike, lon: ArrayLike, w: ArrayLike) -> LayerStats:
+        """
+        This summary updated with more points
+        """
+        ...
+
+    def center(self, weighted: bool = False) -> tuple[float, float]:
+        """
+        Mean `(lat, lon)`, weighted by `w` when `weighted` (unweighted if the
+        weights sum to zero). Raises ValueError when there are no points.
+        """
+        ...
+
+    def bounds(self) -> tuple[tuple[float, float], tuple[float, float]]:
+        """
+        `((south, west), (north, east))`. Raises ValueError when there are no points.
+        """
+        ...
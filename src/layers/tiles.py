@@ -0,0 +1,268 @@
+import hashlib
+import json
+import math
+import os
+import re
+import shutil
+import struct
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Literal, Optional
+import numpy as np
+from definitions import application_logger
+from instrumentation import timed
+from .point_store import PointStore
+
+
+LOGGER = application_logger("Tiles")
+
+HeatmapEngine = Literal["client", "tiles"]
+
+TILE_SIZE = 256
+MANIFEST = "pyramid.json"
+
+# leaflet.heat's default gradient, so both engines look alike
+GRADIENT = { 0.4: (0, 0, 255), 0.6: (0, 255, 255), 0.7: (0, 255, 0), 0.8: (255, 255, 0), 1.0: (255, 0, 0) }
+
+
+@dataclass(frozen=True)
+class TileOptions:
+    directory: str = "tiles"
+    url: Optional[str] = None
+    min_zoom: int = 3
+    max_zoom: int = 9
+    blur: int = 22
+    min_opacity: float = 0.25
+    workers: Optional[int] = None
+
+
+def slug(name: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", name.casefold()).strip("-")
+
+
+def project(lat: np.ndarray, lon: np.ndarray, zoom: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Web-mercator global pixel coordinates at `zoom`.
+    """
+    scale = TILE_SIZE * (1 << zoom)
+    sin = np.sin(np.radians(np.clip(lat, -85.05112878, 85.05112878)))
+
+    x = (lon + 180.0) / 360.0 * scale
+    y = (0.5 - np.log((1 + sin) / (1 - sin)) / (4 * math.pi)) * scale
+
+    return x, y
+
+
+def _chunk(kind: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+
+def encode_png(indices: np.ndarray, palette: np.ndarray) -> bytes:
+    """
+    Indexed-colour PNG: one byte per pixel into a palette of up to 256 RGBA entries.
+    """
+    height, width = indices.shape
+
+    # filter type 0 (none) in front of every scanline
+    raw = np.concatenate((np.zeros((height, 1), dtype=np.uint8), indices.astype(np.uint8)), axis=1)
+
+    return (b"\x89PNG\r\n\x1a\n"
+            + _chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 3, 0, 0, 0))
+            + _chunk(b"PLTE", np.ascontiguousarray(palette[:, :3], dtype=np.uint8).tobytes())
+            + _chunk(b"tRNS", np.ascontiguousarray(palette[:, 3], dtype=np.uint8).tobytes())
+            + _chunk(b"IDAT", zlib.compress(raw.tobytes(), 6))
+            + _chunk(b"IEND", b""))
+
+
+def _palette() -> np.ndarray:
+    """
+    RGBA entry for each opacity level 0-255: the gradient colour at that
+    level, with the level itself as alpha.
+    """
+    stops = sorted(GRADIENT.items())
+    positions = [0.0] + [p for p, _ in stops]
+    colors = np.array([stops[0][1]] + [c for _, c in stops], dtype=np.float64)
+    t = np.linspace(0.0, 1.0, 256)
+
+    rgb = [np.interp(t, positions, colors[:, channel]) for channel in range(3)]
+
+    return np.stack(rgb + [np.arange(256)], axis=1).astype(np.uint8)
+
+
+class KernelDensity:
+    """
+    Weighted Gaussian kernel density in screen pixels, composited the way
+    leaflet.heat stacks its translucent blobs: each point contributes an
+    opacity of `w / max(w)` (at least `min_opacity`) that falls off with
+    distance, and the tile's opacity is `1 - exp(-sum)`.
+    """
+    radius: int
+    margin: int
+    alpha: np.ndarray
+
+    def __init__(self, store: PointStore, radius: int, blur: int, min_opacity: float) -> None:
+        self.radius = radius
+        self.margin = radius + blur
+        self.sigma = self.margin / 3.0
+        self.lat = store.lat
+        self.lon = store.lon
+
+        peak = float(store.w.max()) if len(store) else 1.0
+        self.alpha = np.clip(store.w / (peak if peak > 0 else 1.0), min_opacity, 1.0)
+
+        # rows of the separable blur: output pixel i gathers grid cells i .. i + 2 * margin
+        offsets = np.arange(TILE_SIZE)[:, None] + self.margin - np.arange(TILE_SIZE + 2 * self.margin)[None, :]
+        kernel = np.exp(-(offsets.astype(np.float64) ** 2) / (2 * self.sigma ** 2))
+        kernel[np.abs(offsets) > self.margin] = 0.0
+        self.kernel = kernel
+
+        self.palette = _palette()
+        self.__zoom: Optional[int] = None
+
+
+    def __at_zoom(self, zoom: int):
+        if self.__zoom != zoom:
+            x, y = project(self.lat, self.lon, zoom)
+            order = np.argsort(x, kind="stable")
+            self.__x, self.__y, self.__a = x[order], y[order], self.alpha[order]
+            self.__zoom = zoom
+
+
+    def tiles(self, zoom: int) -> list[tuple[int, int]]:
+        """
+        Every tile at `zoom` that a point's kernel reaches.
+        """
+        self.__at_zoom(zoom)
+        last = (1 << zoom) - 1
+        found = set()
+
+        for dx in (-self.margin, self.margin):
+            for dy in (-self.margin, self.margin):
+                tx = np.clip((self.__x + dx) // TILE_SIZE, 0, last).astype(np.int64)
+                ty = np.clip((self.__y + dy) // TILE_SIZE, 0, last).astype(np.int64)
+                found.update(zip(tx.tolist(), ty.tolist()))
+
+        return sorted(found)
+
+
+    def density(self, zoom: int, tx: int, ty: int) -> np.ndarray:
+        self.__at_zoom(zoom)
+        m = self.margin
+        size = TILE_SIZE + 2 * m
+        left, top = tx * TILE_SIZE - m, ty * TILE_SIZE - m
+
+        start, end = np.searchsorted(self.__x, (left, left + size))
+        gx = (self.__x[start:end] - left).astype(np.int64)
+        gy = np.floor(self.__y[start:end] - top).astype(np.int64)
+        a = self.__a[start:end]
+
+        inside = (gy >= 0) & (gy < size) & (gx < size)
+        grid = np.zeros((size, size), dtype=np.float64)
+        np.add.at(grid, (gy[inside], gx[inside]), a[inside])
+
+        # only occupied rows and columns contribute, which keeps sparse tiles cheap
+        rows = np.unique(gy[inside])
+        cols = np.unique(gx[inside])
+
+        return self.kernel[:, rows] @ grid[np.ix_(rows, cols)] @ self.kernel[:, cols].T
+
+
+    def render(self, zoom: int, tx: int, ty: int) -> Optional[bytes]:
+        """
+        The PNG for one tile, or None when nothing in it would be visible.
+        """
+        opacity = 1.0 - np.exp(-self.density(zoom, tx, ty))
+        level = np.clip(opacity * 255.0, 0, 255).astype(np.uint8)
+
+        if not level.any():
+            return None
+
+        return encode_png(level, self.palette)
+
+
+_KDE: Optional[KernelDensity] = None
+
+
+def _init_worker(store: PointStore, radius: int, blur: int, min_opacity: float):
+    global _KDE
+    _KDE = KernelDensity(store, radius, blur, min_opacity)
+
+
+def _render_batch(job: tuple[str, int, list[tuple[int, int]]]) -> int:
+    directory, zoom, tiles = job
+    assert _KDE is not None
+    written = 0
+
+    for tx, ty in tiles:
+        png = _KDE.render(zoom, tx, ty)
+
+        if png is None:
+            continue
+
+        path = Path(directory, str(zoom), str(tx), f"{ty}.png")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(png)
+        written += 1
+
+    return written
+
+
+def pyramid_key(store: PointStore, radius: int, options: TileOptions) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+
+    for column in (store.lat, store.lon, store.w):
+        digest.update(np.ascontiguousarray(column).tobytes())
+
+    params = { k: v for k, v in asdict(options).items() if k not in ("directory", "url", "workers") }
+    digest.update(json.dumps({ "radius": radius, **params }, sort_keys=True).encode())
+
+    return digest.hexdigest()
+
+
+@timed("tiles")
+def build_pyramid(store: PointStore, radius: int, directory: str, options: TileOptions = TileOptions(), *, batch_size: int = 64) -> int:
+    """
+    Write the XYZ tiles `directory/{z}/{x}/{y}.png` for every zoom level in
+    `options`, across `options.workers` processes. A pyramid whose manifest
+    matches the points and settings is left as is. Returns the tile count.
+    """
+    key = pyramid_key(store, radius, options)
+    manifest = Path(directory, MANIFEST)
+
+    try:
+        previous = json.loads(manifest.read_text())
+        if previous.get("key") == key:
+            return previous["tiles"]
+    except (OSError, ValueError):
+        pass
+
+    # tiles from an older pyramid may lie where the new one has none
+    for stale in Path(directory).glob("[0-9]*"):
+        if stale.is_dir():
+            shutil.rmtree(stale)
+
+    kde = KernelDensity(store, radius, options.blur, options.min_opacity)
+    jobs = []
+
+    for zoom in range(options.min_zoom, options.max_zoom + 1):
+        tiles = kde.tiles(zoom)
+        jobs.extend((directory, zoom, tiles[i:i + batch_size]) for i in range(0, len(tiles), batch_size))
+
+    workers = options.workers if options.workers is not None else os.cpu_count() or 1
+
+    if workers <= 1 or len(jobs) <= 1:
+        _init_worker(store, radius, options.blur, options.min_opacity)
+        written = sum(map(_render_batch, jobs))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(store, radius, options.blur, options.min_opacity)) as pool:
+            written = sum(pool.map(_render_batch, jobs))
+
+    manifest.parent.mkdir(parents=True, exist_ok=True)
+    manifest.write_text(json.dumps({ "key": key, "tiles": written, "min_zoom": options.min_zoom, "max_zoom": options.max_zoom }))
+
+    LOGGER.info(f"wrote {written} heat map tiles to {directory}")
+
+    return written
@@ -0,0 +1,113 @@
+from dataclasses import dataclass
+from typing import Literal, Optional
+import numpy as np
+from .point_store import PointStore
+
+HeatmapEngine = Literal["client", "tiles"]
+
+TILE_SIZE: int
+MANIFEST: str
+GRADIENT: dict[float, tuple[int, int, int]]
+
+@dataclass(frozen=True)
+class TileOptions:
+    """
+    Settings for a server-side heat map tile pyramid.
+
+    :var directory: Root directory the layer's tiles are written under
+    :vartype directory: str
+    :var url: URL root the map loads tiles from; defaults to `directory`,
+        which works when the map HTML is saved next to it
+    :vartype url: Optional[str]
+    :var min_zoom: Lowest zoom level rendered; the browser scales these
+        tiles down when zoomed further out
+    :vartype min_zoom: int
+    :var max_zoom: Highest zoom level rendered; the browser scales these
+        tiles up when zoomed further in
+    :vartype max_zoom: int
+    :var blur: Extra kernel reach in pixels beyond the layer's radius
+    :vartype blur: int
+    :var min_opacity: Lowest opacity a single point contributes
+    :vartype min_opacity: float
+    :var workers: Processes to render with; defaults to the CPU count
+    :vartype workers: Optional[int]
+    """
+    directory: str = ...
+    url: Optional[str] = ...
+    min_zoom: int = ...
+    max_zoom: int = ...
+    blur: int = ...
+    min_opacity: float = ...
+    workers: Optional[int] = ...
+
+def slug(name: str) -> str:
+    """
+    Lowercase, dash-separated form of a layer name, used as its tile directory
+    """
+    ...
+
+def project(lat: np.ndarray, lon: np.ndarray, zoom: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Project coordinates to web-mercator global pixel coordinates at `zoom`.
+    """
+    ...
+
+def encode_png(indices: np.ndarray, palette: np.ndarray) -> bytes:
+    """
+    Encode a `(height, width)` array of palette indices as an indexed-colour
+    PNG; `palette` is a `(n, 4)` uint8 RGBA table with `n <= 256`.
+    """
+    ...
+
+class KernelDensity:
+    """
+    Weighted Gaussian kernel density of a point store on the web-mercator
+    tile grid.
+
+    The kernel reaches `radius + blur` screen pixels at every zoom level,
+    like the client-side heat map. Points are binned onto the tile plus a
+    margin and blurred with two matrix products, so a tile costs the same
+    however many points fall in it.
+    """
+    radius: int
+    margin: int
+    alpha: np.ndarray
+
+    def __init__(self, store: PointStore, radius: int, blur: int, min_opacity: float) -> None: ...
+
+    def tiles(self, zoom: int) -> list[tuple[int, int]]:
+        """
+        `(x, y)` of every tile at `zoom` that some point's kernel reaches.
+        """
+        ...
+
+    def density(self, zoom: int, tx: int, ty: int) -> np.ndarray:
+        """
+        Summed kernel contributions for each pixel of one tile.
+        """
+        ...
+
+    def render(self, zoom: int, tx: int, ty: int) -> Optional[bytes]:
+        """
+        The PNG for one tile, or None if it would be fully transparent.
+        """
+        ...
+
+def pyramid_key(store: PointStore, radius: int, options: TileOptions) -> str:
+    """
+    Digest of the points and the settings that affect tile pixels.
+    """
+    ...
+
+def build_pyramid(store: PointStore, radius: int, directory: str, options: TileOptions = ..., *, batch_size: int = ...) -> int:
+    """
+    Write an XYZ tile pyramid `directory/{z}/{x}/{y}.png`.
+
+    Tiles are rendered in batches of `batch_size` across `options.workers`
+    processes. A manifest in `directory` records what was rendered, so an
+    unchanged pyramid is not rebuilt. Otherwise the zoom directories of the previous
+    pyramid are removed first.
+
+    :return: Number of tiles written
+    """
+    ...
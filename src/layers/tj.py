@@ -1,7 +1,10 @@
 from .layer import Layer, LayerPointProvider
 from .csv_layer import csv_points, CSVImporter
-from typing import cast
-import folium
+from typing import TYPE_CHECKING, cast
+
+if TYPE_CHECKING:
+    import folium
+    from .markers import MarkerMode
 
 
 TJ_IMPORTER = CSVImporter({ "label": "name", "lat": "lat", "lon": "long" }, 1)
@@ -36,7 +39,9 @@ class TJLayer(Layer):
         return 30
     
     
-    def icon(self) -> folium.Icon:
+    def icon(self) -> "folium.Icon":
+        import folium
+
         return folium.Icon(
             color="red",
             icon="t",
@@ -44,5 +49,10 @@ class TJLayer(Layer):
         )
     
 
+    def marker_mode(self) -> "MarkerMode":
+        # one array for every store instead of a folium.Marker each
+        return "fast"
+        
+
     def lat_long_provider(self) -> TJLayerPointProvider:
         return self.points
@@ -1,4 +1,5 @@
-from .layer import Layer, LayerPointProvider, Point
+from .layer import Layer, LayerPointProvider
+from .point_store import PointStore
 from .csv_layer import CSVImporter
 import folium
 
@@ -6,7 +7,9 @@ TJ_IMPORTER: CSVImporter
 
 class TJLayerPointProvider(LayerPointProvider):
     def __init__(self) -> None: ...
-    def point_list(self) -> list[Point]: ...
+    def point_list(self) -> PointStore: ...
+    @classmethod
+    def preload(cls) -> None: ...
 
 class TJLayer(Layer):
     points: TJLayerPointProvider
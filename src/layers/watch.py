@@ -0,0 +1,93 @@
+import os
+import time
+from pathlib import Path
+from typing import Iterable, Optional
+from definitions import application_logger
+from instrumentation import span
+from .layer import Stack
+from .output import Codec, minify_html, precompress
+from .render_cache import RenderCache
+
+
+LOGGER = application_logger("Watch")
+
+SourceState = dict[str, Optional[tuple[int, int]]]
+
+
+def source_state(stack: Stack) -> SourceState:
+    state: SourceState = {}
+
+    for layer in stack.layers:
+        for source in layer.lat_long_provider().sources():
+            try:
+                st = os.stat(source)
+                state[source] = (st.st_mtime_ns, st.st_size)
+            except FileNotFoundError:
+                state[source] = None
+
+    return state
+
+
+def render_to(stack: Stack, output: str, cache: RenderCache, *, minify: bool = False, compress: Iterable[Codec] = (), **render_kwargs) -> float:
+    """
+    Render `stack` through `cache` and atomically replace `output`, then
+    write its precompressed copies. Returns the seconds taken.
+    """
+    start = time.perf_counter()
+    cache.reset()
+
+    m = stack.render(cache=cache, **render_kwargs)
+
+    path = Path(output)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+
+    with span("save"):
+        html = m.get_root().render()
+        tmp.write_bytes((minify_html(html) if minify else html).encode("utf8"))
+
+    os.replace(tmp, path)
+
+    with span("compress"):
+        precompress(path, compress)
+
+    with span("sweep"):
+        cache.sweep()
+
+    return time.perf_counter() - start
+
+
+def watch(stack: Stack, output: str, cache: RenderCache, *, interval: float = 0.1, **render_kwargs):
+    """
+    Render `stack` to `output`, then poll the layers' source files every
+    `interval` seconds and re-render whenever one changes. Only layers whose
+    inputs changed are rendered again; the rest come from `cache`.
+    Runs until interrupted.
+    """
+    state = source_state(stack)
+    elapsed = render_to(stack, output, cache, **render_kwargs)
+    LOGGER.info(f"wrote {output} in {elapsed * 1000:.0f} ms; watching {len(state)} files")
+
+    while True:
+        time.sleep(interval)
+        current = source_state(stack)
+        changed = { source for source in current if current[source] != state.get(source) }
+
+        if not changed:
+            continue
+
+        state = current
+
+        for layer in stack.layers:
+            provider = layer.lat_long_provider()
+
+            if changed.intersection(provider.sources()):
+                provider.invalidate()
+
+        try:
+            elapsed = render_to(stack, output, cache, **render_kwargs)
+        except Exception as e:
+            # a half-written source file; the next change will trigger another try
+            LOGGER.error(f"render failed after change to {sorted(changed)}: {e}")
+            continue
+
+        LOGGER.info(f"{', '.join(sorted(changed))} changed: re-rendered {cache.misses} of {cache.hits + cache.misses} layers in {elapsed * 1000:.0f} ms")
@@ -0,0 +1,35 @@
+from typing import Iterable, Optional
+from .layer import Stack
+from .output import Codec
+from .render_cache import RenderCache
+
+SourceState = dict[str, Optional[tuple[int, int]]]
+
+def source_state(stack: Stack) -> SourceState:
+    """
+    `(mtime_ns, size)` of every source file of every layer; None for missing files
+    """
+    ...
+
+def render_to(stack: Stack, output: str, cache: RenderCache, *, minify: bool = False, compress: Iterable[Codec] = (), **render_kwargs) -> float:
+    """
+    Render `stack` through `cache`, atomically replace `output`, then
+    `sweep()` the cache down to its limits. Entries this render used are
+    always kept.
+
+    :param minify: Write the page through `output.minify_html`
+    :param compress: Also write `output.gz` and/or `output.br`; copies of
+        other codecs left by earlier renders are removed
+
+    :return: Seconds taken
+    """
+    ...
+
+def watch(stack: Stack, output: str, cache: RenderCache, *, interval: float = ..., **render_kwargs) -> None:
+    """
+    Render to `output`, then poll the layers' `sources()` every `interval`
+    seconds. When a file changes, the layers reading it are invalidated and
+    the stack is rendered again; unchanged layers come from `cache`.
+    Runs until interrupted.
+    """
+    ...
@@ -0,0 +1,58 @@
+import functools
+from typing import Callable
+import numpy as np
+
+
+Columns = dict[str, np.ndarray]
+
+
+class ColumnFunction:
+    """
+    A weight or column function over whole columns: it receives the named
+    CSV columns as float64 arrays (blank cells as NaN) and returns one value
+    per row.
+    """
+    columns: tuple[str, ...]
+
+    def __init__(self, fn: Callable[[Columns], np.ndarray], columns: tuple[str, ...]) -> None:
+        functools.update_wrapper(self, fn)
+        self.fn = fn
+        self.columns = columns
+
+
+    def __reduce__(self):
+        # pickle by name, like the module-level function it decorates
+        return self.__qualname__
+
+
+    def __call__(self, columns: Columns) -> np.ndarray:
+        return np.asarray(self.fn(columns), dtype=np.float64)
+
+
+    def row(self, header: list[str], row: list[str]) -> float:
+        """
+        Evaluate for a single row, for callers that work row by row.
+        """
+        values = { name: to_floats([row[header.index(name)]]) for name in self.columns }
+        return float(self(values)[0])
+
+
+def vectorized(*columns: str) -> Callable[[Callable[[Columns], np.ndarray]], ColumnFunction]:
+    def wrap(fn: Callable[[Columns], np.ndarray]) -> ColumnFunction:
+        return ColumnFunction(fn, columns)
+
+    return wrap
+
+
+def to_floats(values: list[str]) -> np.ndarray:
+    """
+    Convert text cells to float64 in one call; blank cells become NaN.
+    """
+    try:
+        return np.array(values, dtype=np.float64)
+    except ValueError:
+        pass
+
+    # only the slow path strips and checks every cell
+    cells = [value.strip() for value in values]
+    return np.array([cell if cell else "nan" for cell in cells], dtype=np.float64)
@@ -0,0 +1,48 @@
+from typing import Callable
+import numpy as np
+
+Columns = dict[str, np.ndarray]
+"""
+CSV columns by header name, as float64 arrays
+"""
+
+class ColumnFunction:
+    """
+    A function over whole CSV columns, usable as a `CSVImporter` weight or
+    extra column.
+
+    `CSVImporter` converts the named `columns` to float64 arrays (blank
+    cells as NaN), calls the function once for the whole file and expects
+    one value per row back. Create with the `vectorized` decorator.
+
+    :var columns: Header names of the columns the function reads
+    :vartype columns: tuple[str, ...]
+    """
+    columns: tuple[str, ...]
+
+    def __init__(self, fn: Callable[[Columns], np.ndarray], columns: tuple[str, ...]) -> None: ...
+    def __call__(self, columns: Columns) -> np.ndarray: ...
+
+    def row(self, header: list[str], row: list[str]) -> float:
+        """
+        Evaluate on a single row, for code that converts rows one at a time
+        """
+        ...
+
+def vectorized(*columns: str) -> Callable[[Callable[[Columns], np.ndarray]], ColumnFunction]:
+    """
+    Decorate a function of named columns, e.g.::
+
+        @vectorized("BEDS")
+        def weight(columns: Columns) -> np.ndarray:
+            return np.log1p(columns["BEDS"])
+
+    :param columns: Header names passed to the function
+    """
+    ...
+
+def to_floats(values: list[str]) -> np.ndarray:
+    """
+    Convert text cells to float64 in bulk; blank cells become NaN
+    """
+    ...
@@ -1,18 +1,267 @@
+import argparse
+import importlib
+import json
 import logging
-from layers import Stack, TJLayer, HospitalLayer
+import os
+import subprocess
+import sys
+import instrumentation
+
+# only the standard library and instrumentation are imported up front; each
+# command imports what it needs, so `stats` and `scrape --dry-run` (run often
+# from cron) never load folium, requests or the HTML parsers
+
+OUTPUT = "heat_marker_map.html"
+TJ_CSV = "data/tj.csv"
+SCRAPE_CACHE = ".scrape-cache.sqlite"
+
+# layer name on the command line -> module and class
+LAYERS = {
+    "tj": ("layers.tj", "TJLayer"),
+    "hospitals": ("layers.hospitals", "HospitalLayer"),
+}
+
+# third-party and project modules that cost noticeable time to import;
+# `self-check` times each and fails if startup loads any of them
+HEAVY_MODULES = ["numpy", "folium", "requests", "bs4", "lxml.html", "layers.tj", "layers.hospitals", "layers.watch", "scrapers.tj", "bench.suite"]
+
+COMMANDS = ["render", "stats", "scrape", "bench", "self-check"]
+
+
+def load_layers(names: list[str]) -> list:
+    layers = []
+
+    for name in names:
+        module, cls = LAYERS[name]
+        layers.append(getattr(importlib.import_module(module), cls)())
+
+    return layers
 
-def main():
-    logging.basicConfig(level=logging.INFO)
+
+def render(args: argparse.Namespace):
+    from layers import Stack
+    from layers.render_cache import RenderCache
+    from layers.watch import render_to, watch
 
     stack = Stack()
-    
-    stack.add(TJLayer())
-    stack.add(HospitalLayer())
-    
-    m = stack.render()
-    
-    m.save("heat_marker_map.html")
+
+    for layer in load_layers(args.layers):
+        stack.add(layer)
+
+    max_age = None if args.cache_max_days is None else args.cache_max_days * 86400
+    cache = RenderCache(args.cache, max_bytes=int(args.cache_max_mb * (1 << 20)), max_age=max_age)
+    options = dict(workers=args.workers, minify=args.minify, compress=args.compress)
+
+    if args.payload is not None:
+        from layers.payload import PayloadOptions
+
+        # the page loads the files relative to itself
+        directory = os.path.join(os.path.dirname(args.output), args.payload_dir)
+        options["payload"] = PayloadOptions(args.payload, directory, args.payload_dir.replace(os.sep, "/"), compress=tuple(args.compress))
+
+    if args.watch:
+        watch(stack, args.output, cache, interval=args.interval, **options)
+    else:
+        render_to(stack, args.output, cache, **options)
+
+
+def stats(args: argparse.Namespace):
+    summaries = {}
+
+    for name, layer in zip(args.layers, load_layers(args.layers)):
+        summary = layer.lat_long_provider().stats()
+        (south, west), (north, east) = summary.bounds() if summary.count else ((None, None), (None, None))
+
+        summaries[name] = {
+            "name": layer.name(),
+            "points": summary.count,
+            "center": list(summary.center()) if summary.count else None,
+            "bounds": [south, west, north, east],
+        }
+
+    if args.json:
+        print(json.dumps(summaries, indent=2))
+        return
+
+    for name, summary in summaries.items():
+        center = "-" if summary["center"] is None else f"{summary['center'][0]:.4f}, {summary['center'][1]:.4f}"
+        print(f"{name:<12} {summary['points']:>10} points  center {center}")
+
+
+def scrape_plan(args: argparse.Namespace) -> list[str]:
+    """
+    What `scrape` would do with these arguments, read from the output, its
+    journal and the cache, without network access.
+    """
+    from scrapers.checkpoint import Journal
+
+    lines = []
+    workers = f"{args.workers} worker{'s' if args.workers != 1 else ''}"
+
+    if args.refresh:
+        with open(args.output, "r", newline="", encoding="utf-8") as f:
+            stores = sum(1 for _ in f) - 1
+
+        lines.append(f"refresh {stores} stores in {args.output} ({workers})")
+    else:
+        lines.append(f"scrape every store into {args.output} ({workers})")
+        done, offset = Journal(args.output + ".journal").load() if args.resume and os.path.exists(args.output) else (set(), None)
+
+        if offset is None:
+            lines.append("start from the beginning")
+        else:
+            lines.append(f"resume after {len(done)} finished pages, at byte {offset}")
+
+    if not os.path.exists(args.cache):
+        lines.append(f"cache {args.cache}: none yet, every page is fetched")
+    else:
+        from cache import open_storage
+
+        with open_storage(args.cache) as storage:
+            lines.append(f"cache {args.cache}: {sum(1 for _ in storage.keys())} entries")
+
+    return lines
+
+
+def scrape(args: argparse.Namespace):
+    if not args.output.lower().endswith(".csv"):
+        raise SystemExit(f"cannot write to {args.output}")
+
+    if args.refresh and not os.path.exists(args.output):
+        raise SystemExit(f"nothing to refresh: {args.output} does not exist")
+
+    if args.dry_run:
+        for line in scrape_plan(args):
+            print(line)
+
+        return
+
+    import scrapers.tj as tj
+    from cache import CachedReader
+    from scrapers.tj.scraper import TTL_POLICY
+
+    with CachedReader(args.cache, memory_bytes=int(args.memory_mb * (1 << 20)), ttl=TTL_POLICY, stale_while_revalidate=args.stale_while_revalidate) as reader:
+        if args.refresh:
+            tj.refresh(reader, args.output, workers=args.workers)
+        else:
+            tj.scrape(reader, args.output, workers=args.workers, resume=args.resume)
+
+
+def bench(argv: list[str]):
+    from bench.__main__ import main as bench_main
+
+    bench_main(argv)
+
+
+# run in a fresh interpreter per module, so nothing is imported already
+_PROBE = "import sys, time; start = time.perf_counter(); import {module}; print(time.perf_counter() - start); print(' '.join(sys.modules))"
+
+
+def _probe(module: str) -> tuple[float, set[str]]:
+    source = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [source, os.environ.get("PYTHONPATH")])))
+    env.pop(instrumentation.ENVIRONMENT_VARIABLE, None)
+
+    result = subprocess.run([sys.executable, "-c", _PROBE.format(module=module)], env=env, capture_output=True, text=True, check=True)
+    seconds, modules = result.stdout.splitlines()
+
+    return float(seconds), set(modules.split())
+
+
+def self_check(args: argparse.Namespace) -> int:
+    """
+    Time the import of this entry point and of every heavy module, each in a
+    fresh interpreter, and list which heavy modules each one pulls in.
+    Returns 1 if starting up loads any of them.
+    """
+    rows = []
+    startup, loaded = _probe("main")
+    eager = [module for module in HEAVY_MODULES if module in loaded]
+    rows.append(("main", startup, eager))
+
+    for module in HEAVY_MODULES:
+        seconds, loaded = _probe(module)
+        rows.append((module, seconds, [other for other in HEAVY_MODULES if other != module and other in loaded]))
+
+    width = max(len(module) for module, _, _ in rows)
+    print(f"{'module':<{width}} {'import ms':>10}  pulls in")
+
+    for module, seconds, pulled in rows:
+        print(f"{module:<{width}} {seconds * 1000:>10.1f}  {', '.join(pulled) or '-'}")
+
+    if eager:
+        print(f"startup imports {', '.join(eager)}; import them inside the command that needs them", file=sys.stderr)
+        return 1
+
+    return 0
+
+
+def parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Render, summarize and scrape the map layers; without a command, render")
+    commands = parser.add_subparsers(dest="command", metavar="command")
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--metrics", nargs="?", const="", metavar="FILE", help="time each stage and log a summary at exit; with FILE, also export the metrics there (.prom for Prometheus text, otherwise JSON)")
+
+    selection = argparse.ArgumentParser(add_help=False)
+    selection.add_argument("--layers", nargs="+", choices=list(LAYERS), default=list(LAYERS), help="layers to use, in drawing order (default: all)")
+
+    p = commands.add_parser("render", parents=[common, selection], help="render the layers to an HTML map")
+    p.add_argument("--output", default=OUTPUT, help="HTML file to write")
+    p.add_argument("--watch", action="store_true", help="re-render whenever a layer's data file changes")
+    p.add_argument("--interval", type=float, default=0.1, help="seconds between checks for changes in --watch mode")
+    p.add_argument("--cache", default=".render-cache", help="directory of cached layer fragments")
+    p.add_argument("--cache-max-mb", type=float, default=256, help="after rendering, keep at most this many MB of cached fragments, evicting the least recently used with the payload and tile files only they use")
+    p.add_argument("--cache-max-days", type=float, help="also evict fragments unused for this many days")
+    p.add_argument("--workers", type=int, default=1, help="processes rendering layers in parallel")
+    p.add_argument("--payload", choices=["json", "binary"], help="write each layer's markers and heat map points to a file the page fetches, instead of inlining them")
+    p.add_argument("--payload-dir", default="layer-data", help="directory of the payload files, relative to the HTML file")
+    p.add_argument("--minify", action="store_true", help="strip indentation and blank lines from the HTML")
+    p.add_argument("--compress", nargs="+", choices=["gz", "br"], default=[], help="also write precompressed copies of the HTML and payload files (br needs the brotli package)")
+
+    p = commands.add_parser("stats", parents=[common, selection], help="print point counts and extents of the layers")
+    p.add_argument("--json", action="store_true", help="print JSON instead of a table")
+
+    p = commands.add_parser("scrape", parents=[common], help="scrape the Trader Joe's locator into a CSV")
+    p.add_argument("--output", default=TJ_CSV, help="CSV file to write")
+    p.add_argument("--cache", default=SCRAPE_CACHE, help="cache of fetched pages and geocodes")
+    p.add_argument("--workers", type=int, default=1, help="pages fetched concurrently")
+    p.add_argument("--memory-mb", type=float, default=64, help="size of the in-memory tier in front of the cache, 0 for none")
+    p.add_argument("--stale-while-revalidate", action="store_true", help="serve expired pages from the cache at once and refetch them in the background")
+    p.add_argument("--refresh", action="store_true", help="update the existing CSV with what changed instead of scraping from scratch")
+    p.add_argument("--no-resume", dest="resume", action="store_false", help="ignore the checkpoint of an interrupted scrape")
+    p.add_argument("--dry-run", action="store_true", help="print what would be scraped and exit, without network access")
+
+    # everything after `bench` is passed on to `python -m bench`
+    commands.add_parser("bench", add_help=False, help="run the benchmark suite (see bench --help)")
+    commands.add_parser("self-check", help="time the imports of the entry point and of each heavy module")
+
+    return parser
+
+
+def main(argv: list[str]) -> int:
+    logging.basicConfig(level=logging.INFO)
+
+    # plain `main.py [--watch ...]` keeps rendering, as before there were commands
+    if not argv or argv[0] not in COMMANDS and argv[0] not in ("-h", "--help"):
+        argv = ["render", *argv]
+
+    if argv[0] == "bench":
+        bench(argv[1:])
+        return 0
+
+    args = parser().parse_args(argv)
+
+    if getattr(args, "metrics", None) is not None:
+        instrumentation.enable(args.metrics or None)
+
+    if args.command == "self-check":
+        return self_check(args)
+
+    { "render": render, "stats": stats, "scrape": scrape }[args.command](args)
+
+    return 0
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main(sys.argv[1:]))
@@ -1,2 +1,10 @@
-import scrapers.tj as tj
-import scrapers.hospitals as hospitals
\ No newline at end of file
+import importlib
+
+
+def __getattr__(name: str):
+    # scrapers are imported on first access, so importing a shared module
+    # (scrapers.checkpoint, scrapers.geocode) does not load every scraper
+    if name == "tj":
+        return importlib.import_module(".tj", __name__)
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,139 @@
+import csv
+import json
+import os
+from typing import Iterable, Optional
+
+
+class Journal:
+    """
+    Append-only record of finished work, stored as JSON lines next to the
+    output. `finish()` only queues a URL; `commit()` makes the queued URLs
+    durable together with the output offset they correspond to.
+    """
+    path: str
+    
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.__pending: list[str] = []
+        
+        
+    def load(self) -> tuple[set[str], Optional[int]]:
+        done: set[str] = set()
+        offset = None
+        
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        break # torn final line from a crash mid-write
+                    
+                    done.update(entry["finished"])
+                    offset = entry["offset"]
+        except FileNotFoundError:
+            pass
+        
+        return done, offset
+    
+    
+    def finish(self, url: str):
+        self.__pending.append(url)
+        
+        
+    def commit(self, offset: int):
+        if not self.__pending:
+            return
+        
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({ "finished": self.__pending, "offset": offset }) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+            
+        self.__pending = []
+        
+        
+    def remove(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class CSVStreamWriter:
+    """
+    Writes CSV rows as they arrive and flushes every `flush_every` rows. Each
+    flush syncs the file and then commits `journal` at the offset of the last
+    `finish()`, so a journal entry never refers to rows that are not on disk,
+    nor to part of a page whose remaining rows were never written. With
+    `resume_at`, an existing file is truncated to that offset and appended to
+    instead of rewritten.
+    """
+    path: str
+    flush_every: int
+    journal: Optional[Journal]
+    rows: int
+    
+    def __init__(self, path: str, header: list[str], *, journal: Optional[Journal] = None, resume_at: Optional[int] = None, flush_every: int = 64) -> None:
+        self.path = path
+        self.journal = journal
+        self.flush_every = flush_every
+        self.rows = 0
+        self.__unflushed = 0
+        
+        if resume_at is not None and os.path.exists(path):
+            self.__output = open(path, "r+", newline="", encoding="utf-8")
+            # drop rows written after the last commit; they will be scraped again
+            self.__output.truncate(resume_at)
+            self.__output.seek(resume_at)
+            self.__writer = csv.writer(self.__output, quoting=csv.QUOTE_ALL)
+            self.__finished_at = resume_at
+        else:
+            self.__output = open(path, "w", newline="", encoding="utf-8")
+            self.__writer = csv.writer(self.__output, quoting=csv.QUOTE_ALL)
+            self.__writer.writerow(header)
+            self.__finished_at = self.__output.tell()
+            self.flush()
+            
+            
+    def write(self, row: Iterable):
+        self.__writer.writerow(row)
+        self.rows += 1
+        self.__unflushed += 1
+        
+        if self.__unflushed >= self.flush_every:
+            self.flush()
+            
+            
+    def finish(self, url: str):
+        """
+        Every row under `url` has been written; the next commit covers them.
+        """
+        self.__finished_at = self.__output.tell()
+        
+        if self.journal is not None:
+            self.journal.finish(url)
+            
+            
+    def flush(self):
+        self.__output.flush()
+        os.fsync(self.__output.fileno())
+        self.__unflushed = 0
+        
+        if self.journal is not None:
+            # rows after the last finished page are dropped on resume and scraped again
+            self.journal.commit(self.__finished_at)
+            
+            
+    def close(self):
+        if not self.__output.closed:
+            self.flush()
+            self.__output.close()
+            
+            
+    def __enter__(self):
+        return self
+    
+    
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,262 @@
+import csv
+import json
+import re
+import time
+import urllib.parse
+from abc import ABC, abstractmethod
+from typing import Iterable, Optional
+from cache import CachedReader, CacheStorage
+from definitions import application_logger
+from instrumentation import count, timed
+
+LOGGER = application_logger("Geocoder")
+
+LatLon = tuple[float, float]
+
+NOMINATIM_QUERY = "https://nominatim.openstreetmap.org/search"
+NOMINATIM_HEADERS = {'User-Agent': 'trader-joes lat and long finder'}
+
+# an address that could not be found is asked for again after this many seconds;
+# empty answers are sometimes transient
+MISS_TTL = 60 * 60
+
+_ABBREVIATIONS = {
+    "street": "st",
+    "road": "rd",
+    "avenue": "ave",
+    "boulevard": "blvd",
+    "drive": "dr",
+    "highway": "hwy",
+    "parkway": "pkwy",
+    "place": "pl",
+    "lane": "ln",
+    "court": "ct",
+    "suite": "ste",
+    "north": "n",
+    "south": "s",
+    "east": "e",
+    "west": "w",
+    "northeast": "ne",
+    "northwest": "nw",
+    "southeast": "se",
+    "southwest": "sw",
+}
+_TOKEN = re.compile(r"[a-z0-9#']+")
+_ZIP = re.compile(r"\b(\d{5})(?:-\d{4})?\b")
+
+
+def normalize_address(address: str) -> str:
+    """
+    Canonical spelling of an address for use as a cache key: case, spacing,
+    punctuation and common street-type spellings are folded, so
+    "225 Stannage Avenue, El Cerrito" and "225  stannage ave. el cerrito"
+    share an entry.
+    """
+    tokens = _TOKEN.findall(address.casefold().replace(".", ""))
+    return " ".join(_ABBREVIATIONS.get(token, token) for token in tokens)
+
+
+def zip_code(address: str) -> Optional[str]:
+    matches = _ZIP.findall(address)
+    return matches[-1] if matches else None
+
+
+class Geocoder(ABC):
+    @abstractmethod
+    def geocode_batch(self, addresses: list[str]) -> dict[str, Optional[LatLon]]:
+        """
+        Resolve every address; unknown addresses map to None.
+        """
+        ...
+
+
+class NominatimGeocoder(Geocoder):
+    """
+    OpenStreetMap's Nominatim search API. Requests go through `cached_reader`,
+    so its rate limiter and page cache apply.
+    """
+    cached_reader: CachedReader
+
+    def __init__(self, cached_reader: CachedReader, query_url: str = NOMINATIM_QUERY) -> None:
+        self.cached_reader = cached_reader
+        self.query_url = query_url
+
+
+    @timed("geocode.nominatim")
+    def geocode(self, address: str) -> Optional[LatLon]:
+        params = { 'q': address, 'format': 'json' }
+        query_string = urllib.parse.urlencode(params)
+        url = self.query_url + '?' + query_string
+        cached = url in self.cached_reader.storage
+
+        response_as_json = json.loads(self.cached_reader.get(url, headers=NOMINATIM_HEADERS))
+
+        # a cached empty answer may have been a transient one; ask again
+        if len(response_as_json) == 0 and cached:
+            response_as_json = json.loads(self.cached_reader.get(url, headers=NOMINATIM_HEADERS, recompute=True))
+
+        if len(response_as_json) == 0:
+            return None
+
+        first_result = response_as_json[0]
+
+        if not isinstance(first_result, dict):
+            raise ValueError('expected object')
+
+        return (float(first_result["lat"]), float(first_result["lon"]))
+
+
+    def geocode_batch(self, addresses: list[str]) -> dict[str, Optional[LatLon]]:
+        # Nominatim has no batch endpoint; the reader's limiter paces these
+        return { address: self.geocode(address) for address in addresses }
+
+
+class GazetteerGeocoder(Geocoder):
+    """
+    Offline lookup table read from a CSV file. Rows are matched on the
+    normalized address, or, with `by_zip=True`, on the ZIP code found in the
+    address (e.g. a ZIP-centroid table).
+    """
+    table: dict[str, LatLon]
+    by_zip: bool
+
+    def __init__(self, path: str, *, key: str = "address", lat: str = "lat", lon: str = "lon", by_zip: bool = False) -> None:
+        self.by_zip = by_zip
+        self.table = {}
+
+        with open(path, "r", newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                k = row[key].strip() if by_zip else normalize_address(row[key])
+                self.table[k] = (float(row[lat]), float(row[lon]))
+
+
+    def geocode_batch(self, addresses: list[str]) -> dict[str, Optional[LatLon]]:
+        result = {}
+
+        for address in addresses:
+            k = zip_code(address) if self.by_zip else normalize_address(address)
+            result[address] = self.table.get(k) if k is not None else None
+
+        return result
+
+
+class ChainGeocoder(Geocoder):
+    """
+    Ask each geocoder in turn for the addresses the previous ones could not resolve.
+    """
+    geocoders: list[Geocoder]
+
+    def __init__(self, *geocoders: Geocoder) -> None:
+        self.geocoders = list(geocoders)
+
+
+    def geocode_batch(self, addresses: list[str]) -> dict[str, Optional[LatLon]]:
+        result: dict[str, Optional[LatLon]] = { address: None for address in addresses }
+        remaining = list(addresses)
+
+        for geocoder in self.geocoders:
+            if not remaining:
+                break
+
+            found = geocoder.geocode_batch(remaining)
+            result.update({ address: found[address] for address in remaining if found.get(address) is not None })
+            remaining = [address for address in remaining if result[address] is None]
+
+        return result
+
+
+class GeocodeCache:
+    """
+    Geocode results keyed by normalized address. Misses are cached too, for
+    `miss_ttl` seconds, so an address that cannot be found is not asked for
+    on every lookup but is asked for again later.
+    """
+    storage: CacheStorage
+    prefix: str
+    miss_ttl: float
+
+    def __init__(self, storage: CacheStorage, prefix: str = "geocode:", miss_ttl: float = MISS_TTL) -> None:
+        self.storage = storage
+        self.prefix = prefix
+        self.miss_ttl = miss_ttl
+
+
+    def get(self, normalized: str) -> tuple[bool, Optional[LatLon]]:
+        entry = self.storage.get_entry(self.prefix + normalized)
+
+        if entry is None:
+            return False, None
+
+        value, fetched_at = entry
+        decoded = json.loads(value)
+
+        if decoded is None:
+            # storage without timestamps cannot tell how old a miss is
+            expired = fetched_at is None or time.time() - fetched_at >= self.miss_ttl
+            return (False, None) if expired else (True, None)
+
+        return True, (decoded[0], decoded[1])
+
+
+    def put(self, normalized: str, location: Optional[LatLon]):
+        self.storage.put(self.prefix + normalized, json.dumps(location))
+
+
+class GeocodeStage:
+    """
+    Geocoding as a pipeline stage: addresses are normalized and deduplicated,
+    answered from `cache` where possible, and the rest are sent to
+    `geocoder` in batches of `batch_size`.
+    """
+    geocoder: Geocoder
+    cache: Optional[GeocodeCache]
+    batch_size: int
+
+    def __init__(self, geocoder: Geocoder, cache: Optional[GeocodeCache] = None, batch_size: int = 64) -> None:
+        self.geocoder = geocoder
+        self.cache = cache
+        self.batch_size = batch_size
+
+
+    @timed("geocode")
+    def resolve(self, addresses: Iterable[str]) -> dict[str, Optional[LatLon]]:
+        # the first spelling seen for each normalized address is the one queried
+        spellings: dict[str, str] = {}
+        by_address: dict[str, str] = {}
+
+        for address in addresses:
+            normalized = normalize_address(address)
+            spellings.setdefault(normalized, address)
+            by_address[address] = normalized
+
+        located: dict[str, Optional[LatLon]] = {}
+        misses: list[str] = []
+
+        for normalized in spellings:
+            if self.cache is not None:
+                hit, location = self.cache.get(normalized)
+
+                if hit:
+                    located[normalized] = location
+                    continue
+
+            misses.append(normalized)
+
+        count("geocode.cache_hits", len(spellings) - len(misses))
+        count("geocode.cache_misses", len(misses))
+
+        if misses:
+            LOGGER.info(f"geocoding {len(misses)} of {len(spellings)} addresses")
+
+        for start in range(0, len(misses), self.batch_size):
+            batch = misses[start:start + self.batch_size]
+            found = self.geocoder.geocode_batch([spellings[normalized] for normalized in batch])
+
+            for normalized in batch:
+                location = found.get(spellings[normalized])
+                located[normalized] = location
+
+                if self.cache is not None:
+                    self.cache.put(normalized, location)
+
+        return { address: located[normalized] for address, normalized in by_address.items() }
@@ -4,27 +4,130 @@ LOGGER = application_logger("TJ Scraper")
 
 import csv
 import logging
+import os
 import scrapers.tj.scraper as scraper
+import scrapers.tj.incremental as incremental
 from pathlib import Path
 from cache import CachedReader
+from scrapers.checkpoint import CSVStreamWriter, Journal
+from scrapers.geocode import GeocodeStage
+from typing import Optional
 
-def _write_to_csv(path: str, stores: list[scraper.Shop]):
+def _check_csv_path(path: str):
     p = Path(path)
     
     if not p.suffix.lower() == ".csv":
         raise RuntimeError(f"cannot write to {path}")
     
-    with open(path, "w", newline="", encoding="utf-8") as output:
+
+def _read_csv(path: str) -> list[list[str]]:
+    with open(path, "r", newline="", encoding="utf-8") as f:
+        return list(csv.reader(f))
+
+
+def read_stores(path: str) -> list[scraper.Shop]:
+    header, *rows = _read_csv(path)
+    
+    if header != scraper.Shop.keys():
+        raise ValueError(f"{path} does not have the columns {scraper.Shop.keys()}")
+    
+    stores = []
+    
+    for row in rows:
+        values = dict(zip(header, row))
+        values["lat"] = float(values["lat"])
+        values["long"] = float(values["long"])
+        stores.append(scraper.Shop(**values))
+        
+    return stores
+
+
+def apply_diff(path: str, diff: incremental.ScrapeDiff):
+    """
+    Apply `diff` to the CSV at `path`. Untouched rows keep their position
+    and text; changed rows are replaced in place and new stores are
+    appended. The file is not rewritten when the diff is empty.
+    """
+    if not diff:
+        return
+    
+    header, *rows = _read_csv(path)
+    url = header.index("url")
+    
+    removed = { store.url for store in diff.removed }
+    changed = { new.url: new for _, new in diff.changed }
+    
+    result = []
+    
+    for row in rows:
+        if row[url] in removed:
+            continue
+        
+        store = changed.get(row[url])
+        result.append(row if store is None else store.values())
+        
+    result.extend(store.values() for store in diff.added)
+    
+    tmp = path + ".tmp"
+    
+    with open(tmp, "w", newline="", encoding="utf-8") as output:
         wr = csv.writer(output, quoting=csv.QUOTE_ALL)
         
-        wr.writerow(scraper.Shop.keys())
-        wr.writerows([store.values() for store in stores])
+        wr.writerow(header)
+        wr.writerows(result)
+        
+    os.replace(tmp, path)
+
+
+def refresh(cached_reader: CachedReader, path: str, *, workers: int = 1, stage: Optional[GeocodeStage] = None) -> incremental.ScrapeDiff:
+    logging.basicConfig(level=logging.INFO)
+    
+    # per-host limits hold for serial runs too; Nominatim allows one request a second
+    if cached_reader.limiter is None:
+        cached_reader.limiter = scraper.rate_limits(workers)
+    
+    diff = incremental.scrape_incremental(cached_reader, read_stores(path), workers=workers, stage=stage)
+    apply_diff(path, diff)
+    
+    LOGGER.info(f"done: {diff}")
     
+    return diff
 
-def scrape(cached_reader: CachedReader, path: str):
+
+def scrape(cached_reader: CachedReader, path: str, *, workers: int = 1, stage: Optional[GeocodeStage] = None, resume: bool = True, flush_every: int = 64):
+    """
+    Stream every store into the CSV at `path`. Finished state and city URLs
+    are journaled in `<path>.journal` once all their rows reach the disk; if a previous
+    run was interrupted, `resume` continues from its last checkpoint.
+    """
     logging.basicConfig(level=logging.INFO)
+    
+    _check_csv_path(path)
+    
+    journal = Journal(path + ".journal")
+    
+    # a checkpoint is only good together with the rows it points into
+    if resume and os.path.exists(path):
+        done, offset = journal.load()
+    else:
+        journal.remove()
+        done, offset = set(), None
+    
+    if offset is not None:
+        LOGGER.info(f"resuming: {len(done)} pages already finished")
+
+    if cached_reader.limiter is None:
+        cached_reader.limiter = scraper.rate_limits(workers)
 
-    stores = scraper.scrape(cached_reader)
-    _write_to_csv(path, stores)
+    with CSVStreamWriter(path, scraper.Shop.keys(), journal=journal, resume_at=offset, flush_every=flush_every) as writer:
+        if workers > 1:
+            stores = scraper.scrape_concurrent(cached_reader, workers, stage, skip=done, progress=writer)
+        else:
+            stores = scraper.scrape(cached_reader, stage, skip=done, progress=writer)
+            
+        for store in stores:
+            writer.write(store.values())
+        
+    journal.remove()
     
-    LOGGER.info("done")
\ No newline at end of file
+    LOGGER.info("done")
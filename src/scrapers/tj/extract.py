@@ -0,0 +1,326 @@
+import json
+import re
+import sys
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from html.parser import HTMLParser
+from typing import Literal, Optional
+
+
+LINK_SELECTOR = "#contentbegin > div > div > div > div:nth-child(2) > div > div > a"
+SCHEMA_SELECTOR = "#contentbegin > div > div:nth-child(2) > div > script"
+
+Kind = Literal["links", "schemas"]
+
+
+class Extractor(ABC):
+    @abstractmethod
+    def links(self, html: str) -> list[Optional[str]]:
+        """
+        The href of every listing link on a state or city page (None if missing)
+        """
+        ...
+
+
+    @abstractmethod
+    def scripts(self, html: str) -> list[str]:
+        """
+        The text of every JSON-LD block on a locations page
+        """
+        ...
+
+
+    def schemas(self, html: str) -> list[dict]:
+        return [json.loads(script) for script in self.scripts(html)]
+
+
+    def extract(self, kind: Kind, html: str) -> list:
+        return self.links(html) if kind == "links" else self.schemas(html)
+
+
+class SoupExtractor(Extractor):
+    """
+    BeautifulSoup with `html.parser` and CSS selectors; the reference implementation.
+    """
+    def links(self, html: str) -> list[Optional[str]]:
+        from bs4 import BeautifulSoup
+
+        return [a.attrs.get('href') for a in BeautifulSoup(html, 'html.parser').select(LINK_SELECTOR)]
+
+
+    def scripts(self, html: str) -> list[str]:
+        from bs4 import BeautifulSoup
+
+        return [script.encode_contents().decode() for script in BeautifulSoup(html, 'html.parser').select(SCHEMA_SELECTOR)]
+
+
+@dataclass(frozen=True)
+class _Step:
+    tag: Optional[str]
+    id: Optional[str]
+    nth_child: Optional[int]
+
+
+    def matches(self, tag: str, id: Optional[str], index: int) -> bool:
+        return ((self.tag is None or self.tag == tag)
+                and (self.id is None or self.id == id)
+                and (self.nth_child is None or self.nth_child == index))
+
+
+_STEP = re.compile(r"^(?P<tag>[a-z][a-z0-9]*)?(?:#(?P<id>[\w-]+))?(?::nth-child\((?P<nth>\d+)\))?$")
+
+
+def _compile(selector: str) -> list[_Step]:
+    """
+    Compile a chain of child combinators (`a > b:nth-child(2) > #c`), the only
+    selector shape these pages need.
+    """
+    steps = []
+
+    for part in selector.split(">"):
+        match = _STEP.match(part.strip())
+
+        if match is None or not part.strip():
+            raise ValueError(f"unsupported selector step {part!r} in {selector!r}")
+
+        nth = match.group("nth")
+        steps.append(_Step(match.group("tag"), match.group("id"), int(nth) if nth is not None else None))
+
+    return steps
+
+
+# elements that never have children or an end tag
+_VOID = frozenset({"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param", "source", "track", "wbr"})
+
+
+class _ChainParser(HTMLParser):
+    """
+    Tokenizes the document without building a tree. It keeps only the stack
+    of open elements (tag, id, position among siblings) and collects elements
+    whose ancestry matches the compiled selector chain.
+    """
+    def __init__(self, steps: list[_Step], capture_text: bool) -> None:
+        super().__init__(convert_charrefs=True)
+        self.steps = steps
+        self.capture_text = capture_text
+        self.stack: list[tuple[str, Optional[str], int]] = []
+        self.children: list[int] = [0]
+        self.found: list = []
+        self.text: Optional[list[str]] = None
+
+
+    def __matches(self, tag: str, id: Optional[str], index: int) -> bool:
+        steps = self.steps
+
+        if len(self.stack) + 1 < len(steps) or not steps[-1].matches(tag, id, index):
+            return False
+
+        for step, (open_tag, open_id, open_index) in zip(reversed(steps[:-1]), reversed(self.stack)):
+            if not step.matches(open_tag, open_id, open_index):
+                return False
+
+        return True
+
+
+    def handle_starttag(self, tag, attrs):
+        self.children[-1] += 1
+        index = self.children[-1]
+        attributes = dict(attrs)
+        id = attributes.get("id")
+
+        if self.__matches(tag, id, index):
+            if self.capture_text:
+                self.text = []
+            else:
+                self.found.append(attributes.get("href"))
+
+        if tag not in _VOID:
+            self.stack.append((tag, id, index))
+            self.children.append(0)
+
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+
+        if tag not in _VOID:
+            self.handle_endtag(tag)
+
+
+    def handle_data(self, data):
+        if self.text is not None:
+            self.text.append(data)
+
+
+    def handle_endtag(self, tag):
+        # implicitly close anything left open inside `tag`, as browsers do
+        for depth in range(len(self.stack) - 1, -1, -1):
+            if self.stack[depth][0] == tag:
+                if self.text is not None and depth == len(self.stack) - 1:
+                    self.found.append("".join(self.text))
+                    self.text = None
+
+                del self.stack[depth:]
+                del self.children[depth + 1:]
+                return
+
+
+class StreamingExtractor(Extractor):
+    """
+    Single-pass tokenizer that only tracks the open-element stack, so no tree
+    is built and no selector engine runs.
+    """
+    def __init__(self) -> None:
+        self.__links = _compile(LINK_SELECTOR)
+        self.__scripts = _compile(SCHEMA_SELECTOR)
+
+
+    def __run(self, steps: list[_Step], html: str, capture_text: bool) -> list:
+        parser = _ChainParser(steps, capture_text)
+        parser.feed(html)
+        parser.close()
+        return parser.found
+
+
+    def links(self, html: str) -> list[Optional[str]]:
+        return self.__run(self.__links, html, False)
+
+
+    def scripts(self, html: str) -> list[str]:
+        return self.__run(self.__scripts, html, True)
+
+
+class LxmlExtractor(Extractor):
+    """
+    libxml2's HTML parser with the selectors compiled to XPath. Requires lxml.
+    """
+    LINK_XPATH = "//*[@id='contentbegin']/div/div/div/*[2][self::div]/div/div/a"
+    SCHEMA_XPATH = "//*[@id='contentbegin']/div/*[2][self::div]/div/script"
+
+    def __init__(self) -> None:
+        import lxml.html
+
+        self.__parse = lxml.html.fromstring
+
+
+    def links(self, html: str) -> list[Optional[str]]:
+        return [a.get("href") for a in self.__parse(html).xpath(self.LINK_XPATH)]
+
+
+    def scripts(self, html: str) -> list[str]:
+        return [script.text or "" for script in self.__parse(html).xpath(self.SCHEMA_XPATH)]
+
+
+EXTRACTORS = {
+    "soup": SoupExtractor,
+    "streaming": StreamingExtractor,
+    "lxml": LxmlExtractor,
+}
+
+
+def get_extractor(name: str) -> Extractor:
+    try:
+        return EXTRACTORS[name]()
+    except KeyError:
+        raise ValueError(f"unknown extractor {name!r}, expected one of {list(EXTRACTORS)}")
+
+
+def default_extractor() -> Extractor:
+    try:
+        return LxmlExtractor()
+    except ImportError:
+        return StreamingExtractor()
+
+
+def _extract_one(job: tuple[str, Kind, str]) -> list:
+    name, kind, html = job
+    return get_extractor(name).extract(kind, html)
+
+
+def extract_many(kind: Kind, pages: list[str], *, extractor: str = "streaming", workers: Optional[int] = None, chunksize: int = 16) -> list[list]:
+    """
+    Extract from many cached pages at once, in a process pool when `workers` > 1.
+    Results are in the order of `pages`.
+    """
+    if workers is None or workers <= 1:
+        instance = get_extractor(extractor)
+        return [instance.extract(kind, html) for html in pages]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_extract_one, [(extractor, kind, html) for html in pages], chunksize=chunksize))
+
+
+def benchmark(pages: list[tuple[Kind, str]], extractors: list[str], repeat: int = 3) -> dict[str, dict]:
+    """
+    Time each extractor over `pages` (best of `repeat`) and check that its
+    output matches the `soup` reference.
+    """
+    reference = SoupExtractor()
+    expected = [reference.extract(kind, html) for kind, html in pages]
+
+    results = {}
+
+    for name in extractors:
+        try:
+            instance = get_extractor(name)
+        except ImportError as e:
+            results[name] = { "error": str(e) }
+            continue
+
+        best = float("inf")
+
+        for _ in range(repeat):
+            start = time.perf_counter()
+            output = [instance.extract(kind, html) for kind, html in pages]
+            best = min(best, time.perf_counter() - start)
+
+        results[name] = {
+            "seconds": best,
+            "pages_per_second": len(pages) / best if best > 0 else float("inf"),
+            "matches_reference": output == expected,
+        }
+
+    return results
+
+
+def cached_corpus(cache_path: str, prefix: str) -> list[tuple[Kind, str]]:
+    """
+    Every cached page under `prefix`, labelled by which extraction applies:
+    pages with JSON-LD blocks are location pages, the rest are listings.
+    """
+    from cache import open_storage
+
+    storage = open_storage(cache_path)
+    reference = StreamingExtractor()
+    pages = []
+
+    for key in storage.keys():
+        if not key.startswith(prefix):
+            continue
+
+        html = storage.get(key)
+
+        if html is not None:
+            pages.append(("schemas" if reference.scripts(html) else "links", html))
+
+    storage.close()
+
+    return pages
+
+
+def main(argv: list[str]):
+    if len(argv) != 1:
+        print("usage: python -m scrapers.tj.extract <cache path>", file=sys.stderr)
+        sys.exit(2)
+
+    from .scraper import STATES_LIST_URL
+
+    pages = cached_corpus(argv[0], STATES_LIST_URL)
+    results = benchmark(pages, list(EXTRACTORS))
+
+    print(json.dumps({ "pages": len(pages), "results": results }, indent=2))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,136 @@
+from . import LOGGER
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+from cache import CachedReader
+from scrapers.geocode import GeocodeStage
+from .scraper import STATES_LIST_URL, PostalAddress, Shop, geocode_stage, parse_links, parse_schemas, query_address
+
+
+PARSED_PREFIX = "parsed:"
+
+
+@dataclass
+class ScrapeDiff:
+    added: list[Shop] = field(default_factory=list)
+    removed: list[Shop] = field(default_factory=list)
+    changed: list[tuple[Shop, Shop]] = field(default_factory=list)
+    
+    
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
+    
+    
+    def __str__(self) -> str:
+        return f"{len(self.added)} added, {len(self.removed)} removed, {len(self.changed)} changed"
+
+
+class ParsedPages:
+    """
+    Revalidates pages with conditional requests and parses only the ones
+    that changed. Parse results are kept in the reader's storage under
+    `parsed:<url>`, so an unchanged page costs one 304 and a JSON load.
+    """
+    cached_reader: CachedReader
+    parsed: int
+    skipped: int
+    
+    def __init__(self, cached_reader: CachedReader) -> None:
+        self.cached_reader = cached_reader
+        self.parsed = 0
+        self.skipped = 0
+        
+        
+    def get(self, url: str, parse: Callable[[str], list]) -> list:
+        html, changed = self.cached_reader.revalidate(url)
+        key = PARSED_PREFIX + url
+        
+        if not changed:
+            previous = self.cached_reader.storage.get(key)
+            
+            if previous is not None:
+                self.skipped += 1
+                return json.loads(previous)
+            
+        self.parsed += 1
+        result = parse(html)
+        self.cached_reader.storage.put(key, json.dumps(result))
+        
+        return result
+    
+    
+    def links(self, url: str) -> list[str]:
+        return self.get(url, parse_links)
+    
+    
+    def schemas(self, url: str) -> list[PostalAddress]:
+        return self.get(url, parse_schemas)
+
+
+def _same_place(schema: PostalAddress, shop: Shop) -> bool:
+    new = Shop.from_schema(schema, (shop.lat, shop.long))
+    return (new.street_address, new.region, new.postal_code) == (shop.street_address, shop.region, shop.postal_code)
+
+
+def scrape_incremental(cached_reader: CachedReader, previous: list[Shop], *, workers: int = 1, stage: Optional[GeocodeStage] = None) -> ScrapeDiff:
+    """
+    Re-scrape against `previous` (usually the current CSV). Every page is
+    revalidated, only changed pages are re-parsed, and only stores that are
+    new or whose address changed are geocoded again.
+    """
+    if stage is None:
+        stage = geocode_stage(cached_reader)
+    
+    pages = ParsedPages(cached_reader)
+    
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tj-refresh") as pool:
+        states = pages.links(STATES_LIST_URL)
+        cities = [city for state_cities in pool.map(pages.links, states) for city in state_cities]
+        schemas = [schema for city_schemas in pool.map(pages.schemas, cities) for schema in city_schemas]
+        
+    LOGGER.info(f"{pages.parsed} pages parsed, {pages.skipped} unchanged")
+        
+    by_url = { shop.url: shop for shop in previous }
+    
+    # None until geocoded
+    current: list[Optional[Shop]] = []
+    relocate: list[tuple[int, PostalAddress]] = []
+    
+    for schema in schemas:
+        old = by_url.get(schema.get('@id'))
+        
+        if old is not None and _same_place(schema, old):
+            current.append(Shop.from_schema(schema, (old.lat, old.long)))
+        else:
+            relocate.append((len(current), schema))
+            current.append(None)
+            
+    located = stage.resolve(query_address(schema) for _, schema in relocate)
+    
+    for i, schema in relocate:
+        address = query_address(schema)
+        location = located[address]
+        
+        if location is None:
+            raise RuntimeError(f'could not get latitude and longitude from address: {address}')
+        
+        current[i] = Shop.from_schema(schema, location)
+        
+    diff = ScrapeDiff()
+    seen = set()
+    
+    for shop in current:
+        assert shop is not None # every relocated store was filled in above
+        seen.add(shop.url)
+        old = by_url.get(shop.url)
+        
+        if old is None:
+            diff.added.append(shop)
+        elif old != shop:
+            diff.changed.append((old, shop))
+            
+    diff.removed = [shop for shop in previous if shop.url not in seen]
+    
+    return diff
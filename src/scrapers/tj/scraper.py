@@ -2,16 +2,36 @@ from . import LOGGER
 
 from dataclasses import dataclass, fields
 import json
-import urllib.parse
-from bs4 import BeautifulSoup
-from typing import Optional, TypedDict, Literal
-from cache import CachedReader
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Container, Iterable, Iterator, Optional, Protocol, TypedDict, TypeVar, Literal
+from cache import CachedReader, HostLimit, HostLimiter, TTLPolicy
+from cache.policy import DAY
+from scrapers.geocode import ChainGeocoder, GeocodeCache, GeocodeStage, Geocoder, NominatimGeocoder
+from .extract import Extractor, default_extractor
 
 
 SIZE = 631
+
+# pages fetched ahead of the consumer, per worker
+PREFETCH = 4
 STATES_LIST_URL = "https://locations.traderjoes.com"
 ADDRESS_QUERY = "https://nominatim.openstreetmap.org/search"
 
+# geocodes of a fixed address practically never change; store listings do
+TTL_POLICY = TTLPolicy([
+    (ADDRESS_QUERY + "*", 180 * DAY),
+    (STATES_LIST_URL + "*", 7 * DAY),
+])
+
+
+def rate_limits(store_concurrency: int = 8) -> HostLimiter:
+    # https://operations.osmfoundation.org/policies/nominatim/ - at most 1 request per second
+    return HostLimiter({
+        "nominatim.openstreetmap.org": HostLimit(rate=1, burst=1, concurrency=1),
+        "locations.traderjoes.com": HostLimit(concurrency=store_concurrency),
+    })
+
 
 # https://schema.org/PostalAddress
 PostalAddress = TypedDict(
@@ -32,27 +52,17 @@ PostalAddress = TypedDict(
 
 
 def address_to_lat_lon(cached_reader: CachedReader, address: str) -> Optional[tuple[float, float]]:
-    params = { 'q': address, 'format': 'json' }
-    query_string = urllib.parse.urlencode(params)
-    url = ADDRESS_QUERY + '?' + query_string
-    
-    response = cached_reader.get(url, headers={'User-Agent': 'trader-joes lat and long finder'})
-    
-    response_as_json = json.loads(response)
-    
-    if len(response_as_json) == 0:
-        return None
-    
-    first_result = response_as_json[0]
-    
-    if not isinstance(first_result, dict):
-        raise ValueError('expected object')
-    
-    lat = first_result["lat"]
-    lon = first_result["lon"]
+    return NominatimGeocoder(cached_reader, ADDRESS_QUERY).geocode(address)
+
+
+def geocode_stage(cached_reader: CachedReader, fallback: Optional[Geocoder] = None) -> GeocodeStage:
+    geocoder: Geocoder = NominatimGeocoder(cached_reader, ADDRESS_QUERY)
     
-    return (lat, lon)
+    if fallback is not None:
+        geocoder = ChainGeocoder(geocoder, fallback)
     
+    return GeocodeStage(geocoder, GeocodeCache(cached_reader.storage))
+
 
 @dataclass(frozen=True)
 class Shop:
@@ -77,134 +87,154 @@ class Shop:
     
         
     @classmethod
-    def from_schema(cls, cached_reader: CachedReader, schema: PostalAddress):
-        address = None
-        
-        # edge cases for addresses that cannot be queried
-        # i.e. not up to date, include unnecessary fluff
-        # like prefixes to streets, and wrong county
-        match schema.get('telephone'):
-            case '+1 480-712-6645':
-                address = '14770 W McDowell Rd, Goodyear, AZ 85395'
-            case '+1 480-367-8920':
-                address = '7555 Frank Lloyd Wright, Scottsdale, AZ 85260'
-            case '+1 623-546-1640':
-                address = '14095 Grand Ave, Surprise, AZ 85374'
-            case '+1 510-538-2738':
-                address = '22224, Redwood Road, Alameda County, California, 94546, United States'
-            case '+1 510-524-7609':
-                address = '225, Stannage Avenue, Albany Hill, El Cerrito, Alameda County, California, 94530, United States'
-            case '+1 323-856-0689':
-                address = '1600, Vine Street, Hollywood, Los Angeles, Los Angeles County, California, 90028, United States'
-            case '+1 310-725-9800':
-                address = '1800, Rosecrans Avenue, Manhattan Village, Manhattan Beach, Los Angeles County, California, 90266, United States'
-            case '+1 949-494-7404':
-                address = '8086, Sidra Cove, Crystal Cove, Newport Coast, Newport Beach, Orange County, California, 92657, United States'
-            case '+1 818-762-2963':
-                address = '6130, Laurel Canyon Boulevard, North Hollywood Neighborhood Council District, Los Angeles, Los Angeles County, California, 91606, United States'
-            case '+1 408-264-8120':
-                address = "Trader Joe's, 5353, Almaden Expressway, San Jose, Santa Clara County, California, 95118, United States"
-            case '+1 650-583-6401':
-                address = "Trader Joe's, 301, McLellan Drive, South San Francisco, San Mateo County, California, 94080, United States"
-            case '+1 805-434-9562':
-                address = "Trader Joe's, 1111, Rossi Road, San Luis Obispo County, California, 93465, United States"
-            case '+1 562-698-1642':
-                address = "Trader Joe's, 15025, Whittier Boulevard, Friendly Hills, Whittier, Los Angeles County, California, 90603, United States"
-            case '+1 561-338-5031':
-                address = '855, Southeast 9th Street, Boca Raton, Palm Beach County, Florida, 33432, United States'
-            case '+1 727-436-4019':
-                address = '33591, West Lake Road, Palm Harbor, Pinellas County, Florida, 34683, United States'
-            case '+1 561-656-1067':
-                address = '2877, Stribling Way, Wellington, Palm Beach County, Florida, 33414, United States'
-            case '+1 470-762-3171':
-                address = "Trader Joe's, Halcyon Days Trail, Forsyth County, Georgia, 30005, United States"
-            case '+1 208-214-8293':
-                address = "303, East Spokane Avenue, Coeur d'Alene, Kootenai County, Idaho, 83814, United States"
-            case '+1 574-472-8744':
-                address = '1140, Howard Street, Harters Heights, South Bend, Saint Joseph County, Indiana, 46617, United States'
-            case '+1 502-895-7872':
-                address = "Trader Joe's, 4600 Shelbyville Rd, Louisville, KY 40207"
-            case '+1 508-790-3008':
-                address = '655 Iyannough Road, Hyannis, MA 02601'
-            case '+1 775-267-2486':
-                address = '3790, US 395, Carson City, Douglas County, Nevada, 89705, United States'
-            case '+1 973-537-3672':
-                address = '3056, NJ 10, Denville, Morris County, New Jersey, 07834, United States'
-            case '+1 732-462-1539':
-                address = "Trader Joe's, Pond Road, Whittier Oaks South, Freehold Township, Monmouth County, New Jersey, 07728, United States"
-            case '+1 856-988-3323':
-                address = "Trader Joe's, 300, SR 73, Marlton Square, Marlton, Evesham Township, Burlington County, New Jersey, 08053, United States"
-            case '+1 201-265-9624':
-                address = "Trader Joe's, 404, Sette Drive, Paramus, Bergen County, New Jersey, 07652, United States"
-            case '+1 505-883-3662':
-                address = "Trader Joe's, 2200, Uptown Loop Road Northeast, Uptown, Albuquerque, Bernalillo County, New Mexico, 87110, United States"
-            case '+1 518-383-5015':
-                address = "Trader Joe's, Halfmoon Crossing, Town of Halfmoon, Saratoga County, New York, 12065, United States"
-            case '+1 212-477-8340':
-                address = "Trader Joe's, 400, Grand Street, Lower East Side, Manhattan Community Board 3, Manhattan, New York County, New York, 10002, United States"
-            case '+1 716-415-3179':
-                address = '5017, Transit Road, Eastern Hills, Buffalo, Erie County, New York, 14221, United States'
-            case '+1 541-312-4198':
-                address = "Trader Joe's, 63455, McKenzie-Bend Highway, Bend, Deschutes County, Oregon, 97703"
-            case '+1 541-485-1744':
-                address = "85, Coburg Road, Eugene, Lane County, Oregon, 97401, United States"
-            case '+1 843-630-6282':
-                address = 'Sayebrook Town Center, Sayebrook, Horry County, South Carolina, 29575, United States'
-            case '+1 615-356-1066':
-                address = '90, Post Place, Nashville, TN 37205'
-            case '+1 281-290-4216':
-                # this location does not have an address on Google Maps or the OpenStreetMap project. This Kroger is right across the street
-                address = 'Kroger Marketplace, 9703, Barker Cypress Road, Towne Lake Management District, Cypress, Harris County, Texas, 77433, United States'
-            case '+1 801-571-0987':
-                address = "Trader Joe's, 11477, State Street, Draper, Salt Lake County, Utah, 84020, United States"
-            case '+1 385-324-2911':
-                address = "Trader Joe's, Rodeo Walk Drive, Wagstaff Acres, Holladay, Salt Lake County, Utah, 84117, United States"
-            case '+1 801-224-1453':
-                address = "Trader Joe's, 440, Park Avenue, University Place, Orem, Utah County, Utah, 84097, United States"
-            case '+1 703-379-5883':
-                address = "5847 Leesburg Pike, Bailey's Crossroads, VA 22041"
-            case '+1 703-288-0566':
-                address = "Trader Joe's, 7514, Leesburg Pike, Falls Church, Fairfax County, Virginia, 22043, United States"
-            case '+1 703-689-0865':
-                address = "Trader Joe's, 11958, Killingsworth Avenue, Fairfax County, Virginia, 20194, United States"
-            case '+1 757-259-2135':
-                address = '5000, Settlers Market Boulevard, Virginia, 23188, United States'
-            case _:
-                address = f"{schema.get('streetAddress').split(',')[0]}, {schema.get('addressLocality')}, {schema.get('addressRegion')} {schema.get('postalCode')}"
-        
-        bundled = address_to_lat_lon(cached_reader, address)
-
-        if bundled is None:
-            raise RuntimeError(f'could not get latitude and longitude from address: {address}')
+    def from_schema(cls, schema: PostalAddress, location: tuple[float, float]):
+        lat, long = location
         
-        lat, long = bundled
+        def text(key: str) -> str:
+            # as the CSV stores it: csv.writer writes None as "", so a shop
+            # compares equal to itself read back by `read_stores`
+            value = schema.get(key)
+            return "" if value is None else str(value)
 
         return cls(
-            url=schema.get('@id'),
-            name=schema.get('name'),
-            country=schema.get('addressCountry'),
-            street_address=schema.get('streetAddress'),
-            postal_code=schema.get('postalCode'),
-            region=schema.get('addressRegion'),
-            telephone=schema.get('telephone'),
+            url=text('@id'),
+            name=text('name'),
+            country=text('addressCountry'),
+            street_address=text('streetAddress'),
+            postal_code=text('postalCode'),
+            region=text('addressRegion'),
+            telephone=text('telephone'),
             lat=lat,
             long=long,
         )
 
 
-def get_states(cached_reader: CachedReader) -> list[str]:
-    states_html = cached_reader.get(STATES_LIST_URL)
-    soup = BeautifulSoup(states_html, 'html.parser')
+def query_address(schema: PostalAddress) -> str:
+    address = None
+    
+    # edge cases for addresses that cannot be queried
+    # i.e. not up to date, include unnecessary fluff
+    # like prefixes to streets, and wrong county
+    match schema.get('telephone'):
+        case '+1 480-712-6645':
+            address = '14770 W McDowell Rd, Goodyear, AZ 85395'
+        case '+1 480-367-8920':
+            address = '7555 Frank Lloyd Wright, Scottsdale, AZ 85260'
+        case '+1 623-546-1640':
+            address = '14095 Grand Ave, Surprise, AZ 85374'
+        case '+1 510-538-2738':
+            address = '22224, Redwood Road, Alameda County, California, 94546, United States'
+        case '+1 510-524-7609':
+            address = '225, Stannage Avenue, Albany Hill, El Cerrito, Alameda County, California, 94530, United States'
+        case '+1 323-856-0689':
+            address = '1600, Vine Street, Hollywood, Los Angeles, Los Angeles County, California, 90028, United States'
+        case '+1 310-725-9800':
+            address = '1800, Rosecrans Avenue, Manhattan Village, Manhattan Beach, Los Angeles County, California, 90266, United States'
+        case '+1 949-494-7404':
+            address = '8086, Sidra Cove, Crystal Cove, Newport Coast, Newport Beach, Orange County, California, 92657, United States'
+        case '+1 818-762-2963':
+            address = '6130, Laurel Canyon Boulevard, North Hollywood Neighborhood Council District, Los Angeles, Los Angeles County, California, 91606, United States'
+        case '+1 408-264-8120':
+            address = "Trader Joe's, 5353, Almaden Expressway, San Jose, Santa Clara County, California, 95118, United States"
+        case '+1 650-583-6401':
+            address = "Trader Joe's, 301, McLellan Drive, South San Francisco, San Mateo County, California, 94080, United States"
+        case '+1 805-434-9562':
+            address = "Trader Joe's, 1111, Rossi Road, San Luis Obispo County, California, 93465, United States"
+        case '+1 562-698-1642':
+            address = "Trader Joe's, 15025, Whittier Boulevard, Friendly Hills, Whittier, Los Angeles County, California, 90603, United States"
+        case '+1 561-338-5031':
+            address = '855, Southeast 9th Street, Boca Raton, Palm Beach County, Florida, 33432, United States'
+        case '+1 727-436-4019':
+            address = '33591, West Lake Road, Palm Harbor, Pinellas County, Florida, 34683, United States'
+        case '+1 561-656-1067':
+            address = '2877, Stribling Way, Wellington, Palm Beach County, Florida, 33414, United States'
+        case '+1 470-762-3171':
+            address = "Trader Joe's, Halcyon Days Trail, Forsyth County, Georgia, 30005, United States"
+        case '+1 208-214-8293':
+            address = "303, East Spokane Avenue, Coeur d'Alene, Kootenai County, Idaho, 83814, United States"
+        case '+1 574-472-8744':
+            address = '1140, Howard Street, Harters Heights, South Bend, Saint Joseph County, Indiana, 46617, United States'
+        case '+1 502-895-7872':
+            address = "Trader Joe's, 4600 Shelbyville Rd, Louisville, KY 40207"
+        case '+1 508-790-3008':
+            address = '655 Iyannough Road, Hyannis, MA 02601'
+        case '+1 775-267-2486':
+            address = '3790, US 395, Carson City, Douglas County, Nevada, 89705, United States'
+        case '+1 973-537-3672':
+            address = '3056, NJ 10, Denville, Morris County, New Jersey, 07834, United States'
+        case '+1 732-462-1539':
+            address = "Trader Joe's, Pond Road, Whittier Oaks South, Freehold Township, Monmouth County, New Jersey, 07728, United States"
+        case '+1 856-988-3323':
+            address = "Trader Joe's, 300, SR 73, Marlton Square, Marlton, Evesham Township, Burlington County, New Jersey, 08053, United States"
+        case '+1 201-265-9624':
+            address = "Trader Joe's, 404, Sette Drive, Paramus, Bergen County, New Jersey, 07652, United States"
+        case '+1 505-883-3662':
+            address = "Trader Joe's, 2200, Uptown Loop Road Northeast, Uptown, Albuquerque, Bernalillo County, New Mexico, 87110, United States"
+        case '+1 518-383-5015':
+            address = "Trader Joe's, Halfmoon Crossing, Town of Halfmoon, Saratoga County, New York, 12065, United States"
+        case '+1 212-477-8340':
+            address = "Trader Joe's, 400, Grand Street, Lower East Side, Manhattan Community Board 3, Manhattan, New York County, New York, 10002, United States"
+        case '+1 716-415-3179':
+            address = '5017, Transit Road, Eastern Hills, Buffalo, Erie County, New York, 14221, United States'
+        case '+1 541-312-4198':
+            address = "Trader Joe's, 63455, McKenzie-Bend Highway, Bend, Deschutes County, Oregon, 97703"
+        case '+1 541-485-1744':
+            address = "85, Coburg Road, Eugene, Lane County, Oregon, 97401, United States"
+        case '+1 843-630-6282':
+            address = 'Sayebrook Town Center, Sayebrook, Horry County, South Carolina, 29575, United States'
+        case '+1 615-356-1066':
+            address = '90, Post Place, Nashville, TN 37205'
+        case '+1 281-290-4216':
+            # this location does not have an address on Google Maps or the OpenStreetMap project. This Kroger is right across the street
+            address = 'Kroger Marketplace, 9703, Barker Cypress Road, Towne Lake Management District, Cypress, Harris County, Texas, 77433, United States'
+        case '+1 801-571-0987':
+            address = "Trader Joe's, 11477, State Street, Draper, Salt Lake County, Utah, 84020, United States"
+        case '+1 385-324-2911':
+            address = "Trader Joe's, Rodeo Walk Drive, Wagstaff Acres, Holladay, Salt Lake County, Utah, 84117, United States"
+        case '+1 801-224-1453':
+            address = "Trader Joe's, 440, Park Avenue, University Place, Orem, Utah County, Utah, 84097, United States"
+        case '+1 703-379-5883':
+            address = "5847 Leesburg Pike, Bailey's Crossroads, VA 22041"
+        case '+1 703-288-0566':
+            address = "Trader Joe's, 7514, Leesburg Pike, Falls Church, Fairfax County, Virginia, 22043, United States"
+        case '+1 703-689-0865':
+            address = "Trader Joe's, 11958, Killingsworth Avenue, Fairfax County, Virginia, 20194, United States"
+        case '+1 757-259-2135':
+            address = '5000, Settlers Market Boulevard, Virginia, 23188, United States'
+        case _:
+            address = f"{schema.get('streetAddress').split(',')[0]}, {schema.get('addressLocality')}, {schema.get('addressRegion')} {schema.get('postalCode')}"
+    
+    return address
 
-    state_boxes = soup.select("#contentbegin > div > div > div > div:nth-child(2) > div > div > a")
 
-    result = []
+def build_shops(stage: GeocodeStage, schemas: list[PostalAddress]) -> list[Shop]:
+    addresses = [query_address(schema) for schema in schemas]
+    located = stage.resolve(addresses)
+    
+    shops = []
+    
+    for schema, address in zip(schemas, addresses):
+        location = located[address]
+        
+        if location is None:
+            raise RuntimeError(f'could not get latitude and longitude from address: {address}')
+        
+        shops.append(Shop.from_schema(schema, location))
+        
+    return shops
 
-    for state in state_boxes:
-        url = state.attrs.get('href')
 
+# lxml when installed, otherwise the streaming tokenizer; both give the same
+# results as the BeautifulSoup selectors (see `python -m scrapers.tj.extract`)
+EXTRACTOR: Extractor = default_extractor()
+
+
+def parse_links(html: str, extractor: Optional[Extractor] = None) -> list[str]:
+    result = []
+
+    for url in (extractor or EXTRACTOR).links(html):
         if url is None:
-            raise ValueError(f"element does not have an href: {state}")
+            raise ValueError(f"listing link does not have an href")
         elif not isinstance(url, str):
             raise ValueError(f"href is not a string")
 
@@ -213,65 +243,161 @@ def get_states(cached_reader: CachedReader) -> list[str]:
     return result
 
 
-def get_cities(cached_reader: CachedReader, state_url) -> list[str]:
-    cities_html = cached_reader.get(state_url)
+def parse_schemas(html: str, extractor: Optional[Extractor] = None) -> list[PostalAddress]:
+    return (extractor or EXTRACTOR).schemas(html)
 
-    soup = BeautifulSoup(cities_html, 'html.parser')
 
-    city_boxes = soup.select("#contentbegin > div > div > div > div:nth-child(2) > div > div > a")
+def get_states(cached_reader: CachedReader) -> list[str]:
+    return parse_links(cached_reader.get(STATES_LIST_URL))
 
-    result = []
 
-    for city in city_boxes:
-        url = city.attrs.get('href')
+def get_cities(cached_reader: CachedReader, state_url) -> list[str]:
+    return parse_links(cached_reader.get(state_url))
 
-        if url is None:
-            raise ValueError(f"element does not have an href: {city}")
-        elif not isinstance(url, str):
-            raise ValueError(f"href is not a string")
 
-        result.append(STATES_LIST_URL + url)
+def get_schemas(cached_reader: CachedReader, city_url) -> list[PostalAddress]:
+    return parse_schemas(cached_reader.get(city_url))
 
-    return result
 
+def get_locations(cached_reader: CachedReader, city_url, stage: Optional[GeocodeStage] = None) -> list[Shop]:
+    if stage is None:
+        stage = geocode_stage(cached_reader)
+    
+    return build_shops(stage, get_schemas(cached_reader, city_url))
+        
 
-def get_locations(cached_reader: CachedReader, city_url):
-    locations_html = cached_reader.get(city_url)
+class Progress(Protocol):
+    def finish(self, url: str) -> None: ...
 
-    soup = BeautifulSoup(locations_html, 'html.parser')
 
-    locations_json = soup.select("#contentbegin > div > div:nth-child(2) > div > script")
+# items of a scrape stream: a city page and its stores, or the end of a state
+_City = tuple[Literal["city"], str, list[PostalAddress]]
+_StateEnd = tuple[Literal["state"], str, None]
 
-    shops = []
 
-    for location in locations_json:
-        location_json = location.encode_contents()
-        location_dict = json.loads(location_json)
-        shop = Shop.from_schema(cached_reader, location_dict)
+def _state_pages(cached_reader: CachedReader, skip: Container[str]) -> Iterator[_City | _StateEnd]:
+    for state in get_states(cached_reader):
+        if state in skip:
+            continue
         
-        shops.append(shop)
+        for city in get_cities(cached_reader, state):
+            if city in skip:
+                continue
+            
+            yield "city", city, get_schemas(cached_reader, city)
+            
+        yield "state", state, None
+
+
+_T = TypeVar("_T")
+_R = TypeVar("_R")
+
+
+def _window_map(pool: ThreadPoolExecutor, fn: Callable[[_T], _R], items: Iterable[_T], window: int) -> Iterator[tuple[_T, _R]]:
+    """
+    `(item, fn(item))` in input order, with at most `window` calls submitted
+    ahead of the consumer, so memory stays flat however many items there are.
+    """
+    pending: deque[tuple[_T, Future[_R]]] = deque()
+    
+    try:
+        for item in items:
+            pending.append((item, pool.submit(fn, item)))
+            
+            if len(pending) >= window:
+                item, future = pending.popleft()
+                yield item, future.result()
         
-    return shops
+        while pending:
+            item, future = pending.popleft()
+            yield item, future.result()
+    finally:
+        # the consumer stopped early; drop what has not started
+        for _, future in pending:
+            future.cancel()
+
+
+def _state_pages_concurrent(cached_reader: CachedReader, skip: Container[str], pool: ThreadPoolExecutor, window: int) -> Iterator[_City | _StateEnd]:
+    states = [state for state in get_states(cached_reader) if state not in skip]
+    cities_by_state = _window_map(pool, lambda state: get_cities(cached_reader, state), states, window)
+    
+    pairs = ((state, city) for state, cities in cities_by_state for city in cities if city not in skip)
+    
+    # results come back in input order, so the output matches the sequential scrape
+    pages = _window_map(pool, lambda pair: get_schemas(cached_reader, pair[1]), pairs, window)
+    
+    # states[:ended] have had their end yielded; states without any remaining
+    # cities are ended as soon as a later state starts
+    ended = 0
+    
+    for (state, city), schemas in pages:
+        while states[ended] != state:
+            yield "state", states[ended], None
+            ended += 1
+            
+        yield "city", city, schemas
         
+    for state in states[ended:]:
+        yield "state", state, None
+
 
-def scrape(cached_reader) -> list[Shop]:
+def _geocoded(stream: Iterator[_City | _StateEnd], stage: GeocodeStage, progress: Optional[Progress], batch_size: int) -> Iterator[Shop]:
     counter = 0
+    batch: list[_City | _StateEnd] = []
+    size = 0
     
-    states = get_states(cached_reader)
-    
-    stores = []
+    def flush() -> Iterator[Shop]:
+        nonlocal counter
+        
+        shops = iter(build_shops(stage, [schema for kind, _, schemas in batch if kind == "city" for schema in schemas]))
+        
+        for kind, url, schemas in batch:
+            if kind == "city":
+                for _ in schemas:
+                    yield next(shops)
+                    
+                counter += len(schemas)
+                LOGGER.info(f"{counter/SIZE*100:.2f}% - {url}")
+            
+            # the consumer has handled every store of `url` by the time we resume
+            if progress is not None:
+                progress.finish(url)
     
-    for state in states:
-        LOGGER.info(f"{counter/SIZE*100:.2f}% - scraping stores under {state}")
+    for item in stream:
+        batch.append(item)
         
-        cities = get_cities(cached_reader, state)
+        if item[0] == "city":
+            size += len(item[2])
         
-        for city in cities:
-            LOGGER.info(f"{counter/SIZE*100:.2f}% - {city}")
-            locations = get_locations(cached_reader, city)
+        if size >= batch_size:
+            yield from flush()
+            batch, size = [], 0
             
-            for location in locations:
-                stores.append(location)
-                counter += 1
-                
-    return stores
+    yield from flush()
+
+
+def scrape(cached_reader, stage: Optional[GeocodeStage] = None, *, skip: Container[str] = frozenset(), progress: Optional[Progress] = None, batch_size: int = 64) -> Iterator[Shop]:
+    """
+    Stream every store, state by state and city by city. Pages are parsed as
+    they are fetched; addresses are geocoded `batch_size` at a time. State
+    and city URLs in `skip` are not visited, and `progress.finish(url)` is
+    called once every store under `url` has been consumed.
+    """
+    if stage is None:
+        stage = geocode_stage(cached_reader)
+    
+    yield from _geocoded(_state_pages(cached_reader, skip), stage, progress, batch_size)
+
+
+def scrape_concurrent(cached_reader: CachedReader, workers: int = 8, stage: Optional[GeocodeStage] = None, *, skip: Container[str] = frozenset(), progress: Optional[Progress] = None, batch_size: int = 64) -> Iterator[Shop]:
+    """
+    Same stream as `scrape`, but city and location pages of different
+    states are fetched in parallel, at most `workers * PREFETCH` pages ahead
+    of the consumer. Request rates are governed by the reader's `limiter`
+    (see `rate_limits`), not by `workers`.
+    """
+    if stage is None:
+        stage = geocode_stage(cached_reader)
+    
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tj-scrape") as pool:
+        yield from _geocoded(_state_pages_concurrent(cached_reader, skip, pool, workers * PREFETCH), stage, progress, batch_size)